@@ -0,0 +1,2 @@
+from .scripted_bots import GameBatch, Bot, RandomBot, RushBot, WorkerRushBot, LightRushBot, idle_units
+from .mcts import MCTSBot, evaluate
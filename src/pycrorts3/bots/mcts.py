@@ -0,0 +1,264 @@
+from multiprocessing import Pool
+import time
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .scripted_bots import Bot, RandomBot, idle_units
+from ..game import Game
+from ..game.actions import ActionEncodings
+from ..game.units import STAT_COST, STAT_HITPOINTS
+
+TIME_BUDGET = 0.1  # seconds per decision
+MAX_PLAYOUTS = None  # playouts per decision, each adds at most 1 node to the tree
+MAX_TREE_DEPTH = 10  # decisions, from the root
+ROLLOUT_TICKS = 100
+EPSILON_0 = 0.4  # the chance of sampling a new joint action from the units' local bandits, rather than the best so far
+EPSILON_LOCAL = 0.3  # the chance each unit's action is sampled at random when exploring
+EPSILON_GLOBAL = 0.0  # the chance a random known joint action is chosen when exploiting
+MINERAL_WEIGHT = 20.0  # evaluation weights, as microRTS's SimpleSqrtEvaluationFunction3
+UNIT_WEIGHT = 40.0
+
+
+def evaluate(game: Game, player_id: int) -> float:
+    """Score a game from a player's perspective, in [-1, 1].
+
+    Finished games score 1 for a win, -1 for a loss & 0 for a draw, otherwise each player's material is the minerals
+      it holds & carries plus the cost of its units, discounted by the square root of their remaining hitpoints, like
+      microRTS's SimpleSqrtEvaluationFunction3.
+    """
+    if game.is_game_over:
+        return 0.0 if game.winner is None else (1.0 if game.winner == player_id else -1.0)
+    _, types, owners, _, _, hitpoints, resources, _ = game.state.to_unit_table().T
+    stats = game.state.utt[types]
+    values = MINERAL_WEIGHT * resources + \
+        UNIT_WEIGHT * stats[:, STAT_COST] * np.sqrt(hitpoints / np.maximum(stats[:, STAT_HITPOINTS], 1))
+    scores = [MINERAL_WEIGHT * player.minerals + values[owners == player.id].sum() for player in game.players]
+    total = sum(scores)
+    return 0.0 if total == 0 else 2.0 * scores[player_id] / total - 1.0
+
+
+class MCTSBot(Bot):
+    """An anytime Monte Carlo tree search over the joint actions of a player's units, by naive sampling.
+
+    Each node is a decision of one player: an action for every one of its idle units, which is too many joint actions
+      to try them all, so they are sampled by naive sampling (Ontañón, 2013) like microRTS's NaiveMCTS.
+    Each unit has a bandit over its own actions, which proposes new joint actions, and the node has a bandit over the
+      joint actions tried so far, which exploits the best.
+    Leaves are evaluated by a rollout of a scripted bot for both players, then `evaluate()`.
+
+    The search runs on a copy of the game, checkpointed with `Game.push()` & reverted with `Game.pop()` after each
+      playout, until the time or playout budget runs out.
+    With `processes` > 1, independent searches from differently seeded copies run in a process pool & their root
+      visit counts are summed (root parallelisation), so more cores give more playouts in the same time.
+    """
+
+    def __init__(self, seed=None, time_budget: Optional[float] = TIME_BUDGET, max_playouts: Optional[int] = MAX_PLAYOUTS,
+                 max_tree_depth: int = MAX_TREE_DEPTH, rollout_ticks: int = ROLLOUT_TICKS,
+                 rollout_bot: Optional[Bot] = None, epsilon_0: float = EPSILON_0, epsilon_local: float = EPSILON_LOCAL,
+                 epsilon_global: float = EPSILON_GLOBAL, processes: int = 1) -> None:
+        """
+        :param seed: Seeds the search.
+        :param time_budget: The seconds of search per decision, None for no limit.
+        :param max_playouts: The playouts per decision (per process), None for no limit.
+        :param max_tree_depth: The depth, in decisions, below which nodes aren't added.
+        :param rollout_ticks: The ticks of each rollout, before evaluating.
+        :param rollout_bot: The bot playing both players in rollouts, defaults to a biased `RandomBot`.
+        :param epsilon_0: The chance of exploring a new joint action, see `EPSILON_0`.
+        :param epsilon_local: The chance of a random action per unit when exploring.
+        :param epsilon_global: The chance of a random known joint action when exploiting.
+        :param processes: The number of root parallel searches, each in its own process when more than 1.
+        """
+        super().__init__(seed)
+        assert time_budget is not None or max_playouts is not None, 'The search needs a budget'
+        self.time_budget = time_budget
+        self.max_playouts = max_playouts
+        self.max_tree_depth = max_tree_depth
+        self.rollout_ticks = rollout_ticks
+        self.rollout_bot = rollout_bot if rollout_bot is not None else RandomBot(self.rng.integers(2 ** 63), biased=True)
+        self.epsilon_0 = epsilon_0
+        self.epsilon_local = epsilon_local
+        self.epsilon_global = epsilon_global
+        self.processes = processes
+        self.pool: Optional[Pool] = None
+        self.players: Tuple[int, int] = (0, 1)  # the order players act in each tick, the searching player first
+        self.stats: Dict[str, float] = {}  # of the last search
+        self.policy: Dict[int, np.ndarray] = {}  # the root visit frequency of each action, by unit ID
+
+    def get_actions(self, game: Game, player_id: int) -> np.ndarray:
+        start = time.perf_counter()
+        actions = np.zeros(game.height() * game.width(), dtype=np.int64)
+        if game.is_game_over or not idle_units(game, player_id):
+            self.stats, self.policy = {}, {}
+            return actions
+
+        data = game.to_bytes()
+        if self.processes > 1:
+            if self.pool is None:
+                self.pool = Pool(self.processes)
+            seeds = self.rng.integers(2 ** 63, size=self.processes)
+            results = self.pool.starmap(_search_process, [(self, data, player_id, seed) for seed in seeds])
+        else:
+            results = [self.search(Game.from_bytes(data), player_id)]
+
+        # sum the root visits of the searches, whose roots are the same units in the same order
+        unit_ids = results[0][0]
+        visits: Dict[tuple, int] = {}
+        for _, root_visits, _, _ in results:
+            for joint, count in root_visits.items():
+                visits[joint] = visits.get(joint, 0) + count
+        best = max(visits, key=visits.get)
+        for unit_id, action_id in zip(unit_ids, best):
+            unit = game.get_unit(unit_id)
+            actions[unit.y * game.width() + unit.x] = action_id
+
+        self.policy = {unit_id: np.zeros(len(ActionEncodings)) for unit_id in unit_ids}
+        for joint, count in visits.items():
+            for unit_id, action_id in zip(unit_ids, joint):
+                self.policy[unit_id][action_id] += count
+        for policy in self.policy.values():
+            policy /= policy.sum()
+
+        seconds = time.perf_counter() - start
+        num_playouts = sum(result[2] for result in results)
+        num_nodes = sum(result[3] for result in results)
+        self.stats = {
+            'seconds': seconds,
+            'playouts': num_playouts,
+            'nodes': num_nodes,
+            'playouts_per_second': num_playouts / seconds,
+            'nodes_per_second': num_nodes / seconds,
+        }
+        return actions
+
+    def search(self, game: Game, player_id: int) -> Tuple[List[int], Dict[tuple, int], int, int]:
+        """Search from a game, which is modified, with the player to act having idle units.
+
+        :param game: The game, a copy the search can own.
+        :param player_id: The ID of the player to decide for.
+        :return: The IDs of the units acting at the root, the visits of each root joint action (an `ActionEncodings`
+          value per unit), the number of playouts & the number of nodes in the tree.
+        """
+        game.env_config['verbose'] = False
+        self.players = (player_id, 1 - player_id)
+        root = self._new_node(game, player_id, frozenset(), 0, idle_units(game, player_id))
+        num_nodes = 1
+        num_playouts = 0
+        deadline = None if self.time_budget is None else time.perf_counter() + self.time_budget
+        while (self.max_playouts is None or num_playouts < self.max_playouts) and \
+                (deadline is None or time.perf_counter() < deadline):
+            game.push()
+            path = []
+            node = root
+            while node is not None:
+                sign = 1.0 if node.player_id == player_id else -1.0
+                joint = node.select(self.rng, sign, self.epsilon_0, self.epsilon_local, self.epsilon_global)
+                path.append((node, joint))
+                game.step_many(node.unit_ids, joint)
+                decision = self._advance(game, node.acted | {node.player_id})
+                child = node.children.setdefault(joint, [0, 0.0, None])[2]
+                if decision is None:
+                    break
+                next_player, acted, units = decision
+                if child is None:
+                    if node.depth + 1 < self.max_tree_depth:
+                        node.children[joint][2] = self._new_node(game, next_player, acted, node.depth + 1, units)
+                        num_nodes += 1
+                    break
+                if child.player_id != next_player or child.unit_ids != [unit.id for unit in units]:
+                    break  # a different state than the node was made for, just roll out
+                node = child
+            value = self._rollout(game, player_id)
+            game.pop()
+            for node, joint in path:
+                node.update(joint, value)
+            num_playouts += 1
+        return root.unit_ids, {joint: child[0] for joint, child in root.children.items()}, num_playouts, num_nodes
+
+    def close(self) -> None:
+        """Shut down the process pool, if any."""
+        if self.pool is not None:
+            self.pool.terminate()
+            self.pool = None
+
+    def _advance(self, game: Game, acted: frozenset) -> Optional[tuple]:
+        """Move on to the next decision: the next player with idle units this tick, else the next tick with any.
+
+        :return: The ID of the player to act, the players who already acted this tick & the units to act, or None if
+          the game ended.
+        """
+        while not game.is_game_over:
+            for player_id in self.players:
+                if player_id not in acted:
+                    units = idle_units(game, player_id)
+                    if units:
+                        return player_id, acted, units
+            game.update()
+            acted = frozenset()
+        return None
+
+    def _new_node(self, game: Game, player_id: int, acted: frozenset, depth: int, units: list) -> '_Node':
+        legal = [np.flatnonzero(game.get_action_mask(unit)) for unit in units]
+        return _Node(player_id, acted, depth, [unit.id for unit in units], legal)
+
+    def _rollout(self, game: Game, player_id: int) -> float:
+        end_time = game.time + self.rollout_ticks
+        while not game.is_game_over and game.time < end_time:
+            for rollout_player in self.players:
+                self.rollout_bot.play(game, rollout_player)
+            game.update()
+        return evaluate(game, player_id)
+
+    def __getstate__(self) -> dict:
+        state = dict(self.__dict__)
+        state['pool'] = None
+        return state
+
+
+class _Node:
+    """A decision of one player, the statistics of its units' local bandits & of the joint actions tried."""
+
+    __slots__ = ['player_id', 'acted', 'depth', 'unit_ids', 'legal', 'local_visits', 'local_values', 'children']
+
+    def __init__(self, player_id: int, acted: frozenset, depth: int, unit_ids: List[int],
+                 legal: List[np.ndarray]) -> None:
+        self.player_id = player_id
+        self.acted = acted  # players who acted earlier in the same tick
+        self.depth = depth
+        self.unit_ids = unit_ids
+        self.legal = legal  # the legal `ActionEncodings` values of each unit, ascending
+        self.local_visits = [np.zeros(len(actions)) for actions in legal]
+        self.local_values = [np.zeros(len(actions)) for actions in legal]
+        self.children: Dict[tuple, list] = {}  # joint action: [visits, total value, child node or None]
+
+    def select(self, rng: np.random.Generator, sign: float, epsilon_0: float, epsilon_local: float,
+               epsilon_global: float) -> tuple:
+        """Choose a joint action by naive sampling, maximising `sign` * value."""
+        if self.children and rng.random() >= epsilon_0:
+            joints = list(self.children)
+            if rng.random() < epsilon_global:
+                return joints[rng.integers(len(joints))]
+            return max(joints, key=lambda joint: sign * self.children[joint][1] / max(self.children[joint][0], 1))
+        joint = []
+        for legal, visits, values in zip(self.legal, self.local_visits, self.local_values):
+            if rng.random() < epsilon_local:
+                index = rng.integers(len(legal))
+            else:
+                means = np.where(visits > 0, sign * values / np.maximum(visits, 1), np.inf)  # untried actions first
+                index = rng.choice(np.flatnonzero(means == means.max()))
+            joint.append(int(legal[index]))
+        return tuple(joint)
+
+    def update(self, joint: tuple, value: float) -> None:
+        child = self.children[joint]
+        child[0] += 1
+        child[1] += value
+        for legal, visits, values, action_id in zip(self.legal, self.local_visits, self.local_values, joint):
+            index = np.searchsorted(legal, action_id)
+            visits[index] += 1
+            values[index] += value
+
+
+def _search_process(bot: MCTSBot, data: bytes, player_id: int, seed: int) -> tuple:
+    bot.rng, bot.rollout_bot.rng = [np.random.default_rng(s) for s in np.random.SeedSequence(seed).spawn(2)]
+    return bot.search(Game.from_bytes(data), player_id)
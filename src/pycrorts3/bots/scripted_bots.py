@@ -0,0 +1,314 @@
+import itertools
+from typing import Dict, List, Sequence
+
+import numpy as np
+
+from ..game import Game
+from ..game.actions import ActionEncodings
+from ..game.distance_fields import distance_field, passable_cells, unreachable
+from ..game.state import DIRECTION_DX, DIRECTION_DY, ENTITY_FEATURES, action_masks
+from ..game.units import Unit, UnitEncoding, RESOURCE_CODE, STAT_COST, TYPE_IS_MOBILE, unit_class_codes
+
+NOOP = ActionEncodings.NOOP.value
+MOVES = slice(ActionEncodings.MOVE_UP.value, ActionEncodings.MOVE_LEFT.value + 1)
+ATTACKS = slice(ActionEncodings.ATTACK_UP.value, ActionEncodings.ATTACK_LEFT.value + 1)
+HARVESTS = slice(ActionEncodings.HARVEST_UP.value, ActionEncodings.HARVEST_LEFT.value + 1)
+RETURNS = slice(ActionEncodings.RETURN_UP.value, ActionEncodings.RETURN_LEFT.value + 1)
+PRODUCES = slice(ActionEncodings.PRODUCE_UP.value, ActionEncodings.PRODUCE_LEFT.value + 1)
+BASE = UnitEncoding.BaseBuilding.value
+BARRACKS = UnitEncoding.BarracksBuilding.value
+WORKER = UnitEncoding.WorkerUnit.value
+MAX_CACHED_FIELDS = 16
+
+
+class GameBatch:
+    """Games a bot decides for at once, laid out as one board so each array operation covers all of them.
+
+    The games' boards are stacked top to bottom with a row of walls between each, so neighbours & distance fields
+      never cross from one game into another. `terrain` & `unit_map` are as `State`'s for the stacked board, so board
+      functions such as `passable_cells()` apply to the whole batch.
+    The units are the rows of the games' unit tables, in game order, with y on the stacked board.
+    The games must share a UTT.
+    """
+
+    def __init__(self, games: Sequence[Game], player_id: int, exclude_queued: bool = True) -> None:
+        """
+        :param games: The games, at least 1.
+        :param player_id: The ID of the player deciding.
+        :param exclude_queued: Whether units already given an action this tick are left out of `rows`.
+        """
+        super().__init__()
+        self.games = list(games)
+        self.player_id = player_id
+        self.utt = self.games[0].state.utt
+        self.top = np.cumsum([0] + [game.height() + 1 for game in self.games])[:-1]  # the board row of each game's y 0
+        self.minerals = np.array([[player.minerals for player in game.players] for game in self.games])
+
+        # the boards, with walls between & beside narrower games, & the units, gathered in one pass over each game
+        height = int(self.top[-1]) + self.games[-1].height()
+        width = max(game.width() for game in self.games)
+        self.terrain = np.ones((height, width), dtype=np.uint8)
+        self.unit_map = np.zeros((height, width), dtype=np.uint8)
+        units = []  # game & the columns of `State.to_unit_table()`
+        cells = []  # targeted by actions in progress
+        for k, game in enumerate(self.games):
+            top = int(self.top[k])
+            self.terrain[top:top + game.height(), :game.width()] = game.state.terrain
+            self.unit_map[top:top + game.height(), :game.width()] = game.state.unit_map
+            queued = {action.unit_id for action in game.queued_actions} if exclude_queued else ()
+            units += [(k, unit.id, unit_class_codes[unit.__class__], unit.player_id, unit.position.x,
+                       top + unit.position.y, unit.hitpoints, unit.resources,
+                       unit.has_pending_action or unit.id in queued)
+                      for unit in game.units.values() if unit.position is not None]
+            cells += [(top + action.position.y, action.position.x)
+                      for action in itertools.chain(itertools.chain(*game.pending_actions), game.queued_actions)
+                      if action.position is not None]
+        table = np.array(units, dtype=np.int32).reshape(-1, len(ENTITY_FEATURES) + 2)
+        self.game = table[:, 0]  # of each unit
+        self.table = table[:, 1:]  # id, type, owner, x, y, hitpoints, resources, busy (or given an action this tick)
+        self.reserved = np.zeros((height + 2, width + 2), dtype=bool)  # with a border, as the neighbours of any cell
+        ys, xs = np.array(cells, dtype=np.int64).reshape(-1, 2).T
+        self.reserved[ys + 1, xs + 1] = True
+        self.rows = np.flatnonzero((self.table[:, 2] == player_id) & (self.table[:, 7] == 0))  # units that can act
+
+    def action_masks(self) -> np.ndarray:
+        """Get the legal actions of each unit of `rows`, as `Game.get_action_mask()`.
+
+        :return: A boolean numpy array of shape (len(rows), len(ActionEncodings)).
+        """
+        units = self.table[self.rows]
+        mask = action_masks(self.unit_map, self.terrain, self.utt, self.table, self.rows,
+                            self.minerals[self.game[self.rows], self.player_id])
+        # mask move actions set to be occupied by other pending actions
+        mask[:, MOVES] &= ~self.reserved[units[:, 4, None] + 1 + DIRECTION_DY, units[:, 3, None] + 1 + DIRECTION_DX]
+        return mask
+
+    def cells(self) -> np.ndarray:
+        """Get the cell of each unit of `rows`, as an index of its own game's board in row major order."""
+        units = self.table[self.rows]
+        games = self.game[self.rows]
+        widths = np.array([game.width() for game in self.games])
+        return (units[:, 4] - self.top[games]) * widths[games] + units[:, 3]
+
+
+class Bot:
+    """A scripted player, deciding the actions of all its units in one vectorised pass over the units & the board.
+
+    Actions are per cell, in the encoding of `GridPycroRts3MultiAgentEnv`, so bots can act in that env directly or
+      drive a `Game` through `play()`.
+    A bot can also decide for many games at once, through `play_many()`, which shares the fixed cost of each array
+      operation between the games, e.g. games for evaluation run in lockstep.
+    """
+
+    def __init__(self, seed=None) -> None:
+        super().__init__()
+        self.rng = np.random.default_rng(seed)
+
+    def get_actions(self, game: Game, player_id: int) -> np.ndarray:
+        """Decide the action of every cell.
+
+        :param game: The game.
+        :param player_id: The ID of the player the bot plays as.
+        :return: An array of shape (map_height * map_width,) of action indexes, see `ActionEncodings`.
+        """
+        raise NotImplementedError
+
+    def get_unit_actions(self, batch: GameBatch) -> np.ndarray:
+        """Decide the action of each unit of a batch's `rows`, by default the action of its cell in `get_actions()`.
+
+        :param batch: The games & the units to decide for.
+        :return: An array of shape (len(batch.rows),) of action indexes, see `ActionEncodings`.
+        """
+        actions = np.concatenate([self.get_actions(game, batch.player_id) for game in batch.games])
+        offsets = np.cumsum([0] + [game.height() * game.width() for game in batch.games])
+        return actions[offsets[batch.game[batch.rows]] + batch.cells()]
+
+    def play(self, game: Game, player_id: int) -> None:
+        """Decide & make the actions of all the player's units that can make one, before `game.update()`.
+
+        Units are busy for most ticks, so nothing is computed on ticks when none of the player's units can act.
+        Units already given an action this tick are left alone.
+        """
+        self.play_many([game], player_id)
+
+    def play_many(self, games: Sequence[Game], player_id: int) -> None:
+        """`play()` many games at once, e.g. games for evaluation run in lockstep, deciding for all in one pass."""
+        games = [game for game in games if idle_units(game, player_id)]
+        if not games:
+            return
+        batch = GameBatch(games, player_id)
+        actions = self.get_unit_actions(batch)
+        splits = np.searchsorted(batch.game[batch.rows], np.arange(1, len(games)))
+        for game, unit_ids, game_actions in zip(games, np.split(batch.table[batch.rows, 0], splits),
+                                                np.split(actions, splits)):
+            game.step_many(unit_ids, game_actions)
+
+    def _get_actions_of_units(self, game: Game, player_id: int) -> np.ndarray:
+        """`get_actions()` of bots that decide per unit, from `get_unit_actions()` of every unit that can act."""
+        batch = GameBatch([game], player_id, exclude_queued=False)
+        actions = np.zeros(game.height() * game.width(), dtype=np.int64)
+        if len(batch.rows):
+            actions[batch.cells()] = self.get_unit_actions(batch)
+        return actions
+
+    def _choose(self, scores: np.ndarray, mask: np.ndarray) -> np.ndarray:
+        """Pick the legal action with the highest score of every unit, breaking ties at random."""
+        choices = np.flatnonzero(mask[:, 1:].any(axis=1))  # units with a choice, others NOOP
+        noisy = scores[choices] + self.rng.random((len(choices), mask.shape[1]))
+        actions = np.zeros(len(mask), dtype=np.int64)
+        actions[choices] = np.where(mask[choices], noisy, -np.inf).argmax(axis=1)
+        return actions
+
+
+class RandomBot(Bot):
+    """Pick a random legal action for every unit.
+
+    If biased, attacking, harvesting & returning are 5 times as likely as other actions, like microRTS's
+      RandomBiasedAI.
+    """
+
+    def __init__(self, seed=None, biased: bool = False) -> None:
+        super().__init__(seed)
+        self.weights = np.ones(len(ActionEncodings))
+        if biased:
+            self.weights[ATTACKS] = self.weights[HARVESTS] = self.weights[RETURNS] = 5.0
+
+    def get_actions(self, game: Game, player_id: int) -> np.ndarray:
+        return self._get_actions_of_units(game, player_id)
+
+    def get_unit_actions(self, batch: GameBatch) -> np.ndarray:
+        mask = batch.action_masks()
+        choices = np.flatnonzero(mask[:, 1:].any(axis=1))  # units with a choice, others NOOP
+        # weighted sampling without a loop: the largest u ** (1 / weight) is drawn in proportion to the weights
+        keys = self.rng.random((len(choices), mask.shape[1])) ** (1.0 / self.weights)
+        actions = np.zeros(len(mask), dtype=np.int64)
+        actions[choices] = np.where(mask[choices], keys, -1.0).argmax(axis=1)
+        return actions
+
+
+class RushBot(Bot):
+    """Base of bots that harvest with a few workers & send every other mobile unit to attack the nearest enemy.
+
+    Units attack whenever an enemy is adjacent, workers return minerals whenever carrying & next to a base, otherwise
+      each unit moves one cell down a distance field towards its goal: minerals or a base for harvesters, enemies for
+      the rest.
+    """
+
+    num_harvesters = 1  # per game
+
+    def __init__(self, seed=None) -> None:
+        super().__init__(seed)
+        self.field_cache: Dict[bytes, np.ndarray] = {}  # fields to minerals & bases, which rarely change
+
+    def get_actions(self, game: Game, player_id: int) -> np.ndarray:
+        return self._get_actions_of_units(game, player_id)
+
+    def get_unit_actions(self, batch: GameBatch) -> np.ndarray:
+        rows = batch.rows
+        mask = batch.action_masks()
+        _, types, owners, xs, ys, _, resources, _ = batch.table.T
+        own = owners == batch.player_id
+        enemy = owners == 1 - batch.player_id
+
+        # roles, the first workers of each game harvest
+        workers = np.flatnonzero(own & (types == WORKER))  # in game, then ID order
+        worker_games = batch.game[workers]
+        is_harvester = np.zeros(len(batch.table), dtype=bool)
+        is_harvester[workers[np.arange(len(workers)) - np.searchsorted(worker_games, worker_games) <
+                             self.num_harvesters]] = True
+        harvester = is_harvester[rows]
+        carrying = resources[rows] > 0
+        mobile = TYPE_IS_MOBILE[types[rows]] & mask[:, MOVES].any(axis=1)  # only units that can move need a field
+
+        # walk one cell down a distance field, through cells without walls or buildings (mobile units move away)
+        passable = passable_cells(batch)
+        bases = own & (types == BASE)
+        minerals = types == RESOURCE_CODE
+        progress = np.zeros((len(rows), 4))  # how much closer each move gets to the goal: -1, 0 or 1
+        for users, sources, is_static in ((mobile & ~harvester, enemy, False),
+                                          (mobile & harvester & carrying, bases, True),
+                                          (mobile & harvester & ~carrying, minerals, True)):
+            if users.any():
+                user_ys, user_xs = ys[rows[users]], xs[rows[users]]
+                field = self._field(passable, ys[sources], xs[sources], user_ys, user_xs, is_static)
+                neighbours = _neighbour_values(field, unreachable(field), user_ys, user_xs)
+                progress[users] = np.clip(field[user_ys, user_xs][:, None] - neighbours, -1, 1)
+
+        scores = np.zeros(mask.shape)
+        scores[:, NOOP] = 1.0
+        scores[:, MOVES] = 10.0 * progress
+        scores[:, ATTACKS] = 100.0
+        scores[:, RETURNS] = 90.0
+        scores[:, HARVESTS] = np.where(harvester, 80.0, 0.0)[:, None]
+        scores[:, PRODUCES] = self._produce_scores(batch, own, workers)[:, None]
+        return self._choose(scores, mask)
+
+    def _field(self, passable: np.ndarray, ys: np.ndarray, xs: np.ndarray, user_ys: np.ndarray, user_xs: np.ndarray,
+               is_static: bool) -> np.ndarray:
+        """Get a distance field, from the cache if its sources & the passable cells haven't changed."""
+        if not is_static:
+            users = np.zeros(passable.shape, dtype=bool)
+            users[user_ys, user_xs] = True
+            return distance_field(passable, ys, xs, users)
+        key = passable.tobytes() + ys.tobytes() + xs.tobytes()
+        field = self.field_cache.get(key)
+        if field is None:
+            if len(self.field_cache) >= MAX_CACHED_FIELDS:
+                self.field_cache.clear()
+            field = self.field_cache[key] = distance_field(passable, ys, xs)
+        return field
+
+    def _produce_scores(self, batch: GameBatch, own: np.ndarray, workers: np.ndarray) -> np.ndarray:
+        """Score producing, per unit of `batch.rows`, in place of moving (10), below harvesting (80).
+
+        :param batch: The games & units deciding.
+        :param own: Whether each unit of `batch.table` is the player's.
+        :param workers: The rows of `batch.table` of the player's workers, in game, then ID order.
+        """
+        raise NotImplementedError
+
+
+class WorkerRushBot(RushBot):
+    """Train workers non-stop, 1 harvests & the rest attack, like microRTS's WorkerRush."""
+
+    def _produce_scores(self, batch, own, workers) -> np.ndarray:
+        return np.where(batch.table[batch.rows, 1] == BASE, 70.0, 0.0)
+
+
+class LightRushBot(RushBot):
+    """Build a barracks & train light units non-stop to attack, with workers harvesting, like microRTS's LightRush."""
+
+    num_harvesters = 2
+
+    def _produce_scores(self, batch, own, workers) -> np.ndarray:
+        num_games = len(batch.games)
+        types = batch.table[:, 1]
+        unit_types = types[batch.rows]
+        unit_games = batch.game[batch.rows]
+        worker_games = batch.game[workers]
+        num_workers = np.bincount(worker_games, minlength=num_games)
+        has_barracks = np.bincount(batch.game[own & (types == BARRACKS)], minlength=num_games) > 0
+        can_build = ~has_barracks & (batch.minerals[:, batch.player_id] >= batch.utt[BARRACKS, STAT_COST])
+        is_builder = np.zeros(len(batch.table), dtype=bool)  # the last worker of each game that can build
+        last_workers = workers[np.append(worker_games[1:] != worker_games[:-1], True)] if len(workers) else workers
+        is_builder[last_workers] = can_build[batch.game[last_workers]]
+
+        scores = np.zeros(len(batch.rows))
+        scores[(unit_types == BASE) & (num_workers < self.num_harvesters)[unit_games]] = 70.0
+        scores[unit_types == BARRACKS] = 70.0
+        scores[is_builder[batch.rows]] = 95.0  # build before harvesting
+        return scores
+
+
+def _neighbour_values(grid: np.ndarray, fill, ys: np.ndarray, xs: np.ndarray) -> np.ndarray:
+    """Get the UP, RIGHT, DOWN & LEFT neighbour of some cells, as the directions of `ActionEncodings`."""
+    padded = np.full((grid.shape[0] + 2, grid.shape[1] + 2), fill, dtype=grid.dtype)
+    padded[1:-1, 1:-1] = grid
+    return padded[ys[:, None] + 1 + DIRECTION_DY, xs[:, None] + 1 + DIRECTION_DX]
+
+
+def idle_units(game: Game, player_id: int) -> List[Unit]:
+    """The units of a player that can make an action & haven't been given one this tick."""
+    queued = {action.unit_id for action in game.queued_actions}
+    return [unit for unit in game.units.values() if unit.player_id == player_id and unit.position is not None and
+            unit.can_make_action() and unit.id not in queued]
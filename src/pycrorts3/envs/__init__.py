@@ -1,3 +1,6 @@
+from .async_runner import AsyncEnvRunner
 from .hierarchical_multi_agent_env import HierarchicalPycroRts3MultiAgentEnv
+from .grid_multi_agent_env import GridPycroRts3MultiAgentEnv
 from .multi_agent_env import PycroRts3MultiAgentEnv, SquarePycroRts3MultiAgentEnv
 from .pycrorts3_env import PycroRts3Env
+from .trajectory_store import TrajectoryReader, TrajectoryWriter
@@ -0,0 +1,110 @@
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .grid_multi_agent_env import GridPycroRts3MultiAgentEnv, num_actions
+
+
+class AsyncEnvRunner:
+    """Run K games in groups, simulating one group in a background thread while the policy acts for another.
+
+    Each game is a `GridPycroRts3MultiAgentEnv`, so every game has the same fixed-size observations & actions and
+      results can be written straight into preallocated `[K, num_players, ...]` buffers.
+    Usage alternates `poll()` & `send()`:
+
+        runner.reset()
+        while True:
+            group, batch = runner.poll()  # blocks until the group's results are ready
+            runner.send(group, policy(batch['board'], batch['action_mask']))  # returns immediately
+
+    With 2 groups, the background thread steps one group while the policy computes actions for the other, hiding the
+      simulator's latency behind inference (policies that release the GIL while computing, e.g. torch, benefit most).
+    The arrays returned by `poll()` are views on the shared buffers, valid until the group is sent.
+    Games that end are reset automatically, their final rewards & dones are reported alongside the first
+      observation of the next episode.
+    """
+
+    def __init__(self, num_envs: int, env_config=None, num_groups: int = 2) -> None:
+        super().__init__()
+        assert 1 <= num_groups <= num_envs
+        self.envs = [GridPycroRts3MultiAgentEnv(dict(env_config or {})) for _ in range(num_envs)]
+        bounds = np.linspace(0, num_envs, num_groups + 1).astype(int)
+        self.groups: List[slice] = [slice(start, stop) for start, stop in zip(bounds[:-1], bounds[1:])]
+        num_players = len(self.envs[0].game.players)
+        num_cells = self.envs[0].num_cells
+
+        # shared buffers, written by the background thread
+        self.boards = np.zeros((num_envs, num_players, num_cells), dtype=np.uint8)
+        self.action_masks = np.zeros((num_envs, num_players, num_cells, num_actions), dtype=np.uint8)
+        self.rewards = np.zeros((num_envs, num_players), dtype=np.float32)
+        self.dones = np.zeros(num_envs, dtype=bool)
+
+        self.executor = ThreadPoolExecutor(max_workers=1)
+        self.futures: List[Optional[Future]] = [None] * num_groups
+        self.next_group = 0
+
+    def reset(self) -> None:
+        """Reset every game, in the background."""
+        for future in self.futures:
+            if future is not None:
+                future.result()
+        for group in range(len(self.groups)):
+            self.futures[group] = self.executor.submit(self._reset_group, group)
+        self.next_group = 0
+
+    def poll(self) -> Tuple[int, Dict[str, np.ndarray]]:
+        """Wait for the next group's results.
+
+        :return: The group index & its 'board', 'action_mask', 'rewards' & 'dones' arrays, each indexed by game in the
+          group, then by player.
+        """
+        group = self.next_group
+        self.futures[group].result()
+        self.next_group = (group + 1) % len(self.groups)
+        envs = self.groups[group]
+        return group, {
+            'board': self.boards[envs],
+            'action_mask': self.action_masks[envs],
+            'rewards': self.rewards[envs],
+            'dones': self.dones[envs],
+        }
+
+    def send(self, group: int, actions: np.ndarray) -> None:
+        """Start stepping a group in the background.
+
+        :param group: The group index returned by `poll()`.
+        :param actions: One action per cell for every game & player of the group, shape `[group size, num_players,
+          num_cells]`.
+        """
+        self.futures[group] = self.executor.submit(self._step_group, group, np.array(actions))
+
+    def close(self) -> None:
+        self.executor.shutdown(wait=True)
+
+    def _reset_group(self, group: int) -> None:
+        for i in range(self.groups[group].start, self.groups[group].stop):
+            self._write(i, self.envs[i].reset())
+            self.rewards[i] = 0.0
+            self.dones[i] = False
+
+    def _step_group(self, group: int, actions: np.ndarray) -> None:
+        start = self.groups[group].start
+        for i in range(start, self.groups[group].stop):
+            env = self.envs[i]
+            obs_dict, rewards, game_over, _ = env.step({str(p): actions[i - start, p] for p in range(actions.shape[1])})
+            for agent_id, reward in rewards.items():
+                self.rewards[i, int(agent_id)] = reward
+            self.dones[i] = game_over['__all__']
+            self._write(i, env.reset() if game_over['__all__'] else obs_dict)
+
+    def _write(self, i: int, obs_dict: dict) -> None:
+        for agent_id, obs in obs_dict.items():
+            self.boards[i, int(agent_id)] = obs['board']
+            self.action_masks[i, int(agent_id)] = obs['action_mask']
+
+    def __enter__(self) -> 'AsyncEnvRunner':
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
@@ -0,0 +1,89 @@
+from typing import Optional
+
+from gym import spaces
+import numpy as np
+from ray.rllib.env.multi_agent_env import MultiAgentEnv
+
+from ..game import Game
+from ..game.actions import ActionEncodings
+from ..game.renderer import Renderer, SCALE
+from ..game.units import Resource
+
+num_actions = len(ActionEncodings)
+
+
+class GridPycroRts3MultiAgentEnv(MultiAgentEnv):
+    """A centralised env with one agent per player, rather than one agent per unit.
+
+    Each player acts on the whole map at once, choosing one action per cell, so there are 2 policy calls per tick
+      irrespective of the number of units.
+    The action for a cell is applied to the player's unit in that cell if it can make an action, else ignored.
+    Agent IDs are the player IDs, e.g. '0' & '1'.
+    """
+
+    def __init__(self, env_config=None) -> None:
+        super().__init__()
+        self.game = Game(env_config)
+        self.num_cells = self.game.height() * self.game.width()
+        self.action_space = self._act_space()
+        self.observation_space = self._obs_space()
+        self.renderer: Optional[Renderer] = None
+
+    def _act_space(self) -> spaces.Space:
+        return spaces.MultiDiscrete([num_actions] * self.num_cells)
+
+    def _obs_space(self) -> spaces.Space:
+        return spaces.Dict({
+            'action_mask': spaces.Box(low=0, high=1, shape=(self.num_cells, num_actions), dtype=np.uint8),
+            'board': spaces.Box(low=0, high=28, shape=(self.num_cells,), dtype=np.uint8),
+        })
+
+    def reset(self):
+        self.game.reset()
+        return {str(player.id): self._get_obs(player.id) for player in self.game.players}
+
+    def step(self, action_dict):
+        # convert each player's per-cell actions into game actions, enqueued in unit order like the per-unit env
+        cell_actions = {int(agent_id): np.asarray(actions) for agent_id, actions in action_dict.items()}
+        units = [unit for unit in self.game.units.values() if unit.player_id in cell_actions and
+                 not isinstance(unit, Resource) and unit.can_make_action()]
+        width = self.game.width()
+        self.game.step_many([unit.id for unit in units],
+                            [int(cell_actions[unit.player_id][unit.y * width + unit.x]) for unit in units])
+
+        # update the game with actions begun & completed this step
+        self.game.update()
+
+        # generate the return values, <obs, rew, done, info>
+        obs_dict = {}
+        rewards = {}
+        shaped_rewards = self.game.get_shaped_rewards()
+        for player in self.game.players:
+            agent_id = str(player.id)
+            obs_dict[agent_id] = self._get_obs(player.id)
+            if self.game.is_game_over:
+                if player.id == self.game.winner:
+                    reward = self.game.reward_win()
+                elif (1 - player.id) == self.game.winner:
+                    reward = self.game.reward_lose()
+                else:
+                    reward = self.game.reward_draw()
+            else:
+                reward = self.game.reward_step()
+            rewards[agent_id] = reward + float(shaped_rewards[player.id])
+
+        game_over = {'__all__': self.game.is_game_over}
+
+        return obs_dict, rewards, game_over, {}
+
+    def render(self, mode='rgb_array') -> np.ndarray:
+        """Render the current game as an RGB image of shape (map_height * scale, map_width * scale, 3)."""
+        if self.renderer is None:
+            self.renderer = Renderer(self.game.env_config.get('render_scale', SCALE))
+        return self.renderer.render(self.game.state)
+
+    def _get_obs(self, player_id: int) -> dict:
+        return {
+            'action_mask': self.game.get_action_mask_grid(player_id).reshape(self.num_cells, num_actions),
+            'board': np.ravel(self.game.get_player_state(player_id)),
+        }
@@ -1,103 +1,153 @@
+from typing import Dict, List, Optional
+
 from gym import spaces
 import numpy as np
-from ray.rllib.env.multi_agent_env import MultiAgentEnv
 
-from ..game import Game
+from .multi_agent_env import PycroRts3MultiAgentEnv
+from ..game.macro_actions import MacroActions, MacroAction, IdleMacro, MoveToMacro, HarvestMacro, AttackMacro, \
+    ProduceMacro, MACRO_TIMEOUT
+from ..game.units import Resource, Unit, TYPE_IS_MOBILE, TYPE_IS_WORKER, TYPE_PRODUCES, unit_class_codes
+
+MAX_PRODUCE = 5  # the most units a produce macro can ask for
+
 
-NUM_ACTIONS = 9
+class HierarchicalPycroRts3MultiAgentEnv(PycroRts3MultiAgentEnv):
+    """A per unit env where agents choose macro-actions, which the env expands into primitive actions over many ticks.
 
+    Actions are (macro, cell, count - 1), see `MacroActions`: idle, move to the cell, harvest in a loop, attack the
+      nearest enemy, or produce count units. The cell & count are ignored by macros that don't use them.
+    Macros walk along distance fields shared by all units & cached across ticks, see `DistanceFields`.
+    A unit's agent is only queried when its macro completes, so one step runs as many ticks as it takes for any unit
+      to need a new macro, & an agent's reward is the sum of its rewards over those ticks.
+    Observations are as `PycroRts3MultiAgentEnv`, with an 'action_mask' of the macros the unit can make.
+    """
 
-class HierarchicalPycroRts3MultiAgentEnv(MultiAgentEnv):
     def __init__(self, env_config=None) -> None:
-        super().__init__()
-        self.game = Game(env_config)
-        map_height = self.game.map.height
-        map_width = self.game.map.width
-
-        self.action_space = spaces.Discrete(NUM_ACTIONS)
-        self.observation_space = spaces.Dict({
-            # 'board': spaces.Box(low=0, high=28, shape=(map_height, map_width), dtype=np.uint8),
-            'board': spaces.Box(low=0, high=28, shape=(map_height * map_width,), dtype=np.uint8),
-            # 'units': spaces.MultiDiscrete(),
-            'num_units': spaces.Box(low=0, high=np.iinfo('uint8').max, shape=(1,), dtype=np.uint8),
-            # 'units': spaces.Dict({
-            #     # 'id': spaces.Box(low=0, high=65535, shape=(1,), dtype=np.uint16),
-            #     # 'position': spaces.Box(low=0, high=255, shape=(2,), dtype=np.uint8),
-            #     # 'type': spaces.Box(low=0, high=255, shape=(1,), dtype=np.uint8),
-            #     # 'hitpoints': spaces.Box(low=0, high=255, shape=(1,), dtype=np.uint8),
-            #     'ids': spaces.MultiDiscrete([1,1]),
-            #     'positions': spaces.MultiDiscrete([1,1]),
-            # }),
-            'player_id': spaces.Box(low=0, high=1, shape=(1,), dtype=np.uint8),
-            'resources': spaces.Box(low=0, high=np.iinfo('uint16').max, shape=(1,), dtype=np.uint16),
-            'time': spaces.Box(low=0, high=np.iinfo('uint8').max, shape=(1,), dtype=np.uint8),
-        })
+        env_config = dict(env_config or {})
+        self.max_produce = env_config.get('max_produce', MAX_PRODUCE)
+        self.macro_timeout = env_config.get('macro_timeout', MACRO_TIMEOUT)
+        super().__init__(env_config)
+        self.macros: Dict[int, MacroAction] = {}  # by unit ID
+        self.returns = np.zeros(len(self.game.players))  # the sum of each player's rewards over the episode
+        self.query_returns: Dict[str, float] = {}  # each agent's player's return when it was last queried
+        self.num_ticks = 0  # ticks run by the last step
+
+    def _act_space(self) -> spaces.Space:
+        return spaces.MultiDiscrete([len(MacroActions), self.obs_height * self.obs_width, self.max_produce])
+
+    def _obs_space(self) -> spaces.Space:
+        obs_space = super()._obs_space()
+        obs_space.spaces['action_mask'] = spaces.Box(low=0, high=1, shape=(len(MacroActions),), dtype=np.uint8)
+        return obs_space
 
     def reset(self):
-        self.game.reset()
-        obs_dict = {}
-        for player in self.game.players():
-            obs = {
-                'board': np.ravel(self.game.get_state()),
-                'num_units': np.array([len(self.game.map.units)]),
-                'player_id': np.array([player.id]),
-                'resources': np.array([player.minerals]),
-                'time': np.array([self.game.time]),
-            }
-            obs_dict[f'high_level_agent_{player.id:02d}'] = obs
+        self.macros.clear()
+        self.returns[:] = 0.0
+        self.query_returns.clear()
+        obs_dict = super().reset()
+        for agent_id in obs_dict:
+            self.query_returns[agent_id] = 0.0
         return obs_dict
 
     def step(self, action_dict):
-        obses = {}
-        for agent, action in action_dict.items():
-            if agent.startswith('high_level_agent'):
-                obs = self._high_level_step(action_dict['high_level_agent'])
-            else:
-                obs = self._low_level_step(action_dict)
-
-        rewards = {self.low_level_agent_id: 0}
-        done = {'__all__': False}
-
-        return obses, rewards, done, {}
-
-    def _high_level_step(self, action):
-        self.game.update()
-        if self.game.is_game_over:
-            rewards = {
-                self.game.winner: self.game.reward_win,
-                1 - self.game.winner: self.game.reward_lose
-            }
-            done = {'__all__': self.game.is_game_over}
-            obs = {}
-        else:
-            print('High level agent sets goal'.format(action))
-            obs = {self.low_level_agent_id: [self.cur_obs, self.current_goal]}
-            rewards = {self.low_level_agent_id: 0}
-            done = {'__all__': False}
-
-        return obs, rewards, done, {}
-
-    def _low_level_step(self, action_dict):
-        print('Low level agent step {}'.format(action_dict))
-        for unit_id, action in action_dict.items():
-            self.game.step(action)
+        for agent_id, action in action_dict.items():
+            player_id, unit_id = [int(x) for x in agent_id.split('.')]
+            self.macros[unit_id] = self._decode_macro(unit_id, action)
+
+        # run the game until a unit needs a new macro
+        self.num_ticks = 0
+        units = self._ready_units()
+        while not units and not self.game.is_game_over:
+            self._step_macros()
+            self.game.update()
+            self._record_history()
+            events = self.game.events
+            for macro in self.macros.values():
+                macro.observe(events)
+            self.returns += self.game.reward_step() + self.game.get_shaped_rewards()
+            self.num_ticks += 1
+            units = self._ready_units()
 
         obs_dict = {}
-        for player in self.game.players():
-            obs = {
-                'board': np.ravel(self.game.get_state()),
-                'num_units': np.array([len(self.game.map.units)]),
-                'player_id': np.array([player.id]),
-                'resources': np.array([player.minerals]),
-                'time': np.array([self.game.time]),
-            }
-            obs_dict[f'high_level_agent_{player.id:02d}'] = obs
-
         rewards = {}
-        if self.game.is_game_over:
-            rewards[self.game.winner] = self.game.reward_win
-            rewards[1 - self.game.winner] = self.game.reward_lose
+        unit_table = self._get_unit_table()
+        self._gather_windows(units)
+        self._compute_fields()
+        for unit in units:
+            agent_id = f'{unit.player_id}.{unit.id}'
+            obs_dict[agent_id] = self._get_obs(unit, unit_table)
+            # agents first queried now, e.g. of new units, made no action to be rewarded for
+            reward = self.returns[unit.player_id] - self.query_returns.get(agent_id, self.returns[unit.player_id])
+            if self.game.is_game_over:
+                if unit.player_id == self.game.winner:
+                    reward += self.game.reward_win()
+                elif (1 - unit.player_id) == self.game.winner:
+                    reward += self.game.reward_lose()
+                else:
+                    reward += self.game.reward_draw()
+            rewards[agent_id] = float(reward)
+            self.query_returns[agent_id] = self.returns[unit.player_id]
 
         game_over = {'__all__': self.game.is_game_over}
 
         return obs_dict, rewards, game_over, {}
+
+    def _decode_macro(self, unit_id: int, action) -> MacroAction:
+        macro, cell, count = [int(x) for x in action]
+        start_time = self.game.time
+        macro = MacroActions(macro)
+        if macro == MacroActions.MOVE_TO:
+            # cells index the observation, which is padded to the largest map
+            return MoveToMacro(unit_id, start_time, cell % self.obs_width, cell // self.obs_width, self.macro_timeout)
+        elif macro == MacroActions.HARVEST:
+            return HarvestMacro(unit_id, start_time, self.macro_timeout)
+        elif macro == MacroActions.ATTACK:
+            return AttackMacro(unit_id, start_time, self.macro_timeout)
+        elif macro == MacroActions.PRODUCE:
+            return ProduceMacro(unit_id, start_time, count + 1, self.macro_timeout)
+        return IdleMacro(unit_id, start_time, self.macro_timeout)
+
+    def _ready_units(self) -> List[Unit]:
+        """The units that need a new macro: those whose macro completed, or that never had one, e.g. new units.
+
+        When the game is over, all units are returned for their final observations.
+        Macros that started this tick run for at least one tick, so every step advances the game.
+        """
+        if self.game.is_game_over:
+            return [unit for unit in self.game.units.values() if not isinstance(unit, Resource)]
+        fields = self.distance_fields[self.map_index]
+        units = []
+        for unit in self.game.units.values():
+            if isinstance(unit, Resource) or unit.position is None or not unit.can_make_action():
+                continue
+            macro = self.macros.get(unit.id)
+            if macro is None or (macro.start_time < self.game.time and macro.is_done(self.game, unit, fields)):
+                units.append(unit)
+        return units
+
+    def _step_macros(self) -> None:
+        """Make the next primitive action of every unit that can act, dropping the macros of dead units."""
+        fields = self.distance_fields[self.map_index]
+        for unit_id in list(self.macros):
+            unit = self.game.units.get(unit_id)
+            if unit is None or unit.position is None:
+                del self.macros[unit_id]
+        for unit in self.game.units.values():
+            macro = self.macros.get(unit.id)
+            if macro is not None and unit.can_make_action():
+                # one at a time, so each macro sees the cells reserved by the moves before it
+                self.game.step(self.game.decode_action(unit.id, macro.next_action(self.game, unit, fields)))
+
+    def _get_obs(self, unit: Unit, unit_table: Optional[np.ndarray]) -> dict:
+        obs = super()._get_obs(unit, unit_table)
+        obs['action_mask'] = self._macro_mask(unit)
+        return obs
+
+    def _macro_mask(self, unit: Unit) -> np.ndarray:
+        code = unit_class_codes[unit.__class__]
+        mask = np.zeros(len(MacroActions), dtype=np.uint8)
+        mask[MacroActions.IDLE.value] = 1
+        mask[MacroActions.MOVE_TO.value] = mask[MacroActions.ATTACK.value] = TYPE_IS_MOBILE[code]
+        mask[MacroActions.HARVEST.value] = TYPE_IS_WORKER[code]
+        mask[MacroActions.PRODUCE.value] = TYPE_PRODUCES[code] > 0
+        return mask
@@ -1,22 +1,73 @@
+from typing import Dict, List, Optional, Sequence
+
 from gym import spaces
 import numpy as np
 from ray.rllib.env.multi_agent_env import MultiAgentEnv
 
 from ..game import Game
-from ..game.actions import ActionEncodings, NoopAction, MoveAction, AttackAction, HarvestAction, ReturnAction, \
-    ProduceAction
-from ..game.position import cardinal_to_euclidean
-from ..game.units import Resource, unit_produces
+from ..game.game import MAP_FILENAME
+from ..game.renderer import Renderer, SCALE
+from ..game.actions import ActionEncodings
+from ..game.distance_fields import DistanceFields, FIELD_NAMES, UNREACHABLE
+from ..game.state import ENTITY_FEATURES
+from ..game.units import Resource, Unit, STAT_SIGHT_RADIUS
 
 num_actions = len(ActionEncodings)
+OBSERVATION_MODE = 'board'
+FRAME_STACK = 1  # boards per observation, the current & previous ones
+DISTANCE_FIELDS = False
 
 
 class PycroRts3MultiAgentEnv(MultiAgentEnv):
     def __init__(self, env_config=None) -> None:
         super().__init__()
-        self.game = Game(env_config)
+        env_config = dict(env_config or {})
+        # with several maps, each is loaded once & one is picked on every reset, observations are padded to the
+        # largest map with a 'valid_cells' plane marking the cells that are on the map
+        self.map_filenames = env_config.get('map_filenames') or [env_config.get('map_filename', MAP_FILENAME)]
+        self.games = [Game(dict(env_config, map_filename=map_filename)) for map_filename in self.map_filenames]
+        self.is_multi_map = 'map_filenames' in env_config
+        self.map_index = 0
+        self.game = self.games[self.map_index]
+        self.map_weights = None
+        self.set_map_weights(env_config.get('map_weights'))
+        self.map_curriculum = env_config.get('map_curriculum')  # callable(env) -> map index or filename
+        self.num_episodes = 0
+        self.rng = np.random.default_rng(env_config.get('map_seed'))
+        self.obs_height = max(game.height() for game in self.games)
+        self.obs_width = max(game.width() for game in self.games)
+        self.valid_cells = []
+        for game in self.games:
+            valid_cells = np.zeros((self.obs_height, self.obs_width), dtype=np.uint8)
+            valid_cells[:game.height(), :game.width()] = 1
+            self.valid_cells.append(valid_cells)
+
+        # 'board' observes the whole map, 'entities' a list of the nearest units, for large sparse maps, & 'window' a
+        # (2r+1)x(2r+1) crop of the board centred on the unit, the same size on every map
+        self.observation_mode = self.game.env_config.get('observation_mode', OBSERVATION_MODE)
+        self.max_entities = self.game.env_config.get('max_entities') or max(len(game.units) for game in self.games)
+        self.window_radius = self.game.env_config.get('window_radius') or \
+            int(self.game.state.utt[:, STAT_SIGHT_RADIUS].max())
+        self.windows: Dict[int, np.ndarray] = {}  # of the units observed this tick, by unit ID
+
+        # with frame stacking, each player's board is written once per tick to a ring buffer, twice, N slots apart,
+        # so the last N boards are always a contiguous slice, copied once per player per tick & shared by its agents
+        self.frame_stack = self.game.env_config.get('frame_stack', FRAME_STACK)
+        assert self.frame_stack == 1 or self.observation_mode == 'board', 'Frame stacking needs board observations'
+        self.history = np.zeros((2 * self.frame_stack, len(self.game.players), self.obs_height, self.obs_width),
+                                dtype=np.uint8)
+        self.history_index = 0  # the slot of the newest board
+        self.stacks: List[np.ndarray] = []  # of this tick, by player ID
+
+        # planes of the distance to the nearest enemy, mineral & own base, computed once per tick for each player
+        self.use_distance_fields = self.game.env_config.get('distance_fields', DISTANCE_FIELDS)
+        assert not self.use_distance_fields or self.observation_mode == 'board', \
+            'Distance fields need board observations'
+        self.distance_fields = [DistanceFields() for _ in self.games]  # keep each map's cached fields
+        self.fields: Dict[int, np.ndarray] = {}  # of this tick, by player ID
         self.action_space = self._act_space()
         self.observation_space = self._obs_space()
+        self.renderer: Optional[Renderer] = None
 
     def _act_space(self) -> spaces.Space:
         return spaces.Discrete(num_actions)
@@ -40,94 +91,104 @@ class PycroRts3MultiAgentEnv(MultiAgentEnv):
     #     })
 
     def _obs_space(self) -> spaces.Space:
+        if self.observation_mode == 'entities':
+            return spaces.Dict({
+                'action_mask': spaces.Box(low=0, high=1, shape=(num_actions,), dtype=np.uint8),
+                'entities': spaces.Box(low=np.iinfo('int8').min, high=np.iinfo('int8').max,
+                                       shape=(self.max_entities, len(ENTITY_FEATURES)), dtype=np.int8),
+                'num_entities': spaces.Box(low=0, high=self.max_entities, shape=(1,), dtype=np.int16),
+            })
+        if self.observation_mode == 'window':
+            side = 2 * self.window_radius + 1
+            return spaces.Dict({
+                'action_mask': spaces.Box(low=0, high=1, shape=(num_actions,), dtype=np.uint8),
+                'window': spaces.Box(low=0, high=28, shape=self._board_shape(side, side), dtype=np.uint8),
+            })
+        board_shape = self._board_shape(self.obs_height, self.obs_width)
+        history = {'history': spaces.Box(low=0, high=28, shape=(self.frame_stack,) + board_shape, dtype=np.uint8)} \
+            if self.frame_stack > 1 else {}
+        fields = {'fields': spaces.Box(low=0, high=UNREACHABLE, shape=(len(FIELD_NAMES),) + board_shape,
+                                       dtype=np.uint8)} if self.use_distance_fields else {}
+        if self.is_multi_map:
+            return spaces.Dict({
+                'action_mask': spaces.Box(low=0, high=1, shape=(num_actions,), dtype=np.uint8),
+                'board': spaces.Box(low=0, high=28, shape=board_shape, dtype=np.uint8),
+                'valid_cells': spaces.Box(low=0, high=1, shape=board_shape, dtype=np.uint8),
+                **history,
+                **fields,
+            })
         return spaces.Dict({
             'action_mask': spaces.Box(low=0, high=1, shape=(num_actions,), dtype=np.uint8),
             # 'avail_actions': spaces.Box(-10, 10, shape=(num_actions, 2)),
-            'board': spaces.Box(low=0, high=28, shape=(self.game.height() * self.game.width(),), dtype=np.uint8),
+            'board': spaces.Box(low=0, high=28, shape=board_shape, dtype=np.uint8),
             # 'player_id': spaces.Box(low=0, high=1, shape=(1,), dtype=np.uint8),
             # 'unit_id': spaces.Box(low=0, high=np.iinfo('uint16').max, shape=(1,), dtype=np.uint16),
             # 'resources': spaces.Box(low=0, high=np.iinfo('uint16').max, shape=(1,), dtype=np.uint16),
             # 'time': spaces.Box(low=0, high=np.iinfo('uint16').max, shape=(1,), dtype=np.uint16),
+            **history,
+            **fields,
         })
 
+    def set_map_weights(self, weights: Optional[Sequence[float]]) -> None:
+        """Set the probability of picking each map on reset, e.g. from a curriculum callback.
+
+        :param weights: A weight per map in `map_filenames`, normalised to sum to 1, or None to pick uniformly.
+        """
+        if weights is None:
+            self.map_weights = None
+        else:
+            assert len(weights) == len(self.games), 'There must be one weight per map'
+            self.map_weights = np.asarray(weights, dtype=np.float64) / np.sum(weights)
+
+    def _choose_map(self) -> int:
+        if self.map_curriculum is not None:
+            choice = self.map_curriculum(self)
+            return self.map_filenames.index(choice) if isinstance(choice, str) else int(choice)
+        if self.map_weights is not None:
+            return int(self.rng.choice(len(self.games), p=self.map_weights))
+        return int(self.rng.integers(len(self.games)))
+
     def reset(self):
+        if len(self.games) > 1:
+            self.map_index = self._choose_map()
+            self.game = self.games[self.map_index]
+        self.num_episodes += 1
         self.game.reset()
+        self._record_history(is_reset=True)
         obs_dict = {}
-        for unit in self.game.units.values():
-            if isinstance(unit, Resource):
-                continue  # don't build observations for minerals
+        units = [unit for unit in self.game.units.values() if not isinstance(unit, Resource)]  # not minerals
+        unit_table = self._get_unit_table()
+        self._gather_windows(units)
+        self._compute_fields()
+        for unit in units:
             agent_id = f'{unit.player_id}.{unit.id}'
-            obs_dict[agent_id] = {
-                'action_mask': self.game.get_action_mask(unit),
-                'board': self._get_board(unit.id),
-                # 'player_id': np.array([unit.player_id]),
-                # 'unit_id': np.array([unit.id]),
-                # 'resources': np.array([self.game.players[unit.player_id].minerals]),
-                # 'time': np.array([self.game.time]),
-            }
+            obs_dict[agent_id] = self._get_obs(unit, unit_table)
         return obs_dict
 
     def step(self, action_dict):
-        # convert action indexes into game action objects and enqueue
-        for agent_id, action_id in action_dict.items():
-            player_id, unit_id = [int(x) for x in agent_id.split('.')]
-            unit = self.game.get_unit(unit_id)
-            action_type = ActionEncodings(action_id).name
-            start_time = self.game.time
-            if action_type == 'NOOP':
-                end_time = self.game.time
-                action = NoopAction(unit_id, unit.position, start_time, end_time)
-            else:
-                position = cardinal_to_euclidean(unit.position, action_type)
-                if action_type.startswith('MOVE'):
-                    end_time = self.game.time + unit.move_time - 1
-                    action = MoveAction(unit_id, position, start_time, end_time)
-                elif action_type.startswith('ATTACK'):
-                    end_time = self.game.time + unit.attack_time - 1
-                    # for target in self.game.units.values():
-                    #     if target.position == position:
-                    #         break
-                    # else:
-                    #     raise ValueError
-                    # action = AttackAction(unit_id, position, start_time, end_time, target.id)
-                    action = AttackAction(unit_id, position, start_time, end_time)
-                elif action_type.startswith('HARVEST'):
-                    end_time = self.game.time + unit.harvest_time - 1
-                    action = HarvestAction(unit_id, position, start_time, end_time)
-                elif action_type.startswith('RETURN'):
-                    end_time = self.game.time + unit.return_time - 1
-                    action = ReturnAction(unit_id, position, start_time, end_time)
-                elif action_type.startswith('PRODUCE'):
-                    produces = unit_produces[unit.__class__]
-                    produce_type = produces[0]
-                    end_time = self.game.time + produce_type.produce_time - 1
-                    action = ProduceAction(unit_id, position, start_time, end_time, produce_type)
-                else:
-                    raise ValueError('Invalid action')
-            self.game.step(action)
+        # enqueue the joint action of every agent, validated together
+        unit_ids = [int(agent_id.split('.')[1]) for agent_id in action_dict]
+        self.game.step_many(unit_ids, [int(action_id) for action_id in action_dict.values()])
 
         # update the game with actions begun & completed this step
         self.game.update()
+        self._record_history()
 
         # generate the return values, <obs, rew, done, info>
         obs_dict = {}
         rewards = {}
-        for unit in self.game.units.values():
-            if isinstance(unit, Resource):
-                continue  # don't build observations for minerals
-            if not unit.can_make_action() and not self.game.is_game_over:
-                # units must finish an action before starting a new one
-                # unless the game is over, in which case we must send RLlib terminal obs+rewards or else it gets angry
-                continue
+        shaped_rewards = self.game.get_shaped_rewards()
+        # units must finish an action before starting a new one
+        # unless the game is over, in which case we must send RLlib terminal obs+rewards or else it gets angry
+        # & don't build observations for minerals
+        units = [unit for unit in self.game.units.values() if not isinstance(unit, Resource) and
+                 (unit.can_make_action() or self.game.is_game_over)]
+        unit_table = self._get_unit_table()
+        self._gather_windows(units)
+        self._compute_fields()
+        for unit in units:
             agent_id = f'{unit.player_id}.{unit.id}'
-            obs_dict[agent_id] = {
-                'action_mask': self.game.get_action_mask(unit),
-                'board': self._get_board(unit.id),
-                # 'player_id': np.array([unit.player_id]),
-                # 'unit_id': np.array([unit.id]),
-                # 'resources': np.array([self.game.players[unit.player_id].minerals]),
-                # 'time': np.array([self.game.time]),
-            }
+            obs_dict[agent_id] = self._get_obs(unit, unit_table)
 
             if self.game.is_game_over:
                 if unit.player_id == self.game.winner:
@@ -138,25 +199,169 @@ class PycroRts3MultiAgentEnv(MultiAgentEnv):
                     reward = self.game.reward_draw()
             else:
                 reward = self.game.reward_step()
-            rewards[agent_id] = reward
+            rewards[agent_id] = reward + float(shaped_rewards[unit.player_id])
 
         game_over = {'__all__': self.game.is_game_over}
 
         return obs_dict, rewards, game_over, {}
 
+    def render(self, mode='rgb_array') -> np.ndarray:
+        """Render the current game as an RGB image of shape (map_height * scale, map_width * scale, 3)."""
+        if self.renderer is None:
+            self.renderer = Renderer(self.game.env_config.get('render_scale', SCALE))
+        return self.renderer.render(self.game.state)
+
+    def _get_obs(self, unit: Unit, unit_table: Optional[np.ndarray]) -> dict:
+        if self.observation_mode == 'entities':
+            entities, num_entities = self.game.state.to_entities(unit.id, self.max_entities, unit_table)
+            return {
+                'action_mask': self.game.get_action_mask(unit),
+                'entities': entities,
+                'num_entities': np.array([num_entities], dtype=np.int16),
+            }
+        if self.observation_mode == 'window':
+            return {
+                'action_mask': self.game.get_action_mask(unit),
+                'window': self.windows[unit.id],
+            }
+        if self.is_multi_map:
+            return {
+                'action_mask': self.game.get_action_mask(unit),
+                'board': self._get_board(unit.id),
+                'valid_cells': self._get_valid_cells(),
+                **self._get_history(unit.player_id),
+                **self._get_fields(unit.player_id),
+            }
+        return {
+            'action_mask': self.game.get_action_mask(unit),
+            'board': self._get_board(unit.id),
+            # 'player_id': np.array([unit.player_id]),
+            # 'unit_id': np.array([unit.id]),
+            # 'resources': np.array([self.game.players[unit.player_id].minerals]),
+            # 'time': np.array([self.game.time]),
+            **self._get_history(unit.player_id),
+            **self._get_fields(unit.player_id),
+        }
+
+    def _get_unit_table(self) -> Optional[np.ndarray]:
+        """Build the unit table once per tick, shared by all agents' entity observations."""
+        return self.game.state.to_unit_table() if self.observation_mode == 'entities' else None
+
+    def _gather_windows(self, units: List[Unit]) -> None:
+        """Crop the board around each unit for 'window' observations, for all the units in one gather.
+
+        Each player's board is built once & padded by the window radius with walls, then every crop is read with a
+          single fancy index of shape (len(units), 2r+1, 2r+1), rather than slicing per unit.
+        Cells are encoded as `to_array_player()`, from the perspective of the unit's player; the unit is the centre.
+        Dead units, observed when the game ends, get a window of 0s.
+        """
+        if self.observation_mode != 'window':
+            return
+        state = self.game.state
+        radius = self.window_radius
+        side = 2 * radius + 1
+        boards = np.ones((len(self.game.players), state.height + 2 * radius, state.width + 2 * radius),
+                         dtype=np.uint8)  # off the map is wall
+        for player in self.game.players:
+            boards[player.id, radius:radius + state.height, radius:radius + state.width] = \
+                state.to_array_player(player.id)
+        alive = np.array([unit.position is not None for unit in units], dtype=bool)
+        players = np.array([unit.player_id for unit in units], dtype=np.intp)
+        ys = np.array([unit.y if unit.position is not None else 0 for unit in units], dtype=np.intp)
+        xs = np.array([unit.x if unit.position is not None else 0 for unit in units], dtype=np.intp)
+        offsets = np.arange(side)
+        windows = boards[players[:, None, None], ys[:, None, None] + offsets[:, None], xs[:, None, None] + offsets]
+        windows[~alive] = 0
+        windows = windows.reshape((len(units),) + self._board_shape(side, side))
+        self.windows = {unit.id: window for unit, window in zip(units, windows)}
+
+    def _record_history(self, is_reset: bool = False) -> None:
+        """Write each player's board for this tick to the frame stack ring buffer, filling it on reset."""
+        if self.frame_stack == 1:
+            return
+        height, width = self.game.height(), self.game.width()
+        boards = np.stack([self.game.state.to_array_player(player.id) for player in self.game.players])
+        if is_reset:
+            self.history[:] = 0
+            self.history[:, :, :height, :width] = boards
+            self.history_index = self.frame_stack - 1
+        else:
+            self.history_index = (self.history_index + 1) % self.frame_stack
+            self.history[self.history_index, :, :height, :width] = boards
+            self.history[self.history_index + self.frame_stack, :, :height, :width] = boards
+        # copies, as the ring buffer is overwritten next tick while observations are kept, e.g. in sample batches
+        start = self.history_index + 1
+        shape = (self.frame_stack,) + self._board_shape(self.obs_height, self.obs_width)
+        self.stacks = [self.history[start:start + self.frame_stack, player.id].reshape(shape).copy()
+                       for player in self.game.players]
+
+    def _get_history(self, player_id: int) -> dict:
+        """A player's last `frame_stack` boards, oldest first, shared by all the player's agents this tick.
+
+        Boards are encoded as `to_array_player()`, as the unit itself is only marked in the current 'board'.
+        """
+        if self.frame_stack == 1:
+            return {}
+        return {'history': self.stacks[player_id]}
+
+    def _compute_fields(self) -> None:
+        """Compute each player's distance planes for this tick, padded to the largest map, shared by all its agents."""
+        if not self.use_distance_fields:
+            return
+        distance_fields = self.distance_fields[self.map_index]
+        height, width = self.game.height(), self.game.width()
+        self.fields = {}
+        for player in self.game.players:
+            fields = np.full((len(FIELD_NAMES), self.obs_height, self.obs_width), UNREACHABLE, dtype=np.uint8)
+            fields[:, :height, :width] = distance_fields.planes(self.game.state, player.id, self.game.time)
+            self.fields[player.id] = fields.reshape((len(FIELD_NAMES),) +
+                                                    self._board_shape(self.obs_height, self.obs_width))
+
+    def _get_fields(self, player_id: int) -> dict:
+        return {'fields': self.fields[player_id]} if self.use_distance_fields else {}
+
+    def _board_shape(self, height: int, width: int) -> tuple:
+        """The shape of a board observation, flattened."""
+        return height * width,
+
     def _get_board(self, unit_id: int) -> np.array:
-        return np.ravel(self.game.get_state(unit_id))
+        return np.ravel(self._pad(self.game.get_state(unit_id)))
+
+    def _get_valid_cells(self) -> np.array:
+        return np.ravel(self.valid_cells[self.map_index])
+
+    def _pad(self, board: np.ndarray) -> np.ndarray:
+        """Pad a board to the size of the largest map, the map is in the top left corner."""
+        if board.shape == (self.obs_height, self.obs_width):
+            return board
+        padded = np.zeros((self.obs_height, self.obs_width), dtype=board.dtype)
+        padded[:board.shape[0], :board.shape[1]] = board
+        return padded
 
 
 class SquarePycroRts3MultiAgentEnv(PycroRts3MultiAgentEnv):
     def _obs_space(self) -> spaces.Space:
+        if self.observation_mode != 'board':
+            return super()._obs_space()
         return spaces.Dict({
             'action_mask': spaces.Box(low=0, high=1, shape=(num_actions,), dtype=np.uint8),
-            'board': spaces.Box(low=0, high=28, shape=(self.game.height(), self.game.width()), dtype=np.uint8),
+            'board': spaces.Box(low=0, high=28, shape=(self.obs_height, self.obs_width), dtype=np.uint8),
+            **({'valid_cells': spaces.Box(low=0, high=1, shape=(self.obs_height, self.obs_width), dtype=np.uint8)}
+               if self.is_multi_map else {}),
+            **({'history': spaces.Box(low=0, high=28, shape=(self.frame_stack, self.obs_height, self.obs_width),
+                                      dtype=np.uint8)} if self.frame_stack > 1 else {}),
+            **({'fields': spaces.Box(low=0, high=UNREACHABLE, shape=(len(FIELD_NAMES), self.obs_height, self.obs_width),
+                                     dtype=np.uint8)} if self.use_distance_fields else {}),
             'player_id': spaces.Box(low=0, high=1, shape=(1,), dtype=np.uint8),
             'resources': spaces.Box(low=0, high=np.iinfo('uint16').max, shape=(1,), dtype=np.uint16),
             'time': spaces.Box(low=0, high=np.iinfo('uint16').max, shape=(1,), dtype=np.uint16),
         })
 
+    def _board_shape(self, height: int, width: int) -> tuple:
+        return height, width
+
     def _get_board(self, unit_id: int) -> np.array:
-        return self.game.get_state(unit_id)
+        return self._pad(self.game.get_state(unit_id))
+
+    def _get_valid_cells(self) -> np.array:
+        return self.valid_cells[self.map_index]
@@ -1,44 +1,59 @@
-from typing import Tuple
+from typing import Optional, Tuple
 
 import gym
 from gym import spaces
 import numpy as np
 
 from ..game import Game
-from ..game import ActionTypes
+from ..game.actions import ActionEncodings
+from ..game.renderer import Renderer, SCALE
+from ..game.units import Resource
 
 
 class PycroRts3Env(gym.Env):
-    metadata = {'render.modes': ['human']}
+    """A single agent env, where the agent is player 0 & player 1 makes no actions.
+
+    The agent chooses one action per cell, as `GridPycroRts3MultiAgentEnv`, which is applied to its unit in that cell if
+      it can make an action, else ignored.
+    """
+    metadata = {'render.modes': ['human', 'rgb_array']}
 
     def __init__(self, env_config=None) -> None:
         super().__init__()
         self.game = Game(env_config)
-        map_height = self.game.map.height
-        map_width = self.game.map.width
-        self.action_space = spaces.Discrete(len(ActionTypes))
+        map_height = self.game.height()
+        map_width = self.game.width()
+        self.action_space = spaces.MultiDiscrete([len(ActionEncodings)] * (map_height * map_width))
         self.observation_space = spaces.Box(low=0, high=255, shape=(map_height, map_width), dtype=np.uint8)
-        self.time = 0
-        self.game_over = False
-        self.winner = None
+        self.renderer: Optional[Renderer] = None
 
     def reset(self) -> np.ndarray:
-        self.time = 0
-        self.game_over = False
-        self.winner = None
-
-        # state = self.game.reset()
-        state = self.map[:]
-
-        return state
+        self.game.reset()
+        return self.game.get_player_state(0)
 
     def step(self, action) -> Tuple[np.ndarray, float, bool, dict]:
-        # return self.game.step(action)
-        next_state = self.map[:]
-        reward = 0.0
-
-        return next_state, reward, self.game_over, {}
-
-    def render(self, mode='human') -> None:
-        print('foo')
-        # self.game.render()
+        action = np.asarray(action)
+        units = [unit for unit in self.game.units.values() if unit.player_id == 0 and not isinstance(unit, Resource)
+                 and unit.can_make_action()]
+        width = self.game.width()
+        self.game.step_many([unit.id for unit in units], [int(action[unit.y * width + unit.x]) for unit in units])
+        self.game.update()
+
+        if not self.game.is_game_over:
+            reward = self.game.reward_step()
+        elif self.game.winner == 0:
+            reward = self.game.reward_win()
+        elif self.game.winner == 1:
+            reward = self.game.reward_lose()
+        else:
+            reward = self.game.reward_draw()
+        reward += float(self.game.get_shaped_rewards()[0])
+
+        return self.game.get_player_state(0), reward, self.game.is_game_over, {}
+
+    def render(self, mode='human') -> Optional[np.ndarray]:
+        if mode == 'rgb_array':
+            if self.renderer is None:
+                self.renderer = Renderer(self.game.env_config.get('render_scale', SCALE))
+            return self.renderer.render(self.game.state)
+        print(self.game.state.to_array_global())
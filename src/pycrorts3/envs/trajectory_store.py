@@ -0,0 +1,216 @@
+import json
+import os
+import socket
+import uuid
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from gym import spaces
+import numpy as np
+
+SHARD_SIZE = 2 ** 16  # rows per shard file
+META_FILENAME = 'meta.json'
+STORE_VERSION = 1
+
+
+def space_columns(observation_space: spaces.Space, action_space: spaces.Space) -> Dict[str, Tuple[np.dtype, tuple]]:
+    """Get the (dtype, shape) of each column of a transition, from an env's spaces.
+
+    :param observation_space: A `Box` or a `Dict` of `Box`es, whose columns are named 'obs' or 'obs.<key>'.
+    :param action_space: A `Discrete`, `MultiDiscrete` or `Box`.
+    :return: The columns, by name.
+    """
+    columns = {}
+    if isinstance(observation_space, spaces.Dict):
+        for key, space in observation_space.spaces.items():
+            columns[f'obs.{key}'] = (np.dtype(space.dtype), tuple(space.shape))
+    else:
+        columns['obs'] = (np.dtype(observation_space.dtype), tuple(observation_space.shape))
+    if isinstance(action_space, spaces.Discrete):
+        columns['action'] = (np.min_scalar_type(action_space.n - 1), ())
+    elif isinstance(action_space, spaces.MultiDiscrete):
+        columns['action'] = (np.min_scalar_type(int(np.max(action_space.nvec)) - 1), tuple(action_space.shape))
+    else:
+        columns['action'] = (np.dtype(action_space.dtype), tuple(action_space.shape))
+    columns['reward'] = (np.dtype(np.float32), ())
+    columns['done'] = (np.dtype(bool), ())
+    return columns
+
+
+class TrajectoryWriter:
+    """Append transitions to memory-mapped shards, for offline RL & behavioural cloning.
+
+    Each column is a preallocated `.npy` file of `shard_size` rows per shard, filled in place through `np.memmap`.
+    A shard is a directory named `<writer ID>-<shard number>` holding a file per column & a `meta.json` with the
+      number of rows written, which is only replaced atomically, so readers never see partially written rows.
+    Writers never share files, so every process (e.g. each rollout worker) can have its own writer without locking.
+    """
+
+    def __init__(self, directory: str, observation_space: spaces.Space, action_space: spaces.Space,
+                 shard_size: int = SHARD_SIZE, writer_id: Optional[str] = None) -> None:
+        """
+        :param directory: The directory of the store, shared by all writers.
+        :param observation_space: The env's observation space, see `space_columns()`.
+        :param action_space: The env's action space.
+        :param shard_size: The number of rows per shard.
+        :param writer_id: A name for this writer's shards, defaults to the host name, process ID & a random suffix, so
+          writers in one process don't collide. Shards of an earlier writer with the same name are kept & numbered
+          after.
+        """
+        super().__init__()
+        self.directory = directory
+        self.columns = space_columns(observation_space, action_space)
+        self.shard_size = int(shard_size)
+        self.writer_id = writer_id or f'{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:8]}'
+        self.num_shards = 0
+        self.shard: Dict[str, np.ndarray] = {}
+        self.shard_path: Optional[str] = None
+        self.num_rows = 0  # in the current shard
+        os.makedirs(directory, exist_ok=True)
+
+    def add(self, obs, action, reward: float, done: bool) -> None:
+        """Append a transition.
+
+        :param obs: An observation, or dict of observations, from the observation space.
+        :param action: The action taken.
+        :param reward: The reward received.
+        :param done: Whether the episode ended.
+        """
+        if self.shard_path is None or self.num_rows == self.shard_size:
+            self._next_shard()
+        row = self.num_rows
+        for name, value in self._split(obs, action, reward, done).items():
+            self.shard[name][row] = value
+        self.num_rows += 1
+
+    def add_batch(self, obs, actions, rewards, dones) -> None:
+        """Append a batch of transitions, each argument with a leading batch dimension."""
+        batch = self._split(obs, actions, rewards, dones)
+        size = len(batch['reward'])
+        start = 0
+        while start < size:
+            if self.shard_path is None or self.num_rows == self.shard_size:
+                self._next_shard()
+            count = min(size - start, self.shard_size - self.num_rows)
+            for name, values in batch.items():
+                self.shard[name][self.num_rows:self.num_rows + count] = values[start:start + count]
+            self.num_rows += count
+            start += count
+
+    def flush(self) -> None:
+        """Make the rows written so far visible to readers."""
+        if self.shard_path is None:
+            return
+        for column in self.shard.values():
+            column.flush()
+        meta = {
+            'version': STORE_VERSION,
+            'num_rows': self.num_rows,
+            'columns': {name: [dtype.str, list(shape)] for name, (dtype, shape) in self.columns.items()},
+        }
+        tmp_path = os.path.join(self.shard_path, META_FILENAME + '.tmp')
+        with open(tmp_path, 'w') as f:
+            json.dump(meta, f)
+        os.replace(tmp_path, os.path.join(self.shard_path, META_FILENAME))
+
+    def close(self) -> None:
+        self.flush()
+        self.shard = {}
+        self.shard_path = None
+
+    def _split(self, obs, action, reward, done) -> Dict[str, np.ndarray]:
+        values = {f'obs.{key}': value for key, value in obs.items()} if isinstance(obs, dict) else {'obs': obs}
+        values.update({'action': action, 'reward': reward, 'done': done})
+        return {name: np.asarray(value) for name, value in values.items()}
+
+    def _next_shard(self) -> None:
+        self.close()
+        while True:
+            self.shard_path = os.path.join(self.directory, f'{self.writer_id}-{self.num_shards:05d}')
+            self.num_shards += 1
+            try:
+                os.makedirs(self.shard_path)
+                break
+            except FileExistsError:
+                continue  # written by an earlier writer with the same ID
+        self.shard = {name: np.lib.format.open_memmap(os.path.join(self.shard_path, f'{name}.npy'), mode='w+',
+                                                       dtype=dtype, shape=(self.shard_size,) + shape)
+                      for name, (dtype, shape) in self.columns.items()}
+        self.num_rows = 0
+
+    def __enter__(self) -> 'TrajectoryWriter':
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+
+class TrajectoryReader:
+    """Read the shards of a store written by `TrajectoryWriter`s, without loading them into memory.
+
+    Columns are opened with `np.load(mmap_mode='r')`, so the store can be much larger than RAM & only the rows
+      actually read are paged in.
+    """
+
+    def __init__(self, directory: str, seed=None) -> None:
+        """
+        :param directory: The directory of the store.
+        :param seed: Seeds the sampling of minibatches.
+        """
+        super().__init__()
+        self.directory = directory
+        self.rng = np.random.default_rng(seed)
+        self.shards: List[Dict[str, np.ndarray]] = []
+        self.offsets = np.zeros(1, dtype=np.int64)  # the first row of each shard, then the total
+        self.refresh()
+
+    def refresh(self) -> None:
+        """Open shards written or extended since the store was last opened."""
+        shards = []
+        for name in sorted(os.listdir(self.directory)):
+            meta_path = os.path.join(self.directory, name, META_FILENAME)
+            if not os.path.isfile(meta_path):
+                continue  # not flushed yet
+            with open(meta_path) as f:
+                meta = json.load(f)
+            assert meta['version'] == STORE_VERSION, 'Unsupported trajectory store version'
+            if meta['num_rows'] == 0:
+                continue
+            shards.append({column: np.load(os.path.join(self.directory, name, f'{column}.npy'),
+                                           mmap_mode='r')[:meta['num_rows']]
+                           for column in meta['columns']})
+        self.shards = shards
+        self.offsets = np.cumsum([0] + [len(shard['reward']) for shard in shards])
+
+    @property
+    def columns(self) -> List[str]:
+        return list(self.shards[0]) if self.shards else []
+
+    def __len__(self) -> int:
+        return int(self.offsets[-1])
+
+    def get(self, rows: np.ndarray) -> Dict[str, np.ndarray]:
+        """Gather rows from across the shards.
+
+        :param rows: The global indexes of the rows.
+        :return: A dict of arrays, one per column, with a leading dimension of `len(rows)`.
+        """
+        rows = np.asarray(rows)
+        shard_ids = np.searchsorted(self.offsets, rows, side='right') - 1
+        batch = {name: np.empty((len(rows),) + column.shape[1:], dtype=column.dtype)
+                 for name, column in self.shards[0].items()}
+        for shard_id in np.unique(shard_ids):
+            selected = np.flatnonzero(shard_ids == shard_id)
+            local_rows = rows[selected] - self.offsets[shard_id]
+            for name, column in self.shards[shard_id].items():
+                batch[name][selected] = column[local_rows]
+        return batch
+
+    def sample(self, batch_size: int) -> Dict[str, np.ndarray]:
+        """Sample a minibatch of rows uniformly at random, with replacement."""
+        return self.get(self.rng.integers(len(self), size=batch_size))
+
+    def iter_chunks(self, chunk_size: int) -> Iterator[Dict[str, np.ndarray]]:
+        """Iterate over the store in order, yielding read-only views of up to `chunk_size` rows, without copying."""
+        for shard in self.shards:
+            for start in range(0, len(shard['reward']), chunk_size):
+                yield {name: column[start:start + chunk_size] for name, column in shard.items()}
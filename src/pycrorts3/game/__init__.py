@@ -1,9 +1,20 @@
 from .actions import ActionTypes, ActionEncodings, Action, NoopAction, MoveAction, AttackAction, HarvestAction, \
     ProduceAction
+from .distance_fields import DistanceFields, distance_field
+from .events import EventBuffer, EventTypes, EVENT_DTYPE
 from .game import Game
+from .golden_trace import GameBackend, VectorGameBackend, check_trace, check_trace_batch, check_traces, record_trace, \
+    record_traces
+from .map_generator import generate_map, generate_maps
+from .macro_actions import MacroActions, MacroAction
+from .map_layout import MapLayout
+from .microrts_trace import import_traces, load_imported_trace, read_trace
 from .state import State
 from .player import Player
 from .position import Position
+from .renderer import FrameWriter, Renderer
 from .terrain import Terrain, EmptyTerrain, WallTerrain
 from .units import Unit, WorkerUnit, LightUnit, HeavyUnit, RangedUnit, BaseBuilding, BarracksBuilding, unit_type_table, \
-    unit_classes, UnitEncoding
+    unit_classes, UnitEncoding, compile_unit_type_table
+from .vector_game import VectorGame
+from .zobrist import TranspositionTable, zobrist_key
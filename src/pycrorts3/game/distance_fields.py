@@ -0,0 +1,167 @@
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+from .state import State
+from .units import BASE_CODE, RESOURCE_CODE, TYPE_IS_MOBILE
+
+FIELD_NAMES = ['enemy', 'mineral', 'base']  # the planes of `DistanceFields.planes()`
+MAX_DISTANCE = 254  # planes clip distances to fit uint8
+UNREACHABLE = 255
+MAX_CACHED_CELLS = 4096
+MAX_CELL_SEARCHES = 2  # per field update, fields with more uncached sources search from all of them at once instead
+
+
+def passable_cells(state: State) -> np.ndarray:
+    """Cells without walls, buildings or minerals, mobile units are ignored as they move out of the way."""
+    return (state.terrain == 0) & ~((state.unit_map > 0) & ~TYPE_IS_MOBILE[state.unit_map])
+
+
+def unreachable(field: np.ndarray) -> int:
+    return field.size + 1
+
+
+def distance_field(passable: np.ndarray, ys: np.ndarray, xs: np.ndarray,
+                   targets: Optional[np.ndarray] = None) -> np.ndarray:
+    """The number of steps from every cell to the nearest source cell, by breadth first search through passable cells.
+
+    The search grows a wavefront from all the sources at once, with the board packed into the bits of a Python int,
+      so each step of distance is a handful of shifts & masks over the whole board, & each bit of the distances is
+      gathered into a board of its own.
+    Each row has an extra, impassable bit so shifting left & right doesn't wrap onto the next row.
+
+    :param passable: A boolean array of shape (map_height, map_width).
+    :param ys: The rows of the source cells, which need not be passable.
+    :param xs: The columns of the source cells.
+    :param targets: If given, stop once these cells & their neighbours are reached, rather than the whole map.
+    :return: An int32 array of shape (map_height, map_width), `unreachable()` for cells with no path to a source.
+    """
+    height, width = passable.shape
+    stride = width + 1
+    board = np.zeros((height, stride), dtype=bool)
+
+    def to_bits(cells: np.ndarray) -> int:
+        board[:, :width] = cells
+        return int.from_bytes(np.packbits(board, bitorder='little').tobytes(), 'little')
+
+    passable_bits = to_bits(passable)
+    sources = np.zeros(passable.shape, dtype=bool)
+    sources[ys, xs] = True
+    frontier = reached = to_bits(sources)
+    unreached = to_bits(targets) if targets is not None else -1  # -1 never runs out
+    planes = []  # bit k of the distance of every reached cell, so only log2(max distance) boards are unpacked
+    distance = 0
+    while frontier:
+        unreached &= ~reached
+        grown = frontier | frontier << 1 | frontier >> 1 | frontier << stride | frontier >> stride
+        frontier = grown & passable_bits & ~reached
+        reached |= frontier
+        distance += 1
+        if distance.bit_length() > len(planes):
+            planes.append(0)
+        for k in range(len(planes)):
+            if distance >> k & 1:
+                planes[k] |= frontier
+        if not unreached:
+            break  # the targets were reached before this step, which reached their neighbours
+
+    num_bytes = (height * stride + 7) // 8
+    packed = np.frombuffer(b''.join(bits.to_bytes(num_bytes, 'little') for bits in [reached] + planes), dtype=np.uint8)
+    bits = np.unpackbits(packed.reshape(-1, num_bytes), axis=1, bitorder='little')[:, :height * stride]
+    distance = np.where(bits[0] != 0, (1 << np.arange(len(planes), dtype=np.int32)) @ bits[1:], unreachable(passable))
+    return distance.astype(np.int32).reshape(height, stride)[:, :width]
+
+
+class DistanceFields:
+    """Distance to the nearest enemy unit, mineral patch & own base, as planes of each player's observations.
+
+    Planes are computed at most once per tick & player, to be shared by all the player's agents.
+    A field is the minimum of the fields of its source cells, each a search from that one cell, cached until a wall,
+      building or mineral patch changes the passable cells. As minerals & bases rarely move, and few units move each
+      tick, most ticks only search from the few cells units just moved into.
+    Fields with more uncached sources, e.g. after the passable cells change, are one search from all their sources at
+      once instead, & cache a few of the sources' fields for later ticks.
+    Fields whose sources didn't change at all are reused as they are.
+    """
+
+    def __init__(self, max_cached_cells: int = MAX_CACHED_CELLS) -> None:
+        super().__init__()
+        self.max_cached_cells = max_cached_cells
+        self.passable_key = None
+        self.cell_fields: Dict[int, np.ndarray] = {}  # the field of each source cell, by flat index, least recent first
+        self.fields: Dict[tuple, Tuple[np.ndarray, np.ndarray]] = {}  # the source cells & field, by name & player
+        self.tick = None
+        self.tick_planes: Dict[int, np.ndarray] = {}  # by player ID
+        self.searches = 0  # to measure how incremental updates are
+
+    def planes(self, state: State, player_id: int, time: int) -> np.ndarray:
+        """Get a player's distance planes.
+
+        :param state: The state of the game.
+        :param player_id: The ID of the player.
+        :param time: The game time, planes are computed once per `state` & tick.
+        :return: A uint8 array of shape (len(FIELD_NAMES), map_height, map_width), of distances clipped to
+          `MAX_DISTANCE`, `UNREACHABLE` where there are no sources or none can be reached.
+        """
+        if self.tick != (id(state), time):
+            self.tick = (id(state), time)
+            self.tick_planes = {}
+        planes = self.tick_planes.get(player_id)
+        if planes is None:
+            passable = self._passable(state)
+            table = state.to_unit_table()  # id, type, owner, x, y, hitpoints, resources, busy
+            types, owners, cells = table[:, 1], table[:, 2], table[:, 4] * state.width + table[:, 3]
+            sources = [owners == 1 - player_id, types == RESOURCE_CODE, (owners == player_id) & (types == BASE_CODE)]
+            planes = np.stack([self._field((name, player_id), passable, np.unique(cells[is_source]))
+                               for name, is_source in zip(FIELD_NAMES, sources)])
+            self.tick_planes[player_id] = planes
+        return planes
+
+    def cell_field(self, state: State, x: int, y: int) -> np.ndarray:
+        """Get the distance to a cell, e.g. to walk to it, cached until the passable cells change.
+
+        :return: A uint8 array of shape (map_height, map_width), as the planes of `planes()`.
+        """
+        return self._cell_field(self._passable(state), y * state.width + x)
+
+    def _passable(self, state: State) -> np.ndarray:
+        """Get the passable cells, dropping the cached fields if they changed."""
+        passable = passable_cells(state)
+        passable_key = passable.shape, passable.tobytes()
+        if passable_key != self.passable_key:
+            self.passable_key = passable_key
+            self.cell_fields = {}
+            self.fields = {}
+        return passable
+
+    def _field(self, key: tuple, passable: np.ndarray, cells: np.ndarray) -> np.ndarray:
+        cached = self.fields.get(key)
+        if cached is not None and np.array_equal(cached[0], cells):
+            return cached[1]
+        uncached = [cell for cell in cells.tolist() if cell not in self.cell_fields]
+        if len(cells) == 0:
+            field = np.full(passable.shape, UNREACHABLE, dtype=np.uint8)
+        elif len(uncached) <= MAX_CELL_SEARCHES:
+            field = np.minimum.reduce([self._cell_field(passable, cell) for cell in cells.tolist()])
+        else:
+            field = self._search(passable, cells)
+            for cell in uncached[:MAX_CELL_SEARCHES]:  # towards updating later ticks incrementally
+                self._cell_field(passable, cell)
+        self.fields[key] = (cells, field)
+        return field
+
+    def _cell_field(self, passable: np.ndarray, cell: int) -> np.ndarray:
+        field = self.cell_fields.pop(cell, None)
+        if field is None:
+            if len(self.cell_fields) >= self.max_cached_cells:
+                del self.cell_fields[next(iter(self.cell_fields))]  # the least recently used
+            field = self._search(passable, np.array([cell]))
+        self.cell_fields[cell] = field  # as the most recently used
+        return field
+
+    def _search(self, passable: np.ndarray, cells: np.ndarray) -> np.ndarray:
+        """Search from some source cells at once, as a plane of `planes()`."""
+        distance = distance_field(passable, cells // passable.shape[1], cells % passable.shape[1])
+        self.searches += 1
+        field = np.where(distance == unreachable(distance), UNREACHABLE, np.minimum(distance, MAX_DISTANCE))
+        return field.astype(np.uint8)
@@ -0,0 +1,74 @@
+from enum import Enum
+
+import numpy as np
+
+EventTypes = Enum(
+    'EventTypes',
+    ['MOVE',  # unit moved to (x, y)
+     'DAMAGE',  # unit dealt `value` damage to target at (x, y)
+     'KILL',  # unit killed target at (x, y), `value` is the target's unit type code
+     'HARVEST',  # unit harvested `value` minerals from target at (x, y)
+     'RETURN',  # unit returned `value` minerals to target base at (x, y)
+     'PRODUCE',  # unit produced target at (x, y), `value` is the new unit's type code
+     'CANCEL',  # unit's pending action was cancelled as it died, `value` is the `ActionTypes` value
+     'INVALID',  # unit's requested action was replaced with a NOOP, `value` is the `ActionTypes` value
+     ],
+    start=1
+)
+
+EVENT_DTYPE = np.dtype([
+    ('type', np.uint8),
+    ('player_id', np.int8),  # the player of the unit causing the event
+    ('unit_id', np.int32),
+    ('target_id', np.int32),  # -1 if no target
+    ('x', np.int16),
+    ('y', np.int16),
+    ('value', np.int32),
+])
+
+
+class EventBuffer:
+    """A preallocated buffer of fixed-width event records describing what happened during a game tick."""
+
+    def __init__(self, capacity: int = 256) -> None:
+        super().__init__()
+        self.buffer = np.zeros(capacity, dtype=EVENT_DTYPE)
+        self.size = 0
+
+    def clear(self) -> None:
+        self.size = 0
+
+    def restore(self, events: np.ndarray) -> None:
+        """Replace the recorded events, e.g. with a copy of an earlier `view()`."""
+        self.buffer[:len(events)] = events
+        self.size = len(events)
+
+    def append(self, event_type: EventTypes, player_id: int, unit_id: int, target_id: int, x: int, y: int,
+               value: int = 0) -> None:
+        if self.size == len(self.buffer):
+            self.buffer = np.concatenate([self.buffer, np.zeros(len(self.buffer), dtype=EVENT_DTYPE)])
+        self.buffer[self.size] = (event_type.value, player_id, unit_id, target_id, x, y, value)
+        self.size += 1
+
+    def view(self) -> np.ndarray:
+        """Get the events recorded so far, as a view on the buffer that is overwritten next tick.
+
+        :return: A structured numpy array with dtype `EVENT_DTYPE`.
+        """
+        return self.buffer[:self.size]
+
+    def player_totals(self, weights: np.ndarray, num_players: int = 2) -> np.ndarray:
+        """Sum a weight per event type for each player, e.g. to compute shaped rewards.
+
+        :param weights: An array indexed by `EventTypes` value, applied per unit of `value` for DAMAGE, HARVEST & RETURN
+          events and per event otherwise.
+        :param num_players: The number of players.
+        :return: An array of shape (num_players,).
+        """
+        events = self.view()
+        events = events[events['player_id'] >= 0]
+        amount = np.where(np.isin(events['type'], PER_VALUE_EVENT_TYPES), events['value'], 1)
+        return np.bincount(events['player_id'], weights=weights[events['type']] * amount, minlength=num_players)
+
+
+PER_VALUE_EVENT_TYPES = [EventTypes.DAMAGE.value, EventTypes.HARVEST.value, EventTypes.RETURN.value]
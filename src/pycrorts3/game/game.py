@@ -1,15 +1,20 @@
 from collections import defaultdict, deque
 import itertools
+import json
 from typing import Dict, List
 
 import numpy as np
 from pprint import pprint
 
-from .actions import Action, ActionEncodings, NoopAction, MoveAction, AttackAction, HarvestAction, ReturnAction, \
-    ProduceAction
+from .actions import Action, ActionEncodings, ActionTypes, NoopAction, MoveAction, AttackAction, HarvestAction, \
+    ReturnAction, ProduceAction
+from .events import EventBuffer, EventTypes, EVENT_DTYPE
+from .mask_cache import ActionMaskCache
 from .player import Player
+from .position import Position
 from .state import State
-from .units import Unit, Resource
+from .units import Unit, Resource, unit_produces, unit_code_classes, unit_class_codes, UTT_VERSION, STAT_MOVE_TIME, \
+    STAT_ATTACK_TIME, STAT_HARVEST_TIME, STAT_RETURN_TIME, STAT_PRODUCE_TIME, STAT_MIN_DAMAGE, STAT_MAX_DAMAGE
 from ..game.position import cardinal_to_euclidean
 
 MAP_FILENAME = '4x4_melee_light2.xml'
@@ -24,7 +29,78 @@ REWARD_WIN = 1.0
 REWARD_DRAW = 0.0
 REWARD_LOSE = -1.0
 REWARD_STEP = 0.0
-UTT_VERSION = 2
+REWARD_DAMAGE = 0.0  # shaped rewards, per event
+REWARD_KILL = 0.0
+REWARD_HARVEST = 0.0
+REWARD_RETURN = 0.0
+REWARD_PRODUCE = 0.0
+ACTION_MASK_CACHE = True  # reuse action masks across ticks until their surroundings change
+ACTION_MASK_CACHE_DEBUG = False  # check every cached action mask against a full recomputation
+VERBOSE = True  # print a summary when a game ends
+SEED = None  # of the game's random number generator, None for a fresh random seed
+TIE_BREAKING = 'fixed'  # 'fixed' or 'random', how simultaneous actions are resolved, see `Game.step_many()`
+TIE_BREAKING_MODES = ('fixed', 'random')
+DEFAULT_ENV_CONFIG = {
+    'map_filename': MAP_FILENAME,
+    'reward_win': REWARD_WIN,
+    'reward_draw': REWARD_DRAW,
+    'reward_lose': REWARD_LOSE,
+    'reward_step': REWARD_STEP,
+    'reward_damage': REWARD_DAMAGE,
+    'reward_kill': REWARD_KILL,
+    'reward_harvest': REWARD_HARVEST,
+    'reward_return': REWARD_RETURN,
+    'reward_produce': REWARD_PRODUCE,
+    'utt_version': UTT_VERSION,
+    'seed': SEED,
+    'tie_breaking': TIE_BREAKING,
+    'action_mask_cache': ACTION_MASK_CACHE,
+    'action_mask_cache_debug': ACTION_MASK_CACHE_DEBUG,
+    'verbose': VERBOSE,
+}
+
+# binary layout of `Game.to_bytes()`: a header, then the config & random number generator state as JSON & tables of
+# players, units, actions & events
+GAME_BYTES_VERSION = 2
+GAME_HEADER_DTYPE = np.dtype([
+    ('version', '<u2'), ('time', '<i4'), ('winner', 'i1'), ('is_game_over', 'u1'), ('is_new_tick', 'u1'),
+    ('hash', '<u8'), ('config_size', '<i4'), ('rng_size', '<i4'), ('num_players', 'u1'), ('num_units', '<i4'),
+    ('num_pending_ticks', '<i4'), ('num_actions', '<i4'), ('num_events', '<i4'),
+])
+PLAYER_RECORD_DTYPE = np.dtype([('id', 'i1'), ('minerals', '<i4')])
+UNIT_RECORD_DTYPE = np.dtype([
+    ('id', '<i4'), ('type', 'u1'), ('player_id', 'i1'), ('x', '<i2'), ('y', '<i2'), ('hitpoints', '<i2'),
+    ('resources', '<i4'), ('has_pending_action', 'u1'),
+])  # dead units have x & y of -1
+ACTION_RECORD_DTYPE = np.dtype([
+    ('type', 'u1'), ('unit_id', '<i4'), ('x', '<i2'), ('y', '<i2'), ('start_time', '<i4'), ('end_time', '<i4'),
+    ('produce_type', 'u1'), ('tick', '<i4'),
+])  # tick indexes `pending_actions`, -1 for queued actions
+action_type_classes = {ActionTypes[action_cls.__name__].value: action_cls for action_cls in
+                       (NoopAction, MoveAction, AttackAction, HarvestAction, ReturnAction, ProduceAction)}
+action_class_codes = {action_cls: code for code, action_cls in action_type_classes.items()}
+_templates: Dict[str, 'Game'] = {}  # unplayed games by config but the seed, deserialised games share their static parts
+
+
+def max_steps_per_game(max_dim: int) -> int:
+    """The default episode length of a map, that of the smallest standard size that fits it."""
+    return next((steps for dim, steps in sorted(MAX_STEPS_PER_GAME.items()) if dim >= max_dim),
+                max(MAX_STEPS_PER_GAME.values()))
+
+
+def spawn_seeds(seed, n: int) -> List[np.random.SeedSequence]:
+    """Derive independent seeds from one, e.g. for the games of each worker or of a `VectorGame`.
+
+    Pass them as the 'seed' of each game's config, the streams don't overlap however many games share a process.
+    `VectorGame` seeds its games with `spawn_seeds(seed, num_games)`, so game k of it is reproduced by a `Game`
+      seeded with `spawn_seeds(seed, num_games)[k]`.
+
+    :param seed: An int, a `SeedSequence`, or None for a fresh random seed.
+    :param n: The number of seeds.
+    :return: The seeds.
+    """
+    seed_sequence = seed if isinstance(seed, np.random.SeedSequence) else np.random.SeedSequence(seed)
+    return seed_sequence.spawn(n)
 
 
 class Game:
@@ -33,20 +109,19 @@ class Game:
 
         # config
         # ------
-        self.env_config = dict({
-            'map_filename': MAP_FILENAME,
-            'reward_win': REWARD_WIN,
-            'reward_draw': REWARD_DRAW,
-            'reward_lose': REWARD_LOSE,
-            'reward_step': REWARD_STEP,
-            'utt_version': UTT_VERSION,
-        }, **env_config or {})
+        self.env_config = dict(DEFAULT_ENV_CONFIG, **env_config or {})
+        assert self.env_config['tie_breaking'] in TIE_BREAKING_MODES, 'Unknown tie breaking mode'
+        self.random_tie_breaking = self.env_config['tie_breaking'] == 'random'
+        # random damage & tie breaking draw from one stream per game, which carries over across resets, so a sequence
+        # of episodes is reproduced from the seed
+        self.rng = np.random.default_rng(self.env_config['seed'])
 
         # episode state
         # -------------
-        self.state = State(self.map_filename())
+        self.state = State(self.map_filename(), self.utt_version())
+        self.random_damage = bool((self.state.utt[:, STAT_MIN_DAMAGE] < self.state.utt[:, STAT_MAX_DAMAGE]).any())
         max_dim = max(self.height(), self.width())
-        self.env_config['max_steps_per_game'] = env_config.get('max_steps_per_game', MAX_STEPS_PER_GAME[max_dim])
+        self.env_config['max_steps_per_game'] = self.env_config.get('max_steps_per_game', max_steps_per_game(max_dim))
         self.time = 0
         self.is_game_over = False
         self.winner = None
@@ -56,16 +131,37 @@ class Game:
         # step state
         # ----------
         self.queued_actions: deque[Action] = deque()  # action queued to be
+        self.is_new_tick = True  # the events of the previous tick are cleared when the next tick starts
+        self.event_weights = np.zeros(len(EventTypes) + 1)
+        for event_type in EventTypes:
+            self.event_weights[event_type.value] = self.env_config.get(f'reward_{event_type.name.lower()}', 0.0)
+
+        self.mask_cache = ActionMaskCache() if self.env_config['action_mask_cache'] else None
+
+        # search state
+        # ------------
+        # (journal length, time, is_game_over, winner, hash, random number generator state) of each `push()`
+        self.checkpoints: List[tuple] = []
 
-    def reset(self) -> None:
-        """Reset the game."""
+    def reset(self, seed=None) -> None:
+        """Reset the game.
+
+        :param seed: Reseed the random number generator, else it continues from the previous episode.
+        """
         # self.state = State(self.map_filename())
+        if seed is not None:
+            self.rng = np.random.default_rng(seed)
         self.state.reset()
         self.time = 0
         self.is_game_over = False
         self.winner = None
         self.pending_actions.clear()
         self.queued_actions.clear()
+        self.checkpoints.clear()
+        self.state.events.clear()
+        self.is_new_tick = True
+        if self.mask_cache is not None:
+            self.mask_cache.clear()
 
     def step(self, action: Action) -> None:
         """Request to make a game action.
@@ -82,10 +178,198 @@ class Game:
 
         :param action: The action to add.
         """
-        if not self.is_legal_action(action):
+        self._start_tick()
+        self._queue_action(action, self.is_legal_action(action))
+
+    def step_many(self, unit_ids, action_codes) -> np.ndarray:
+        """Request to make the actions of many units at once, e.g. the joint action of every agent.
+
+        Equivalent to `step()` of each action in order, but validated together: pending & queued actions are scanned
+          once rather than once per action, & moves into a cell claimed by an earlier action of the batch are found with
+          array operations, so the first legal action to claim a cell goes ahead & later moves into it become NOOPs.
+        With 'random' tie breaking, the action of the batch that goes ahead of those claiming a cell is chosen at
+          random instead, & the other moves into it become NOOPs.
+
+        :param unit_ids: The IDs of the units, each at most once.
+        :param action_codes: The `ActionEncodings` value of each unit's action.
+        :return: Whether each action was legal, illegal actions are replaced with NOOPs as by `step()`.
+        """
+        unit_ids = np.asarray(unit_ids).reshape(-1).tolist()
+        assert len(set(unit_ids)) == len(unit_ids), 'A unit has more than one action'
+        if not unit_ids:
+            return np.zeros(0, dtype=bool)
+        actions = [self.decode_action(unit_id, action_code)
+                   for unit_id, action_code in zip(unit_ids, np.asarray(action_codes).reshape(-1).tolist())]
+        self._start_tick()
+
+        # legality against the game & the actions already pending or queued, each independent of the rest of the batch
+        future_actions = list(itertools.chain(itertools.chain(*self.pending_actions), self.queued_actions))
+        busy = {other.unit_id for other in future_actions}
+        reserved = {other.position for other in future_actions}
+        is_move = np.array([isinstance(action, MoveAction) for action in actions], dtype=bool)
+        legal = np.array([action.unit_id not in busy and self.get_unit(action.unit_id).can_make_action() and
+                          not (move and action.position in reserved) and self.state.is_legal_action(action)
+                          for action, move in zip(actions, is_move.tolist())], dtype=bool)
+
+        # moves into a cell that an earlier legal action of the batch targets, as `is_legal_action()`, or with 'random'
+        # tie breaking, moves into a cell that another legal action of the batch targets, unless chosen at random
+        claims = np.flatnonzero(legal)
+        if len(claims) > 1 and is_move[claims].any():
+            width = self.width()
+            cells = np.array([actions[i].position.y * width + actions[i].position.x for i in claims], dtype=np.int64)
+            order = np.argsort(cells, kind='stable')  # claims of a cell in batch order
+            is_later = np.zeros(len(claims), dtype=bool)
+            is_later[order[1:]] = cells[order[1:]] == cells[order[:-1]]
+            if self.random_tie_breaking and (is_later & is_move[claims]).any():  # only drawn on a conflict
+                order = np.lexsort((self.rng.permutation(len(claims)), cells))  # claims of a cell in random order
+                is_later[:] = False
+                is_later[order[1:]] = cells[order[1:]] == cells[order[:-1]]
+            legal[claims[is_later & is_move[claims]]] = False
+
+        for action, is_legal in zip(actions, legal.tolist()):
+            self._queue_action(action, is_legal)
+        return legal
+
+    def _queue_action(self, action: Action, is_legal: bool) -> None:
+        """Queue an action, or a NOOP of the same duration in its place if it's illegal."""
+        if not is_legal:
             unit = self.get_unit(action.unit_id)
+            self._invalid_action_event(action)
             action = NoopAction(action.unit_id, unit.position, action.start_time, action.end_time)
         self.queued_actions.append(action)
+        self.state.record(self.queued_actions.pop)
+        self._reservation_changed(action)
+
+    def push(self) -> None:
+        """Checkpoint the game so it can later be reverted with `pop()`, e.g. to look ahead during search.
+
+        While any checkpoint exists, every mutation is journaled, so reverting costs time proportional to the number of
+          changes since the checkpoint rather than a full copy.
+        The events of the current tick are restored too, so `events` & the shaped rewards are those of the checkpoint.
+        Checkpoints nest.
+        """
+        if self.state.journal is None:
+            self.state.journal = []
+        self.checkpoints.append((len(self.state.journal), self.time, self.is_game_over, self.winner, self.state.hash,
+                                 self.rng.bit_generator.state, self.is_new_tick, self.state.events.size))
+
+    def pop(self) -> None:
+        """Revert the game to the most recent checkpoint made by `push()`."""
+        length, self.time, self.is_game_over, self.winner, hash_, rng_state, self.is_new_tick, num_events = \
+            self.checkpoints.pop()
+        self.rng.bit_generator.state = rng_state
+        self.state.undo(length)  # including the events of ticks started since
+        self.state.events.size = num_events
+        self.state.hash = hash_
+        if self.mask_cache is not None:
+            self.mask_cache.clear()
+        if not self.checkpoints:
+            self.state.journal = None
+
+    def to_bytes(self) -> bytes:
+        """Serialise the game to a compact, versioned binary layout, e.g. to send it to another process.
+
+        Only the state that changes during a game is written, the map is referenced by the config and loaded once per
+          process by `from_bytes()`.
+        Checkpoints made by `push()` aren't included.
+
+        :return: The serialised game.
+        """
+        config = json.dumps({key: value for key, value in self.env_config.items()
+                             if isinstance(value, (bool, int, float, str)) and DEFAULT_ENV_CONFIG.get(key) != value},
+                            separators=(',', ':')).encode('utf-8')
+        rng = json.dumps(self.rng.bit_generator.state, separators=(',', ':')).encode('utf-8')
+        players = np.array([(player.id, player.minerals) for player in self.players], dtype=PLAYER_RECORD_DTYPE)
+        units = np.array([(unit.id, unit_class_codes[unit.__class__], unit.player_id,
+                           -1 if unit.position is None else unit.position.x,
+                           -1 if unit.position is None else unit.position.y,
+                           unit.hitpoints, unit.resources, unit.has_pending_action)
+                          for unit in self.units.values()], dtype=UNIT_RECORD_DTYPE)
+        ticks = itertools.chain(enumerate(self.pending_actions), [(-1, self.queued_actions)])
+        actions = np.array([(action_class_codes[action.__class__], action.unit_id, action.position.x,
+                             action.position.y, action.start_time, action.end_time,
+                             unit_class_codes[action.produce_type] if isinstance(action, ProduceAction) else 0, tick)
+                            for tick, tick_actions in ticks for action in tick_actions], dtype=ACTION_RECORD_DTYPE)
+        events = self.state.events.view()
+        header = np.array((GAME_BYTES_VERSION, self.time, -1 if self.winner is None else self.winner,
+                           self.is_game_over, self.is_new_tick, self.state.hash, len(config), len(rng), len(players),
+                           len(units), len(self.pending_actions), len(actions), len(events)), dtype=GAME_HEADER_DTYPE)
+        return b''.join([header.tobytes(), config, rng, players.tobytes(), units.tobytes(), actions.tobytes(),
+                         events.tobytes()])
+
+    @staticmethod
+    def from_bytes(data: bytes) -> 'Game':
+        """Deserialise a game written by `to_bytes()`.
+
+        :param data: The serialised game.
+        :return: The game.
+        """
+        version, time, winner, is_game_over, is_new_tick, hash_, config_size, rng_size, num_players, num_units, \
+            num_pending_ticks, num_actions, num_events = np.frombuffer(data, dtype=GAME_HEADER_DTYPE, count=1)[0].item()
+        assert version == GAME_BYTES_VERSION, 'Unsupported game serialisation version'
+        offset = GAME_HEADER_DTYPE.itemsize
+        config = data[offset:offset + config_size].decode('utf-8')
+        offset += config_size
+        rng_state = json.loads(data[offset:offset + rng_size].decode('utf-8'))
+        offset += rng_size
+        tables = []
+        for dtype, count in ((PLAYER_RECORD_DTYPE, num_players), (UNIT_RECORD_DTYPE, num_units),
+                             (ACTION_RECORD_DTYPE, num_actions), (EVENT_DTYPE, num_events)):
+            tables.append(np.frombuffer(data, dtype=dtype, count=count, offset=offset))
+            offset += dtype.itemsize * count
+        players, units, actions, events = tables
+
+        # share the config, map & initial state with an unplayed game, then replace everything that changes
+        # games differing only in their seed share one, as the seed only starts the random number generator's state
+        env_config = json.loads(config)
+        template_key = json.dumps({name: value for name, value in env_config.items() if name != 'seed'},
+                                  sort_keys=True)
+        template = _templates.get(template_key)
+        if template is None:
+            template = _templates[template_key] = Game(env_config)
+        game = Game.__new__(Game)  # not `copy.copy()`, which would go through `__reduce__()`
+        game.__dict__.update(template.__dict__)
+        game.env_config = dict(template.env_config, seed=env_config.get('seed', DEFAULT_ENV_CONFIG['seed']))
+        game.rng = np.random.default_rng()
+        game.rng.bit_generator.state = rng_state
+        game.state = state = State.__new__(State)
+        state.__dict__.update(template.state.__dict__)
+        state.players = [Player(player_id, minerals) for player_id, minerals in players.tolist()]
+        state.terrain = template.state.terrain.copy()
+        state.units = {}
+        state.unit_map = np.zeros_like(template.state.unit_map)
+        for unit_id, code, player_id, x, y, hitpoints, resources, has_pending_action in units.tolist():
+            unit = unit_code_classes[code](unit_id, player_id, None if x < 0 else Position(x, y), hitpoints, resources)
+            unit.has_pending_action = bool(has_pending_action)
+            state.units[unit_id] = unit
+        alive = units['x'] >= 0
+        state.unit_map[units['y'][alive], units['x'][alive]] = units['type'][alive]
+        state.hash = hash_
+        state.journal = None
+        state.events = EventBuffer(max(len(events), 256))
+        state.events.buffer[:len(events)] = events
+        state.events.size = len(events)
+        state.dirty_cells = set()
+        state.dirty_players = set()
+
+        game.time = time
+        game.is_game_over = bool(is_game_over)
+        game.winner = None if winner < 0 else winner
+        game.is_new_tick = bool(is_new_tick)
+        game.pending_actions = deque([] for _ in range(num_pending_ticks))
+        game.queued_actions = deque()
+        for code, unit_id, x, y, start_time, end_time, produce_type, tick in actions.tolist():
+            if produce_type:
+                action = ProduceAction(unit_id, Position(x, y), start_time, end_time, unit_code_classes[produce_type])
+            else:
+                action = action_type_classes[code](unit_id, Position(x, y), start_time, end_time)
+            (game.queued_actions if tick < 0 else game.pending_actions[tick]).append(action)
+        game.mask_cache = ActionMaskCache() if template.mask_cache is not None else None
+        game.checkpoints = []
+        return game
+
+    def __reduce__(self):
+        return Game.from_bytes, (self.to_bytes(),)
 
     def update(self) -> None:
         """Complete the current game time-step.
@@ -98,49 +382,75 @@ class Game:
         Similarly, if two units attack each other simultaneously, the first unit to attack will kill the second unit
           before it has a chance to strike back.
         This is copying microRTS logic.
+        With 'random' tie breaking, the actions that complete in the same step execute in a random order.
+        Attacks deal damage in [min_damage, max_damage] of the unit type table, drawn for all attacks completing in the
+          step at once.
         """
-        assert not self.is_game_over
+        assert not self.is_game_over, 'The game is over, reset it to play on'
+        self._start_tick()
+        self.is_new_tick = True
         # 1) validate queued actions
         #  - count duplicates
         positions = defaultdict(list)
         for i, action in enumerate(self.queued_actions):
             if isinstance(action, MoveAction):
                 positions[action.position].append(i)
+        conflicts = [indexes for indexes in positions.values() if len(indexes) > 1]
         #  - replace all duplicates with NOOP
-        for pos, indexes in positions.items():
-            if len(indexes) > 1:
-                for i in indexes:
-                    action = self.queued_actions[i]
-                    start_pos = self.get_unit(action.unit_id).position
-                    self.queued_actions[i] = NoopAction(action.unit_id, start_pos, action.start_time, action.end_time)
+        for indexes in conflicts:
+            for i in indexes:
+                action = self.queued_actions[i]
+                start_pos = self.get_unit(action.unit_id).position
+                self._invalid_action_event(action)
+                self.queued_actions[i] = NoopAction(action.unit_id, start_pos, action.start_time, action.end_time)
+                self.state.record(self.queued_actions.__setitem__, i, action)
+                self._reservation_changed(action)
 
         # 2) move queued actions (this step) to pending (future steps)
         while len(self.queued_actions):
             action = self.queued_actions.popleft()
+            self.state.record(self.queued_actions.appendleft, action)
             relative_end_time = action.end_time - self.time  # relative from now
-            assert relative_end_time >= 0
+            assert relative_end_time >= 0, f'{action} ends before the current tick {self.time}'
             while len(self.pending_actions) <= relative_end_time:
                 self.pending_actions.append([])
+                self.state.record(self.pending_actions.pop)
             self.pending_actions[relative_end_time].append(action)
-            self.get_unit(action.unit_id).has_pending_action = True
-
-        # 3) execute actions that complete this step
+            self.state.record(self.pending_actions[relative_end_time].pop)
+            self.state.toggle_action(action)
+            self._set_has_pending_action(self.get_unit(action.unit_id), True)
+
+        # 3) execute actions that complete this step, if any action is in progress
+        if not self.pending_actions:
+            self.pending_actions.append([])
+            self.state.record(self.pending_actions.pop)
         to_execute = self.pending_actions.popleft()
+        self.state.record(self.pending_actions.appendleft, to_execute)
+        if self.random_tie_breaking and len(to_execute) > 1:
+            self.state.record(to_execute.__setitem__, slice(None), list(to_execute))
+            to_execute[:] = [to_execute[i] for i in self.rng.permutation(len(to_execute))]
+        damages = self._draw_damages(to_execute)
         while len(to_execute):
             action = to_execute.pop()
+            self.state.record(to_execute.append, action)
+            self.state.toggle_action(action)
+            self._reservation_changed(action)
             if isinstance(action, NoopAction):
                 pass
             elif isinstance(action, MoveAction):
                 self.state.move_unit(action.unit_id, action.position)
             elif isinstance(action, AttackAction):
-                dead_unit = self.state.attack_unit(action.unit_id, action.position)
+                dead_unit = self.state.attack_unit(action.unit_id, action.position, damages.get(action.unit_id))
                 if dead_unit:
                     # copy microRTS logic
                     # if two units attack simultaneously, the first unit kills the 2nd, before 2nd strikes
                     for i, step_actions in enumerate(self.pending_actions):
                         for j, pending_action in enumerate(step_actions):
                             if pending_action.unit_id == dead_unit.id:
-                                self.pending_actions[i].pop(j)
+                                self.state.toggle_action(self.pending_actions[i].pop(j))
+                                self._cancel_action_event(pending_action)
+                                self._reservation_changed(pending_action)
+                                self.state.record(self.pending_actions[i].insert, j, pending_action)
                                 break
                         else:
                             continue
@@ -148,7 +458,10 @@ class Game:
                     for i, pending_action in enumerate(to_execute):
                         if pending_action.unit_id == dead_unit.id:
                             if pending_action.unit_id == dead_unit.id:
-                                to_execute.pop(i)
+                                self.state.toggle_action(to_execute.pop(i))
+                                self._cancel_action_event(pending_action)
+                                self._reservation_changed(pending_action)
+                                self.state.record(to_execute.insert, i, pending_action)
                                 break
                     self.state.remove_unit(dead_unit)
                     # check player has units
@@ -157,6 +470,8 @@ class Game:
                     if num_units == 0:
                         self.is_game_over = True
                         self.winner = 1 - dead_unit.player_id
+                        for unexecuted in to_execute:
+                            self.state.toggle_action(unexecuted)
                         self._print_game_state()
                         return  # abort updating, game over
             elif isinstance(action, HarvestAction):
@@ -165,7 +480,7 @@ class Game:
                 self.state.return_minerals(action.unit_id, action.position)
             elif isinstance(action, ProduceAction):
                 self.state.produce(action.unit_id, action.position, action.produce_type)
-            self.get_unit(action.unit_id).has_pending_action = False
+            self._set_has_pending_action(self.get_unit(action.unit_id), False)
 
         # 4) end of episode check & clean up
         self.time += 1
@@ -173,7 +488,52 @@ class Game:
             self.is_game_over = True
             self._print_game_state()
 
+    def _reservation_changed(self, action: Action) -> None:
+        """Mark the cell an action targets as changed, as it stops or starts blocking moves into it."""
+        self.state.dirty_cells.add((action.position.x, action.position.y))
+
+    def _draw_damages(self, actions: List[Action]) -> Dict[int, int]:
+        """Draw the damage of every attack in a step's actions, in one batch, in their order of execution.
+
+        Nothing is drawn if damage is deterministic, so those games never advance the random number generator.
+
+        :return: The damage, by the ID of the attacking unit, empty if damage is deterministic.
+        """
+        if not self.random_damage:
+            return {}
+        attackers = [action.unit_id for action in reversed(actions) if isinstance(action, AttackAction)]
+        if not attackers:
+            return {}
+        stats = self.state.utt[[unit_class_codes[self.units[unit_id].__class__] for unit_id in attackers]]
+        damages = self.rng.integers(stats[:, STAT_MIN_DAMAGE], stats[:, STAT_MAX_DAMAGE] + 1)
+        return dict(zip(attackers, damages.tolist()))
+
+    def _start_tick(self) -> None:
+        if self.is_new_tick:
+            events = self.state.events
+            if self.state.journal is not None and events.size:
+                self.state.record(events.restore, events.view().copy())  # the new tick overwrites them
+            events.clear()
+            self.is_new_tick = False
+
+    def _invalid_action_event(self, action: Action) -> None:
+        unit = self.get_unit(action.unit_id)
+        action_type = ActionTypes[action.__class__.__name__].value
+        self.state.events.append(EventTypes.INVALID, unit.player_id, unit.id, -1, unit.x, unit.y, action_type)
+
+    def _cancel_action_event(self, action: Action) -> None:
+        unit = self.get_unit(action.unit_id)
+        action_type = ActionTypes[action.__class__.__name__].value
+        x, y = action.position
+        self.state.events.append(EventTypes.CANCEL, unit.player_id, unit.id, -1, x, y, action_type)
+
+    def _set_has_pending_action(self, unit: Unit, has_pending_action: bool) -> None:
+        self.state.record(setattr, unit, 'has_pending_action', unit.has_pending_action)
+        unit.has_pending_action = has_pending_action
+
     def _print_game_state(self):
+        if not self.env_config['verbose']:
+            return
         if self.winner is not None:
             print('GAME OVER, winner: %s' % self.winner)
         else:
@@ -225,7 +585,24 @@ class Game:
         if not unit.can_make_action():
             assert self.is_game_over  # this should only ever be reached on terminal obs
             return np.zeros(shape=(len(ActionEncodings),), dtype=np.uint8)
-
+        if self.mask_cache is None:
+            return self._compute_action_mask(unit)
+
+        state = self.state
+        if state.dirty_cells or state.dirty_players:
+            self.mask_cache.invalidate(state.dirty_cells, state.dirty_players, state.units)
+            state.dirty_cells.clear()
+            state.dirty_players.clear()
+        action_mask = self.mask_cache.get(unit)
+        if action_mask is None:
+            action_mask = self._compute_action_mask(unit)
+            self.mask_cache.put(unit, action_mask)
+        elif self.env_config['action_mask_cache_debug']:
+            expected = self._compute_action_mask(unit)
+            assert np.array_equal(action_mask, expected), f'Stale cached action mask for {unit}'
+        return action_mask.copy()
+
+    def _compute_action_mask(self, unit: Unit) -> np.array:
         future_actions = list(itertools.chain(*self.pending_actions))
         future_actions += self.queued_actions
         action_mask = self.state.get_action_mask(unit)
@@ -241,6 +618,70 @@ class Game:
 
         return action_mask
 
+    def get_action_mask_grid(self, player_id: int) -> np.array:
+        """Get a mask of legal actions for every cell of the map, for the units of one player.
+
+        Cells without a unit of the player that can make an action only allow NOOP, so that every cell always has at
+          least one legal action.
+
+        :param player_id: The ID of the player to generate the action mask for.
+        :return: A numpy array of shape (height, width, len(ActionEncodings)) where 1 is a legal action, else 0.
+        """
+        action_mask = self.state.get_action_mask_grid(player_id)
+        idle = np.zeros((self.height(), self.width()), dtype=bool)
+        for unit in self.units.values():
+            if unit.player_id == player_id and unit.can_make_action():
+                idle[unit.y, unit.x] = True
+        action_mask &= idle[:, :, None]
+        # mask move actions set to be occupied by other pending actions
+        reserved = np.zeros((self.height() + 2, self.width() + 2), dtype=bool)
+        for other in itertools.chain(itertools.chain(*self.pending_actions), self.queued_actions):
+            if other.position is not None:
+                reserved[other.position.y + 1, other.position.x + 1] = True
+        action_mask[:, :, 1] &= ~reserved[:-2, 1:-1]
+        action_mask[:, :, 2] &= ~reserved[1:-1, 2:]
+        action_mask[:, :, 3] &= ~reserved[2:, 1:-1]
+        action_mask[:, :, 4] &= ~reserved[1:-1, :-2]
+        action_mask[:, :, 0] = True
+        return action_mask.astype(np.uint8)
+
+    def decode_action(self, unit_id: int, action_id: int) -> Action:
+        """Build the game action a unit makes for an action index.
+
+        :param unit_id: The ID of the unit making the action.
+        :param action_id: The `ActionEncodings` value of the action.
+        :return: The action, starting now.
+        """
+        unit = self.get_unit(unit_id)
+        action_type = ActionEncodings(action_id).name
+        start_time = self.time
+        if action_type == 'NOOP':
+            return NoopAction(unit_id, unit.position, start_time, start_time)
+        position = cardinal_to_euclidean(unit.position, action_type)
+        stats = self.state.utt[unit_class_codes[unit.__class__]]
+
+        def end_time(duration) -> int:
+            # actions last at least 1 tick, e.g. a building's MOVE has no duration in the UTT, as `VectorGame`
+            return start_time + max(int(duration), 1) - 1
+
+        if action_type.startswith('MOVE'):
+            return MoveAction(unit_id, position, start_time, end_time(stats[STAT_MOVE_TIME]))
+        elif action_type.startswith('ATTACK'):
+            return AttackAction(unit_id, position, start_time, end_time(stats[STAT_ATTACK_TIME]))
+        elif action_type.startswith('HARVEST'):
+            return HarvestAction(unit_id, position, start_time, end_time(stats[STAT_HARVEST_TIME]))
+        elif action_type.startswith('RETURN'):
+            return ReturnAction(unit_id, position, start_time, end_time(stats[STAT_RETURN_TIME]))
+        elif action_type.startswith('PRODUCE'):
+            if unit.__class__ not in unit_produces:
+                return ProduceAction(unit_id, position, start_time, end_time(0), None)  # illegal, as a building's MOVE
+            produce_type = unit_produces[unit.__class__][0]
+            return ProduceAction(unit_id, position, start_time,
+                                 end_time(self.state.utt[unit_class_codes[produce_type], STAT_PRODUCE_TIME]),
+                                 produce_type)
+        else:
+            raise ValueError('Invalid action')
+
     def get_state(self, unit_id: int):
         """Get a representation of the game state from a unit's perspective.
 
@@ -249,6 +690,36 @@ class Game:
         """
         return self.state.to_array(unit_id)
 
+    def get_player_state(self, player_id: int):
+        """Get a representation of the game state from a player's perspective.
+
+        :param player_id: The ID of the player to fetch the state for.
+        :return: A numpy array encoded to represent the state.
+        """
+        return self.state.to_array_player(player_id)
+
+    @property
+    def events(self) -> np.ndarray:
+        """The events of the current tick, or the previous tick if no action has been made since `update()`.
+
+        This is a view on a reused buffer, copy it to keep it beyond the next tick.
+
+        :return: A structured numpy array with dtype `EVENT_DTYPE`.
+        """
+        return self.state.events.view()
+
+    def get_shaped_rewards(self) -> np.ndarray:
+        """Get each player's shaped reward for the current tick, computed from its events.
+
+        :return: An array with one reward per player.
+        """
+        return self.state.events.player_totals(self.event_weights, len(self.players))
+
+    @property
+    def hash(self) -> int:
+        """The 64-bit Zobrist hash of the units, players & pending actions, excluding the time."""
+        return self.state.hash
+
     @property
     def players(self) -> List[Player]:
         return self.state.players
@@ -0,0 +1,327 @@
+from collections import defaultdict
+from hashlib import blake2b
+from importlib.resources import files
+from multiprocessing import Pool
+import os
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .actions import ActionEncodings
+from .game import Game
+from .map_layout import MapLayout
+from .units import unit_type_code
+from .vector_game import VectorGame
+
+TRACE_VERSION = 1
+NUM_SEEDS = 10
+BATCH_SIZE = 64  # traces of the same map checked together, in one backend
+UNIT_COLUMNS = ['id', 'type', 'player_id', 'x', 'y', 'hitpoints', 'resources', 'busy']  # of `state_tables()`
+HEADER_COLUMNS = ['time', 'is_game_over', 'winner', 'minerals_0', 'minerals_1']
+
+
+def bundled_maps() -> List[str]:
+    """The names of the maps shipped with the package that load, e.g. 32x32_melee-8_terrain-bridge1's terrain is
+      truncated."""
+    names = []
+    for name in sorted(path.name for path in (files(__package__) / 'maps').iterdir()):
+        if name.endswith('.xml'):
+            try:
+                MapLayout.load(name)
+            except AssertionError:
+                continue
+            names.append(name[:-len('.xml')])
+    return names
+
+
+class GameBackend:
+    """The reference engine, `Game`, driven through the interface the harness replays traces against.
+
+    A backend runs K games on one map in lockstep, one per trace, so vectorised engines can be checked over many traces
+      at once.
+    An alternate engine is checked by wrapping it in a class with the same methods, where units are referred to by
+      slot, i.e. their position in `Game.units` (creation order), and every table is in slot order:
+
+        - `__init__(map_filename, num_games)`.
+        - `action_masks(slots)` - given the slots of the units acting in each game, the mask of each of those units,
+          as `Game.get_action_mask()` before any action this tick, per game.
+        - `step(slots, action_ids)` - make an `ActionEncodings` action per unit, as `Game.step()` in slot order.
+        - `update()` - complete the tick of every game that isn't over, as `Game.update()`.
+        - `state_tables(k)` - the `HEADER_COLUMNS` & the `UNIT_COLUMNS` of every unit of a game, as int64 arrays.
+    """
+
+    def __init__(self, map_filename: str, num_games: int = 1) -> None:
+        super().__init__()
+        self.games = [Game({'map_filename': map_filename, 'verbose': False}) for _ in range(num_games)]
+
+    def idle_slots(self, k: int) -> np.ndarray:
+        """The slots of the units of a game that can make an action, only needed to record traces."""
+        game = self.games[k]
+        if game.is_game_over:
+            return np.zeros(0, dtype=np.int64)
+        return np.array([slot for slot, unit in enumerate(game.units.values()) if unit.player_id >= 0 and
+                         unit.position is not None and unit.can_make_action()], dtype=np.int64)
+
+    def action_masks(self, slots: List[np.ndarray]) -> List[np.ndarray]:
+        masks = []
+        for game, game_slots in zip(self.games, slots):
+            units = list(game.units.values())
+            masks.append(np.array([game.get_action_mask(units[slot]) for slot in game_slots],
+                                  dtype=np.uint8).reshape(len(game_slots), len(ActionEncodings)))
+        return masks
+
+    def step(self, slots: List[np.ndarray], action_ids: List[np.ndarray]) -> None:
+        for game, game_slots, game_action_ids in zip(self.games, slots, action_ids):
+            units = list(game.units.values())
+            for slot, action_id in zip(game_slots.tolist(), game_action_ids.tolist()):
+                game.step(game.decode_action(units[slot].id, action_id))
+
+    def update(self) -> None:
+        for game in self.games:
+            if not game.is_game_over:
+                game.update()
+
+    def state_tables(self, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        game = self.games[k]
+        header = np.array([game.time, game.is_game_over, -1 if game.winner is None else game.winner] +
+                          [player.minerals for player in game.players], dtype=np.int64)
+        units = np.array([(unit.id, unit_type_code(unit.__class__), unit.player_id,
+                           -1 if unit.position is None else unit.x, -1 if unit.position is None else unit.y,
+                           0 if unit.position is None else unit.hitpoints, unit.resources,
+                           unit.has_pending_action and unit.position is not None and not game.is_game_over)
+                          for unit in game.units.values()], dtype=np.int64)
+        return header, units.reshape(-1, len(UNIT_COLUMNS))
+
+
+class VectorGameBackend:
+    """`VectorGame` as a backend, see `GameBackend`, with every trace of a batch as one of its K games."""
+
+    def __init__(self, map_filename: str, num_games: int = 1) -> None:
+        super().__init__()
+        self.game = VectorGame(num_games, {'map_filename': map_filename})
+
+    def action_masks(self, slots: List[np.ndarray]) -> List[np.ndarray]:
+        masks = self.game.get_action_masks()
+        return [masks[k, game_slots] for k, game_slots in enumerate(slots)]
+
+    def step(self, slots: List[np.ndarray], action_ids: List[np.ndarray]) -> None:
+        action_codes = np.full((self.game.num_games, self.game.max_units), -1, dtype=np.int64)
+        for k, (game_slots, game_action_ids) in enumerate(zip(slots, action_ids)):
+            action_codes[k, game_slots] = game_action_ids
+        self.game.step(action_codes)
+
+    def update(self) -> None:
+        self.game.update()
+
+    def state_tables(self, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        game = self.game
+        n = game.num_units[k]
+        alive = game.x[k, :n] >= 0
+        header = np.array([game.time[k], game.is_game_over[k], game.winner[k]] + game.minerals[k].tolist(),
+                          dtype=np.int64)
+        units = np.stack([game.unit_id[k, :n], game.unit_type[k, :n], game.player_id[k, :n], game.x[k, :n],
+                          game.y[k, :n], np.where(alive, game.hitpoints[k, :n], 0), game.resources[k, :n],
+                          (game.action_type[k, :n] >= 0) & alive & ~game.is_game_over[k]], axis=1)
+        return header, units.astype(np.int64)
+
+
+def digest(*arrays: np.ndarray) -> int:
+    """A 64-bit digest of the bytes of some arrays."""
+    h = blake2b(digest_size=8)
+    for array in arrays:
+        h.update(np.ascontiguousarray(array).tobytes())
+    return int.from_bytes(h.digest(), 'little')
+
+
+def record_trace(map_filename: str, seed: int, max_ticks: Optional[int] = None) -> Dict[str, np.ndarray]:
+    """Play a game of random legal actions with the reference engine & record it.
+
+    Every tick, every unit that can act picks a legal action uniformly at random, from masks made before any of the
+      tick's actions, so the trace exercises the quirks of `Game.update()`: conflicting moves replaced by NOOPs, the
+      first of 2 attackers killing the second & the cancellation of a dead unit's pending action.
+
+    :param map_filename: The map.
+    :param seed: Seeds the choice of actions.
+    :param max_ticks: The ticks to record, defaults to the whole game.
+    :return: The actions made as CSR arrays ('action_offsets' per tick, 'action_slots' & 'action_ids' per action),
+      the 'mask_digests' of each tick before its actions & the 'state_digests' after reset & after each tick.
+    """
+    rng = np.random.default_rng(seed)
+    backend = GameBackend(map_filename)
+    game = backend.games[0]
+    max_ticks = game.max_steps_per_game if max_ticks is None else max_ticks
+    offsets, slots, action_ids, mask_digests = [0], [], [], []
+    state_digests = [digest(*backend.state_tables(0))]
+    for _ in range(max_ticks):
+        if game.is_game_over:
+            break
+        tick_slots = backend.idle_slots(0)
+        masks = backend.action_masks([tick_slots])[0]
+        tick_actions = np.where(masks > 0, rng.random(masks.shape), -1.0).argmax(axis=1)
+        backend.step([tick_slots], [tick_actions])
+        backend.update()
+        offsets.append(offsets[-1] + len(tick_slots))
+        slots.append(tick_slots)
+        action_ids.append(tick_actions)
+        mask_digests.append(digest(masks))
+        state_digests.append(digest(*backend.state_tables(0)))
+    return {
+        'version': np.array(TRACE_VERSION),
+        'map_filename': np.array(map_filename),
+        'seed': np.array(seed),
+        'action_offsets': np.array(offsets, dtype=np.int64),
+        'action_slots': np.concatenate(slots + [np.zeros(0, dtype=np.int64)]).astype(np.int32),
+        'action_ids': np.concatenate(action_ids + [np.zeros(0, dtype=np.int64)]).astype(np.uint8),
+        'mask_digests': np.array(mask_digests, dtype=np.uint64),
+        'state_digests': np.array(state_digests, dtype=np.uint64),
+    }
+
+
+def check_trace_batch(traces: Sequence[Dict[str, np.ndarray]], backend_cls: Callable = VectorGameBackend) \
+        -> List[Optional[str]]:
+    """Replay traces' actions on a backend & compare its masks & states to the recorded digests tick by tick.
+
+    :param traces: Traces of the same map, from `record_trace()` or `load_trace()`, replayed together in one backend.
+    :param backend_cls: Builds the backend to check from a map filename & a number of games, see `GameBackend`.
+    :return: A description of each trace's first divergent tick & unit, or None where the backend matches throughout.
+    """
+    assert all(int(trace['version']) == TRACE_VERSION for trace in traces), 'Unsupported trace version'
+    map_filename = str(traces[0]['map_filename'])
+    assert all(str(trace['map_filename']) == map_filename for trace in traces), 'Traces must share a map'
+    backend = backend_cls(map_filename, len(traces))
+    results: List[Optional[str]] = [None] * len(traces)
+    live = []  # traces without a divergence that have ticks left
+    for k, trace in enumerate(traces):
+        tables = backend.state_tables(k)
+        if digest(*tables) != trace['state_digests'][0]:
+            results[k] = _describe(trace, 0, tables=tables)
+        elif len(trace['mask_digests']):
+            live.append(k)
+
+    no_actions = np.zeros(0, dtype=np.int64)
+    tick = 0
+    while live:
+        slots, action_ids = [no_actions] * len(traces), [no_actions] * len(traces)
+        for k in live:
+            trace = traces[k]
+            start, stop = trace['action_offsets'][tick:tick + 2]
+            slots[k] = trace['action_slots'][start:stop].astype(np.int64)
+            action_ids[k] = trace['action_ids'][start:stop].astype(np.int64)
+        masks = backend.action_masks(slots)
+        for k in list(live):
+            if digest(masks[k].astype(np.uint8)) != traces[k]['mask_digests'][tick]:
+                results[k] = _describe(traces[k], tick, masks=masks[k])
+                live.remove(k)
+                slots[k] = action_ids[k] = no_actions
+        backend.step(slots, action_ids)
+        backend.update()
+        tick += 1
+        for k in list(live):
+            tables = backend.state_tables(k)
+            if digest(*tables) != traces[k]['state_digests'][tick]:
+                results[k] = _describe(traces[k], tick, tables=tables)
+                live.remove(k)
+            elif tick == len(traces[k]['mask_digests']):
+                live.remove(k)
+    return results
+
+
+def check_trace(trace: Dict[str, np.ndarray], backend_cls: Callable = VectorGameBackend) -> Optional[str]:
+    """Check a backend against one trace, see `check_trace_batch()`."""
+    return check_trace_batch([trace], backend_cls)[0]
+
+
+def _describe(trace: Dict[str, np.ndarray], tick: int, tables: Optional[Tuple[np.ndarray, np.ndarray]] = None,
+              masks: Optional[np.ndarray] = None) -> str:
+    """Find what diverged, the backend's state `tables` or `masks`, by replaying the reference to the same point."""
+    offsets = trace['action_offsets']
+    reference = GameBackend(str(trace['map_filename']))
+    for t in range(tick):
+        reference.step([trace['action_slots'][offsets[t]:offsets[t + 1]].astype(np.int64)],
+                       [trace['action_ids'][offsets[t]:offsets[t + 1]].astype(np.int64)])
+        reference.update()
+    where = f'{trace["map_filename"]} seed {int(trace["seed"])} tick {tick}'
+    expected_header, expected_units = reference.state_tables(0)
+    if masks is not None:
+        slots = trace['action_slots'][offsets[tick]:offsets[tick + 1]].astype(np.int64)
+        expected = reference.action_masks([slots])[0]
+        if masks.shape != expected.shape:
+            return f'{where}: action masks of shape {masks.shape} != {expected.shape}'
+        for slot, expected_mask, actual_mask in zip(slots, expected, masks.astype(np.uint8)):
+            if not np.array_equal(expected_mask, actual_mask):
+                return f'{where}: unit {expected_units[slot, 0]} action mask {actual_mask.tolist()} != ' \
+                       f'{expected_mask.tolist()}'
+        return f'{where}: action mask digest differs, but the masks are equal'
+    actual_header, actual_units = tables
+    for column, expected_value, actual_value in zip(HEADER_COLUMNS, expected_header, actual_header):
+        if expected_value != actual_value:
+            return f'{where}: {column} {actual_value} != {expected_value}'
+    if len(actual_units) != len(expected_units):
+        return f'{where}: number of units {len(actual_units)} != {len(expected_units)}'
+    for expected_row, actual_row in zip(expected_units, actual_units):
+        if not np.array_equal(expected_row, actual_row):
+            return f'{where}: unit {expected_row[0]} {dict(zip(UNIT_COLUMNS, actual_row.tolist()))} != ' \
+                   f'{dict(zip(UNIT_COLUMNS, expected_row.tolist()))}'
+    return f'{where}: state digest differs, but the state tables are equal'
+
+
+def save_trace(path: str, trace: Dict[str, np.ndarray]) -> None:
+    np.savez(path, **trace)
+
+
+def load_trace(path: str) -> Dict[str, np.ndarray]:
+    with np.load(path) as data:
+        return dict(data)
+
+
+def record_traces(output_dir: str, map_filenames: Optional[Sequence[str]] = None, num_seeds: int = NUM_SEEDS,
+                  max_ticks: Optional[int] = None, processes: Optional[int] = None) -> List[str]:
+    """Record golden traces of every map & seed across a process pool.
+
+    :param output_dir: The directory to write the traces to, created if needed.
+    :param map_filenames: The maps, defaults to all the bundled maps.
+    :param num_seeds: The seeds per map, 0 to `num_seeds` - 1.
+    :param max_ticks: The ticks per trace, defaults to whole games.
+    :param processes: The number of worker processes, defaults to the number of CPUs.
+    :return: The paths of the traces.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    jobs = [(os.path.join(output_dir, f'{os.path.basename(map_filename)}-{seed:05d}.npz'), map_filename, seed,
+             max_ticks) for map_filename in (map_filenames or bundled_maps()) for seed in range(num_seeds)]
+    with Pool(processes) as pool:
+        pool.starmap(_record_and_save, jobs)
+    return [job[0] for job in jobs]
+
+
+def check_traces(paths: Sequence[str], backend_cls: Callable = VectorGameBackend, batch_size: int = BATCH_SIZE,
+                 processes: Optional[int] = None) -> Dict[str, Optional[str]]:
+    """Check a backend against golden traces across a process pool.
+
+    Traces are grouped by map into batches, each replayed in one backend, so vectorised engines step a batch at once.
+
+    :param paths: The traces, or a directory of them.
+    :param backend_cls: Builds the backend to check, must be picklable, e.g. a class defined at module level.
+    :param batch_size: The most traces per backend.
+    :param processes: The number of worker processes, defaults to the number of CPUs.
+    :return: The first divergence of each trace, None where the backend matches.
+    """
+    if isinstance(paths, str):
+        paths = sorted(os.path.join(paths, name) for name in os.listdir(paths) if name.endswith('.npz'))
+    by_map = defaultdict(list)
+    for path in paths:
+        with np.load(path) as data:
+            by_map[str(data['map_filename'])].append(path)
+    batches = [map_paths[i:i + batch_size] for map_paths in by_map.values()
+               for i in range(0, len(map_paths), batch_size)]
+    with Pool(processes) as pool:
+        results = pool.starmap(_load_and_check, [(batch, backend_cls) for batch in batches])
+    return {path: result for batch, batch_results in zip(batches, results)
+            for path, result in zip(batch, batch_results)}
+
+
+def _record_and_save(path: str, map_filename: str, seed: int, max_ticks: Optional[int]) -> None:
+    save_trace(path, record_trace(map_filename, seed, max_ticks))
+
+
+def _load_and_check(paths: List[str], backend_cls: Callable) -> List[Optional[str]]:
+    return check_trace_batch([load_trace(path) for path in paths], backend_cls)
@@ -0,0 +1,176 @@
+from enum import Enum
+from typing import Optional
+
+import numpy as np
+
+from .actions import ActionEncodings
+from .distance_fields import DistanceFields, FIELD_NAMES, UNREACHABLE
+from .events import EventTypes
+from .units import Unit, STAT_COST, TYPE_PRODUCES, unit_class_codes
+
+MacroActions = Enum('MacroActions', ['IDLE', 'MOVE_TO', 'HARVEST', 'ATTACK', 'PRODUCE'], start=0)
+IDLE_TICKS = 10
+MACRO_TIMEOUT = 500  # ticks before any macro completes, so units are never stuck in one forever
+STUCK_TICKS = 50  # ticks without getting closer to the goal before a macro gives up
+DIRECTIONS = [(0, -1), (1, 0), (0, 1), (-1, 0)]  # UP, RIGHT, DOWN & LEFT, in the order of `ActionEncodings`
+NOOP = ActionEncodings.NOOP.value
+MOVE = ActionEncodings.MOVE_UP.value
+ATTACK = ActionEncodings.ATTACK_UP.value
+HARVEST = ActionEncodings.HARVEST_UP.value
+RETURN = ActionEncodings.RETURN_UP.value
+PRODUCE = ActionEncodings.PRODUCE_UP.value
+ENEMY, MINERAL, BASE = [FIELD_NAMES.index(name) for name in ('enemy', 'mineral', 'base')]
+
+
+class MacroAction:
+    """A high level action of a unit, expanded into a primitive action whenever the unit can act, until it completes.
+
+    Macros walk down distance fields from a `DistanceFields`, shared by all units, so paths are cached across units &
+      ticks rather than searched per unit.
+    Every macro completes after `timeout` ticks, or when it stops getting closer to its goal for `STUCK_TICKS`.
+    """
+
+    def __init__(self, unit_id: int, start_time: int, timeout: int = MACRO_TIMEOUT) -> None:
+        super().__init__()
+        self.unit_id = unit_id
+        self.start_time = start_time
+        self.timeout = timeout
+        self.best_distance = UNREACHABLE + 1
+        self.best_time = start_time  # when the unit last got closer to its goal
+
+    def is_done(self, game, unit: Unit, fields: DistanceFields) -> bool:
+        """Has the macro completed, checked before each of the unit's actions, except on the tick it started."""
+        return game.time - self.start_time >= self.timeout or game.time - self.best_time > STUCK_TICKS
+
+    def next_action(self, game, unit: Unit, fields: DistanceFields) -> int:
+        """Choose the unit's next primitive action, as an `ActionEncodings` value."""
+        raise NotImplementedError
+
+    def observe(self, events: np.ndarray) -> None:
+        """Follow the events of the last tick."""
+        pass
+
+    def _move(self, game, unit: Unit, field: np.ndarray, mask: np.ndarray) -> int:
+        """Move one cell down a distance field, or wait if blocked."""
+        distance = field[unit.y, unit.x]
+        if distance < self.best_distance:
+            self.best_distance, self.best_time = distance, game.time
+        best_action, best_distance = NOOP, distance
+        for direction, (dx, dy) in enumerate(DIRECTIONS):
+            if mask[MOVE + direction] and field[unit.y + dy, unit.x + dx] < best_distance:
+                best_action, best_distance = MOVE + direction, field[unit.y + dy, unit.x + dx]
+        return best_action
+
+    def _reset_progress(self, game) -> None:
+        """Start tracking progress towards a new goal."""
+        self.best_distance = UNREACHABLE + 1
+        self.best_time = game.time
+
+
+class IdleMacro(MacroAction):
+    """Do nothing for `IDLE_TICKS`."""
+
+    def is_done(self, game, unit, fields) -> bool:
+        return game.time - self.start_time >= IDLE_TICKS
+
+    def next_action(self, game, unit, fields) -> int:
+        return NOOP
+
+
+class MoveToMacro(MacroAction):
+    """Walk to a cell, completing there or once it can't be reached."""
+
+    def __init__(self, unit_id: int, start_time: int, x: int, y: int, timeout: int = MACRO_TIMEOUT) -> None:
+        super().__init__(unit_id, start_time, timeout)
+        self.x = x
+        self.y = y
+
+    def is_done(self, game, unit, fields) -> bool:
+        if not (0 <= self.x < game.width() and 0 <= self.y < game.height()):
+            return True
+        return (unit.x, unit.y) == (self.x, self.y) or \
+            fields.cell_field(game.state, self.x, self.y)[unit.y, unit.x] == UNREACHABLE or \
+            super().is_done(game, unit, fields)
+
+    def next_action(self, game, unit, fields) -> int:
+        if not (0 <= self.x < game.width() and 0 <= self.y < game.height()):
+            return NOOP
+        return self._move(game, unit, fields.cell_field(game.state, self.x, self.y), game.get_action_mask(unit))
+
+
+class HarvestMacro(MacroAction):
+    """Harvest the nearest minerals & return them to the nearest base, in a loop until no minerals or bases remain."""
+
+    def __init__(self, unit_id: int, start_time: int, timeout: int = MACRO_TIMEOUT) -> None:
+        super().__init__(unit_id, start_time, timeout)
+        self.carrying = None
+
+    def is_done(self, game, unit, fields) -> bool:
+        plane = BASE if unit.resources > 0 else MINERAL
+        return fields.planes(game.state, unit.player_id, game.time)[plane, unit.y, unit.x] == UNREACHABLE or \
+            super().is_done(game, unit, fields)
+
+    def next_action(self, game, unit, fields) -> int:
+        carrying = unit.resources > 0
+        if carrying != self.carrying:
+            self.carrying = carrying
+            self._reset_progress(game)
+        mask = game.get_action_mask(unit)
+        first = RETURN if carrying else HARVEST
+        legal = np.flatnonzero(mask[first:first + len(DIRECTIONS)])
+        if len(legal):
+            self._reset_progress(game)
+            return first + int(legal[0])
+        plane = fields.planes(game.state, unit.player_id, game.time)[BASE if carrying else MINERAL]
+        return self._move(game, unit, plane, mask)
+
+
+class AttackMacro(MacroAction):
+    """Walk to the nearest enemy & attack whatever enemy is adjacent, completing once a target dies."""
+
+    def __init__(self, unit_id: int, start_time: int, timeout: int = MACRO_TIMEOUT) -> None:
+        super().__init__(unit_id, start_time, timeout)
+        self.target_id: Optional[int] = None
+
+    def is_done(self, game, unit, fields) -> bool:
+        if self.target_id is not None:
+            target = game.units.get(self.target_id)
+            if target is None or target.position is None:
+                return True
+        return fields.planes(game.state, unit.player_id, game.time)[ENEMY, unit.y, unit.x] == UNREACHABLE or \
+            super().is_done(game, unit, fields)
+
+    def next_action(self, game, unit, fields) -> int:
+        mask = game.get_action_mask(unit)
+        legal = np.flatnonzero(mask[ATTACK:ATTACK + len(DIRECTIONS)])
+        if len(legal):
+            self._reset_progress(game)
+            dx, dy = DIRECTIONS[int(legal[0])]
+            for target in game.units.values():
+                if target.position is not None and (target.x, target.y) == (unit.x + dx, unit.y + dy):
+                    self.target_id = target.id
+            return ATTACK + int(legal[0])
+        return self._move(game, unit, fields.planes(game.state, unit.player_id, game.time)[ENEMY], mask)
+
+
+class ProduceMacro(MacroAction):
+    """Produce a number of units, of the first type the unit produces, next to it, waiting when it can't afford to."""
+
+    def __init__(self, unit_id: int, start_time: int, count: int, timeout: int = MACRO_TIMEOUT) -> None:
+        super().__init__(unit_id, start_time, timeout)
+        self.count = count
+        self.produced = 0
+
+    def is_done(self, game, unit, fields) -> bool:
+        return self.produced >= self.count or game.time - self.start_time >= self.timeout
+
+    def next_action(self, game, unit, fields) -> int:
+        cost = game.state.utt[TYPE_PRODUCES[unit_class_codes[unit.__class__]], STAT_COST]
+        if game.players[unit.player_id].minerals < cost:
+            return NOOP  # skip building the mask while saving up
+        legal = np.flatnonzero(game.get_action_mask(unit)[PRODUCE:PRODUCE + len(DIRECTIONS)])
+        return PRODUCE + int(legal[0]) if len(legal) else NOOP
+
+    def observe(self, events: np.ndarray) -> None:
+        self.produced += int(np.count_nonzero((events['type'] == EventTypes.PRODUCE.value) &
+                                              (events['unit_id'] == self.unit_id)))
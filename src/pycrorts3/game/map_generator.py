@@ -0,0 +1,178 @@
+from collections import deque
+from multiprocessing import Pool
+import os
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .map_layout import BINARY_MAP_EXTENSION, MapLayout
+from .units import BaseBuilding, Resource, WorkerUnit, unit_type_code
+
+SYMMETRIES = ('rotational', 'mirror')
+WALL_DENSITY = 0.1
+SMOOTHING = 2
+NUM_GAPS = 2
+MINERAL_FIELDS = 2
+PATCH_MINERALS = 20
+NUM_WORKERS = 1
+STARTING_MINERALS = 5
+MAX_ATTEMPTS = 100
+
+
+def generate_map(height: int, width: int, seed=None, symmetry: str = 'rotational', wall_density: float = WALL_DENSITY,
+                 smoothing: int = SMOOTHING, num_gaps: Optional[int] = NUM_GAPS, mineral_fields: int = MINERAL_FIELDS,
+                 patch_minerals: int = PATCH_MINERALS, num_workers: int = NUM_WORKERS,
+                 starting_minerals: int = STARTING_MINERALS, max_attempts: int = MAX_ATTEMPTS) -> MapLayout:
+    """Generate a random 2 player map, fair by construction.
+
+    Player 0's half is generated & player 1's is its mirror image, either rotated by 180 degrees or flipped top to
+      bottom.
+    Maps are retried until the bases are connected by a path around the walls & minerals.
+
+    :param height: The height of the map.
+    :param width: The width of the map.
+    :param seed: Anything accepted by `np.random.default_rng()`, the same seed always generates the same map.
+    :param symmetry: 'rotational' or 'mirror'.
+    :param wall_density: The fraction of cells that are walls, before clearing space around the bases.
+    :param smoothing: The number of times the wall noise is blurred, higher values clump walls together.
+    :param num_gaps: The number of gaps in a wall across the middle of the map, None for no wall.
+      Maps less than 8 high never have a wall.
+    :param mineral_fields: The number of mineral patches per player, the first next to the base.
+    :param patch_minerals: The minerals in each patch.
+    :param num_workers: The number of workers each player starts with, next to their base.
+    :param starting_minerals: The minerals each player starts with.
+    :param max_attempts: The number of maps to try before giving up.
+    :return: The map.
+    """
+    assert symmetry in SYMMETRIES, f'Unknown symmetry: {symmetry}'
+    assert 0 <= num_workers <= 8, 'Workers must fit around the base'
+    rng = np.random.default_rng(seed)
+    for _ in range(max_attempts):
+        layout = _try_generate(rng, height, width, symmetry, wall_density, smoothing, num_gaps, mineral_fields,
+                               patch_minerals, num_workers, starting_minerals)
+        if layout is not None:
+            return layout
+    raise RuntimeError(f'Failed to generate a connected {height}x{width} map in {max_attempts} attempts')
+
+
+def generate_maps(output_dir: str, num_maps: int, height: int, width: int, seed: int = 0,
+                  processes: Optional[int] = None, extensions: Sequence[str] = ('.xml', BINARY_MAP_EXTENSION),
+                  **kwargs) -> List[str]:
+    """Generate maps in bulk across a process pool.
+
+    Each map gets its own seed spawned from `seed`, so the maps are reproducible irrespective of the number of
+      processes.
+
+    :param output_dir: The directory to write the maps to, created if needed.
+    :param num_maps: The number of maps.
+    :param height: The height of the maps.
+    :param width: The width of the maps.
+    :param seed: The root seed.
+    :param processes: The number of worker processes, defaults to the number of CPUs.
+    :param extensions: The formats to write each map in, '.xml' and/or `BINARY_MAP_EXTENSION`.
+    :param kwargs: Passed to `generate_map()`.
+    :return: The paths of the maps without extensions, e.g. `output_dir/16x16_generated_00000`.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    seeds = np.random.SeedSequence(seed).spawn(num_maps)
+    paths = [os.path.join(output_dir, f'{height}x{width}_generated_{i:05d}') for i in range(num_maps)]
+    jobs = [(path, height, width, map_seed, tuple(extensions), kwargs) for path, map_seed in zip(paths, seeds)]
+    with Pool(processes) as pool:
+        pool.starmap(_generate_and_save, jobs, chunksize=max(1, num_maps // (4 * (processes or os.cpu_count()))))
+    return paths
+
+
+def _generate_and_save(path: str, height: int, width: int, seed, extensions: Tuple[str, ...], kwargs: dict) -> None:
+    layout = generate_map(height, width, seed, **kwargs)
+    for extension in extensions:
+        layout.save(path + extension)
+
+
+def _try_generate(rng: np.random.Generator, height: int, width: int, symmetry: str, wall_density: float,
+                  smoothing: int, num_gaps: Optional[int], mineral_fields: int, patch_minerals: int, num_workers: int,
+                  starting_minerals: int) -> Optional[MapLayout]:
+    def reflect(x: int, y: int) -> Tuple[int, int]:
+        return (width - 1 - x if symmetry == 'rotational' else x), height - 1 - y
+
+    # walls, clumped by blurring noise, then thresholded to the target density
+    noise = rng.random((height, width))
+    for _ in range(smoothing):
+        padded = np.pad(noise, 1, mode='edge')
+        noise = sum(padded[dy:dy + height, dx:dx + width] for dy in range(3) for dx in range(3)) / 9
+    terrain = (noise > np.quantile(noise, 1 - wall_density)).astype(np.uint8) if wall_density > 0 else \
+        np.zeros((height, width), dtype=np.uint8)
+
+    # chokepoint, a wall across the middle with gaps
+    has_wall = num_gaps is not None and height >= 8
+    half = (height - 1) // 2 if has_wall else height // 2  # player 0 owns the rows above this
+    if has_wall:
+        terrain[half:height - half] = 1
+        gaps = rng.choice(width, size=min(max(num_gaps, 1), width), replace=False)
+        terrain[half:height - half, gaps] = 0
+
+    # player 0's base, with space around it for workers
+    candidates = [(x, y) for y in range(half) for x in range(width)]
+    base_x, base_y = candidates[rng.integers(len(candidates))]
+    around = [(x, y) for y in range(base_y - 1, base_y + 2) for x in range(base_x - 1, base_x + 2)
+              if 0 <= x < width and 0 <= y < half and (x, y) != (base_x, base_y)]
+    terrain[base_y, base_x] = 0
+    for x, y in around:
+        terrain[y, x] = 0
+    if len(around) < num_workers:
+        return None
+    rng.shuffle(around)
+    workers = around[:num_workers]
+    occupied = {(base_x, base_y), *workers}
+
+    # mineral patches, the first close to the base & the rest anywhere in player 0's half
+    patches = []
+    for i in range(mineral_fields):
+        free = [(x, y) for y in range(half) for x in range(width) if (x, y) not in occupied and
+                (i > 0 or 2 <= abs(x - base_x) + abs(y - base_y) <= 3)]
+        if not free:
+            return None
+        patch = free[rng.integers(len(free))]
+        terrain[patch[1], patch[0]] = 0
+        patches.append(patch)
+        occupied.add(patch)
+
+    # mirror onto player 1's half
+    def mirror(cells: np.ndarray) -> np.ndarray:
+        return np.flipud(np.fliplr(cells) if symmetry == 'rotational' else cells)
+
+    terrain[height - half:] = mirror(terrain[:half])
+    terrain[half:height - half] &= mirror(terrain[half:height - half])  # open if open on either side
+    units = []
+    for player_id, place in ((0, lambda x, y: (x, y)), (1, reflect)):
+        units += [(unit_type_code(BaseBuilding), player_id, *place(base_x, base_y), 0, BaseBuilding.hitpoints)]
+        units += [(unit_type_code(WorkerUnit), player_id, *place(x, y), 0, WorkerUnit.hitpoints) for x, y in workers]
+    for place in (lambda x, y: (x, y), reflect):
+        units += [(unit_type_code(Resource), -1, *place(x, y), patch_minerals, Resource.hitpoints) for x, y in patches]
+    units = np.array([(unit_id, *unit) for unit_id, unit in enumerate(units)], dtype=np.int32)
+
+    # the bases must be connected, walking around walls & minerals
+    blocked = terrain.astype(bool)
+    for _, code, _, x, y, _, _ in units:
+        if code == unit_type_code(Resource):
+            blocked[y, x] = True
+    if not _is_reachable(blocked, (base_x, base_y), reflect(base_x, base_y)):
+        return None
+    return MapLayout(terrain, [(0, starting_minerals), (1, starting_minerals)], units)
+
+
+def _is_reachable(blocked: np.ndarray, start: Tuple[int, int], goal: Tuple[int, int]) -> bool:
+    """Breadth first search between 2 cells, the cells themselves may be blocked (e.g. by a base)."""
+    height, width = blocked.shape
+    seen = np.zeros_like(blocked)
+    seen[start[1], start[0]] = True
+    frontier = deque([start])
+    while frontier:
+        x, y = frontier.popleft()
+        for next_x, next_y in ((x, y - 1), (x + 1, y), (x, y + 1), (x - 1, y)):
+            if (next_x, next_y) == goal:
+                return True
+            if 0 <= next_x < width and 0 <= next_y < height and not seen[next_y, next_x] and \
+                    not blocked[next_y, next_x]:
+                seen[next_y, next_x] = True
+                frontier.append((next_x, next_y))
+    return False
@@ -0,0 +1,114 @@
+import os
+from typing import List, Tuple
+
+import numpy as np
+import pkg_resources
+import untangle
+
+from .units import unit_classes, unit_type_code
+
+BINARY_MAP_EXTENSION = '.rtsmap'
+BINARY_MAP_VERSION = 1
+UNIT_COLUMNS = ['id', 'type', 'player_id', 'x', 'y', 'resources', 'hitpoints']
+unit_type_names = {unit_type_code(unit_cls): name for name, unit_cls in unit_classes.items()}
+
+
+class MapLayout:
+    """The initial state of a map: terrain, players & units, independent of the file format it is stored in."""
+
+    def __init__(self, terrain: np.ndarray, players: List[Tuple[int, int]], units: np.ndarray) -> None:
+        """
+        :param terrain: A 2D uint8 array of shape (height, width), where 1 is a wall.
+        :param players: The (ID, minerals) of each player.
+        :param units: An int32 array with one row per unit & a column per `UNIT_COLUMNS`, where type is the unit type
+          code & player ID is -1 for minerals.
+        """
+        super().__init__()
+        self.terrain = terrain.astype(np.uint8)
+        self.players = [(int(player_id), int(minerals)) for player_id, minerals in players]
+        self.units = np.asarray(units, dtype=np.int32).reshape(-1, len(UNIT_COLUMNS))
+
+    @property
+    def height(self) -> int:
+        return self.terrain.shape[0]
+
+    @property
+    def width(self) -> int:
+        return self.terrain.shape[1]
+
+    def to_xml(self) -> str:
+        """Serialise as a microRTS map."""
+        lines = [f'<rts.PhysicalGameState width="{self.width}" height="{self.height}">',
+                 f'  <terrain>{"".join(str(cell) for cell in self.terrain.ravel())}</terrain>',
+                 '  <players>']
+        lines += [f'    <rts.Player ID="{player_id}" resources="{minerals}"/>' for player_id, minerals in self.players]
+        lines += ['  </players>', '  <units>']
+        for unit_id, code, player_id, x, y, resources, hitpoints in self.units:
+            lines.append(f'    <rts.units.Unit type="{unit_type_names[code]}" ID="{unit_id}" player="{player_id}" '
+                         f'x="{x}" y="{y}" resources="{resources}" hitpoints="{hitpoints}" />')
+        lines += ['  </units>', '</rts.PhysicalGameState>', '']
+        return '\n'.join(lines)
+
+    @staticmethod
+    def from_xml(xml: str) -> 'MapLayout':
+        """Parse a microRTS map."""
+        map_data = untangle.parse(xml).rts_PhysicalGameState
+        height, width = int(map_data['height']), int(map_data['width'])
+        terrain_str = map_data.terrain.cdata
+        assert height * width == len(terrain_str), 'Invalid map dimensions: height * width != len(terrain)'
+        terrain = np.frombuffer(terrain_str.encode('ascii'), dtype=np.uint8).reshape(height, width) - ord('0')
+        players = [(p['ID'], p['resources']) for p in map_data.players.rts_Player]
+        units = [(u['ID'], unit_type_code(unit_classes[u['type']]), u['player'], u['x'], u['y'], u['resources'] or 0,
+                  unit_classes[u['type']].hitpoints if u['hitpoints'] is None else u['hitpoints'])
+                 for u in map_data.units.rts_units_Unit]
+        return MapLayout(terrain, players, np.array(units, dtype=np.int32))
+
+    def to_bytes(self) -> bytes:
+        """Serialise in the binary format, see `from_bytes()`."""
+        header = [BINARY_MAP_VERSION, self.height, self.width, len(self.players), len(self.units)]
+        return b''.join([np.array(header, dtype=np.int32).tobytes(), np.array(self.players, dtype=np.int32).tobytes(),
+                         self.units.tobytes(), self.terrain.tobytes()])
+
+    @staticmethod
+    def from_bytes(data: bytes) -> 'MapLayout':
+        """Parse the binary format: an int32 header of (version, height, width, number of players, number of units),
+          then int32 (ID, minerals) per player, int32 `UNIT_COLUMNS` per unit & finally uint8 terrain."""
+        version, height, width, num_players, num_units = np.frombuffer(data, dtype=np.int32, count=5).tolist()
+        assert version == BINARY_MAP_VERSION, 'Unsupported binary map version'
+        offset = 5 * 4
+        players = np.frombuffer(data, dtype=np.int32, count=2 * num_players, offset=offset).reshape(-1, 2)
+        offset += players.nbytes
+        units = np.frombuffer(data, dtype=np.int32, count=num_units * len(UNIT_COLUMNS), offset=offset)
+        offset += units.nbytes
+        terrain = np.frombuffer(data, dtype=np.uint8, count=height * width, offset=offset).reshape(height, width)
+        return MapLayout(terrain, players.tolist(), units)
+
+    def save(self, path: str) -> None:
+        """Write to a file, as microRTS XML or in the binary format, depending on the file extension.
+
+        :param path: The path to write to, ending in '.xml' or `BINARY_MAP_EXTENSION`.
+        """
+        if path.endswith(BINARY_MAP_EXTENSION):
+            with open(path, 'wb') as f:
+                f.write(self.to_bytes())
+        else:
+            with open(path, 'w') as f:
+                f.write(self.to_xml())
+
+    @staticmethod
+    def load(map_filename: str) -> 'MapLayout':
+        """Load a map from a file, or one of the bundled maps.
+
+        :param map_filename: A path to an XML or binary map file, or the name of a bundled map, e.g. `4x4_melee_light2`.
+        :return: The map.
+        """
+        if map_filename.endswith(BINARY_MAP_EXTENSION):
+            with open(map_filename, 'rb') as f:
+                return MapLayout.from_bytes(f.read())
+        if os.path.isfile(map_filename):
+            with open(map_filename) as f:
+                return MapLayout.from_xml(f.read())
+        if not map_filename.endswith('.xml'):
+            map_filename += '.xml'
+        xml = pkg_resources.resource_string(__name__, os.path.join('maps', map_filename)).decode('utf-8')
+        return MapLayout.from_xml(xml)
@@ -0,0 +1,67 @@
+from typing import Dict, Optional, Set, Tuple
+
+import numpy as np
+
+from .position import Position
+from .units import Unit, unit_type_code, TYPE_PRODUCES
+
+
+class ActionMaskCache:
+    """Action masks of units, kept across ticks until something they depend on changes.
+
+    A unit's mask depends on its own position & load, the 4 cells around it (occupancy, ownership & reservations by
+      pending actions) and whether its player can afford what it produces.
+    `State` records cells & players that change, and `invalidate()` drops the masks of units next to them.
+    """
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.masks: Dict[int, np.ndarray] = {}
+        self.keys: Dict[int, Tuple[Position, bool, int]] = {}  # (position, carrying, player ID) the mask was built for
+        self.cells: Dict[Tuple[int, int], int] = {}  # the ID of the cached unit in each cell
+
+    def get(self, unit: Unit) -> Optional[np.ndarray]:
+        """Get a unit's cached mask, if still valid.
+
+        :param unit: The unit.
+        :return: The cached mask, else None.
+        """
+        key = self.keys.get(unit.id)
+        if key is None or key != (unit.position, unit.resources > 0, unit.player_id):
+            return None
+        return self.masks[unit.id]
+
+    def put(self, unit: Unit, mask: np.ndarray) -> None:
+        self.discard(unit.id)
+        self.masks[unit.id] = mask
+        self.keys[unit.id] = (unit.position, unit.resources > 0, unit.player_id)
+        self.cells[unit.position] = unit.id
+
+    def discard(self, unit_id: int) -> None:
+        key = self.keys.pop(unit_id, None)
+        if key is not None:
+            del self.masks[unit_id]
+            if self.cells.get(key[0]) == unit_id:
+                del self.cells[key[0]]
+
+    def invalidate(self, dirty_cells: Set[Tuple[int, int]], dirty_players: Set[int], units: Dict[int, Unit]) -> None:
+        """Drop the masks of units in or next to changed cells & of producers whose player's minerals changed.
+
+        :param dirty_cells: The cells that changed.
+        :param dirty_players: The players whose minerals crossed the cost of something they can produce.
+        :param units: All units, by ID.
+        """
+        for x, y in dirty_cells:
+            for cell in ((x, y), (x, y - 1), (x + 1, y), (x, y + 1), (x - 1, y)):
+                unit_id = self.cells.get(cell)
+                if unit_id is not None:
+                    self.discard(unit_id)
+        if dirty_players:
+            for unit_id, (_, _, player_id) in list(self.keys.items()):
+                if player_id in dirty_players and TYPE_PRODUCES[unit_type_code(units[unit_id].__class__)]:
+                    self.discard(unit_id)
+
+    def clear(self) -> None:
+        self.masks.clear()
+        self.keys.clear()
+        self.cells.clear()
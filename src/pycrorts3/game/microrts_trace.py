@@ -0,0 +1,216 @@
+from collections import Counter
+from contextlib import ExitStack
+import gzip
+from multiprocessing import Pool
+import os
+import re
+from typing import IO, Dict, Iterator, List, Optional, Sequence, Tuple
+import xml.etree.ElementTree as ElementTree
+import zipfile
+
+import numpy as np
+
+from .actions import ActionEncodings
+from .map_layout import MapLayout
+from .units import unit_classes, unit_produces, unit_type_code
+
+IMPORT_VERSION = 1
+TRACE_EXTENSIONS = ('.xml', '.xml.gz')
+# per recorded tick: the time, minerals & the number of rows it has in the unit & action tables, which are
+# concatenated over ticks, so a tick's rows start at the cumulative sum of the previous ticks' counts
+TICK_DTYPE = np.dtype([
+    ('time', '<i4'), ('minerals_0', '<i4'), ('minerals_1', '<i4'), ('num_units', '<i4'), ('num_actions', '<i4'),
+])
+UNIT_DTYPE = np.dtype([
+    ('id', '<i4'), ('type', 'u1'), ('player_id', 'i1'), ('x', '<i2'), ('y', '<i2'), ('hitpoints', '<i2'),
+    ('resources', '<i4'),
+])
+ACTION_DTYPE = np.dtype([('unit_id', '<i4'), ('action', 'u1')])  # action is an `ActionEncodings` value
+
+# microRTS `UnitAction` types, directional ones take a direction parameter in the order of `ActionEncodings`
+NONE, MOVE, HARVEST, RETURN, PRODUCE, ATTACK_LOCATION = range(6)
+DIRECTIONAL_ACTIONS = {
+    MOVE: ActionEncodings.MOVE_UP.value,
+    HARVEST: ActionEncodings.HARVEST_UP.value,
+    RETURN: ActionEncodings.RETURN_UP.value,
+    PRODUCE: ActionEncodings.PRODUCE_UP.value,
+}
+ATTACK_DIRECTIONS = {(0, -1): 0, (1, 0): 1, (0, 1): 2, (-1, 0): 3}  # by the offset of the target
+unit_class_names = {unit_cls: name for name, unit_cls in unit_classes.items()}
+
+
+def read_trace(stream: IO[bytes]) -> Tuple[Dict[str, np.ndarray], Dict[str, int]]:
+    """Convert a microRTS XML trace (`rts.Trace`) to per tick records, parsing it incrementally.
+
+    Only one `rts.TraceEntry` is held in memory at a time, so traces of any length are read in constant memory.
+    Units are mapped to `unit_classes` by type name & actions to `ActionEncodings`. Anything that has no equivalent
+      here, e.g. unknown unit types, ranged attacks, or producing any but the first type in `unit_produces`, is left out
+      of the records & counted in the issues.
+
+    :param stream: The binary stream of the XML.
+    :return: The trace - the initial 'map' as `MapLayout.to_bytes()`, 'ticks' (`TICK_DTYPE`), 'units' (`UNIT_DTYPE`),
+      'actions' (`ACTION_DTYPE`), 'issue_reasons' & 'issue_counts' - and the number of each issue, by reason.
+    """
+    issues = Counter()
+    layout = None
+    ticks, units, actions = [], [], []
+    for entry in _iter_entries(stream):
+        game_state = entry.find('rts.PhysicalGameState')
+        minerals = {int(player.get('ID')): int(player.get('resources')) for player in game_state.iter('rts.Player')}
+        entry_units = {}
+        for unit in game_state.iter('rts.units.Unit'):
+            unit_cls = unit_classes.get(unit.get('type'))
+            if unit_cls is None:
+                issues[f"unit type {unit.get('type')}"] += 1
+                continue
+            entry_units[int(unit.get('ID'))] = (unit_cls, int(unit.get('player')), int(unit.get('x')),
+                                                int(unit.get('y')), int(unit.get('hitpoints', unit_cls.hitpoints)),
+                                                int(unit.get('resources', 0)))
+        if layout is None:
+            layout = _to_layout(game_state, minerals, entry_units)
+
+        entry_actions = []
+        for action in entry.iter('action'):
+            unit_id = int(action.get('unitID'))
+            action_id, reason = _encode_action(entry_units.get(unit_id), action.find('UnitAction'))
+            if reason is None:
+                entry_actions.append((unit_id, action_id))
+            else:
+                issues[reason] += 1
+
+        ticks.append((int(entry.get('time')), minerals.get(0, 0), minerals.get(1, 0), len(entry_units),
+                      len(entry_actions)))
+        units.append(np.array([(unit_id, unit_type_code(unit_cls), player_id, x, y, hitpoints, resources)
+                               for unit_id, (unit_cls, player_id, x, y, hitpoints, resources) in entry_units.items()],
+                              dtype=UNIT_DTYPE))
+        actions.append(np.array(entry_actions, dtype=ACTION_DTYPE))
+    assert layout is not None, 'The trace has no entries'
+
+    reasons = sorted(issues)
+    trace = {
+        'version': np.array(IMPORT_VERSION),
+        'map': np.frombuffer(layout.to_bytes(), dtype=np.uint8),
+        'ticks': np.array(ticks, dtype=TICK_DTYPE),
+        'units': np.concatenate(units),
+        'actions': np.concatenate(actions),
+        'issue_reasons': np.array(reasons, dtype=str),
+        'issue_counts': np.array([issues[reason] for reason in reasons], dtype=np.int64),
+    }
+    return trace, dict(issues)
+
+
+def save_imported_trace(path: str, trace: Dict[str, np.ndarray]) -> None:
+    np.savez_compressed(path, **trace)
+
+
+def load_imported_trace(path: str) -> Dict[str, np.ndarray]:
+    with np.load(path) as data:
+        trace = dict(data)
+    assert int(trace['version']) == IMPORT_VERSION, 'Unsupported imported trace version'
+    return trace
+
+
+def trace_sources(paths: Sequence[str]) -> List[Tuple[str, Optional[str]]]:
+    """List the traces in files, zip archives & directories of them.
+
+    :param paths: Trace files (`TRACE_EXTENSIONS`), zip archives of them, or directories of either.
+    :return: The (path, archive member) of each trace, the member is None for traces that aren't in an archive.
+    """
+    sources = []
+    for path in paths:
+        if os.path.isdir(path):
+            sources += trace_sources([os.path.join(path, name) for name in sorted(os.listdir(path))])
+        elif path.endswith('.zip'):
+            with zipfile.ZipFile(path) as archive:
+                sources += [(path, member) for member in archive.namelist() if member.endswith(TRACE_EXTENSIONS)]
+        elif path.endswith(TRACE_EXTENSIONS):
+            sources.append((path, None))
+    return sources
+
+
+def import_traces(paths: Sequence[str], output_dir: str, processes: Optional[int] = None) -> Dict[str, Dict[str, int]]:
+    """Import microRTS traces across a process pool, one trace per task, writing a compressed `.npz` per trace.
+
+    :param paths: Trace files, zip archives of them, or directories of either, see `trace_sources()`.
+    :param output_dir: The directory to write the imported traces to, created if needed.
+    :param processes: The number of worker processes, defaults to the number of CPUs.
+    :return: The issues of each trace, by its path (joined with the member for archives), see `read_trace()`.
+      Traces that fail to parse aren't written & have a 'parse error' issue.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    jobs = [(path, member, os.path.join(output_dir, _output_filename(path, member)))
+            for path, member in trace_sources(paths)]
+    with Pool(processes) as pool:
+        results = pool.starmap(_import_and_save, jobs, chunksize=1)
+    return {path if member is None else os.path.join(path, member): issues
+            for (path, member, _), issues in zip(jobs, results)}
+
+
+def _iter_entries(stream: IO[bytes]) -> Iterator[ElementTree.Element]:
+    """Yield each complete `rts.TraceEntry`, dropping it from the parsed tree once it has been consumed."""
+    entries = None
+    for event, element in ElementTree.iterparse(stream, events=('start', 'end')):
+        if event == 'start' and element.tag == 'entries':
+            entries = element
+        elif event == 'end' and element.tag == 'rts.TraceEntry':
+            yield element
+            if entries is not None:
+                entries.clear()
+
+
+def _to_layout(game_state: ElementTree.Element, minerals: Dict[int, int], units: Dict[int, tuple]) -> MapLayout:
+    height, width = int(game_state.get('height')), int(game_state.get('width'))
+    terrain = game_state.find('terrain').text.strip()
+    if not terrain.isdigit():  # newer microRTS versions run length encode terrain, e.g. 'A12B3A'
+        terrain = ''.join(('0' if cell == 'A' else '1') * int(count or 1)
+                          for cell, count in re.findall(r'([AB])(\d*)', terrain))
+    assert height * width == len(terrain), 'Invalid map dimensions: height * width != len(terrain)'
+    terrain = np.frombuffer(terrain.encode('ascii'), dtype=np.uint8).reshape(height, width) - ord('0')
+    return MapLayout(terrain, sorted(minerals.items()),
+                     np.array([(unit_id, unit_type_code(unit_cls), player_id, x, y, resources, hitpoints)
+                               for unit_id, (unit_cls, player_id, x, y, hitpoints, resources) in units.items()]))
+
+
+def _encode_action(unit: Optional[tuple], unit_action: ElementTree.Element) -> Tuple[int, Optional[str]]:
+    """Map a microRTS `UnitAction` to an `ActionEncodings` value, or give the reason it can't be."""
+    if unit is None:
+        return -1, 'action of an unknown unit'
+    unit_cls, _, x, y, _, _ = unit
+    action_type = int(unit_action.get('type'))
+    if action_type == NONE:
+        return ActionEncodings.NOOP.value, None
+    if action_type == ATTACK_LOCATION:
+        direction = ATTACK_DIRECTIONS.get((int(unit_action.get('x')) - x, int(unit_action.get('y')) - y))
+        if direction is None:
+            return -1, f'{unit_class_names[unit_cls]} attack at range'
+        return ActionEncodings.ATTACK_UP.value + direction, None
+    if action_type not in DIRECTIONAL_ACTIONS:
+        return -1, f'action type {action_type}'
+    if action_type == PRODUCE:
+        produce_type = unit_action.get('unitType')
+        if unit_classes.get(produce_type) not in unit_produces.get(unit_cls, [])[:1]:
+            return -1, f'{unit_class_names[unit_cls]} produce {produce_type}'
+    return DIRECTIONAL_ACTIONS[action_type] + int(unit_action.get('parameter')), None
+
+
+def _output_filename(path: str, member: Optional[str]) -> str:
+    name = os.path.basename(path) if member is None else \
+        f"{os.path.splitext(os.path.basename(path))[0]}-{member.replace('/', '-')}"
+    return re.sub(r'\.xml(\.gz)?$', '.npz', name)
+
+
+def _import_and_save(path: str, member: Optional[str], output_path: str) -> Dict[str, int]:
+    with ExitStack() as stack:
+        if member is None:
+            stream = stack.enter_context(open(path, 'rb'))
+        else:
+            stream = stack.enter_context(stack.enter_context(zipfile.ZipFile(path)).open(member))
+        if (member or path).endswith('.gz'):
+            stream = stack.enter_context(gzip.GzipFile(fileobj=stream))
+        try:
+            trace, issues = read_trace(stream)
+        except (ElementTree.ParseError, AssertionError, AttributeError, TypeError, ValueError, KeyError) as e:
+            # malformed XML, missing elements (AttributeError on None), missing or non-numeric attributes
+            return {f'parse error: {e}': 1}
+    save_imported_trace(output_path, trace)
+    return issues
@@ -0,0 +1,196 @@
+from queue import Queue
+from threading import Thread
+from typing import Optional, Sequence
+
+import numpy as np
+
+from .state import State
+from .units import UnitEncoding, NUM_TYPE_CODES, RESOURCE_CODE, TYPE_IS_MOBILE, STAT_HITPOINTS
+
+SCALE = 8  # pixels per cell
+FLOOR_COLOUR = (24, 24, 24)
+WALL_COLOUR = (0, 96, 0)
+HP_COLOUR = (0, 220, 0)
+HP_LOST_COLOUR = (200, 0, 0)
+PLAYER_COLOURS = [(64, 128, 255), (255, 64, 64)]  # unit outlines, by player ID
+TYPE_COLOURS = {
+    RESOURCE_CODE: (0, 200, 0),
+    UnitEncoding.BaseBuilding.value: (255, 255, 255),
+    UnitEncoding.BarracksBuilding.value: (160, 160, 160),
+    UnitEncoding.WorkerUnit.value: (128, 128, 128),
+    UnitEncoding.LightUnit.value: (255, 128, 0),
+    UnitEncoding.HeavyUnit.value: (255, 255, 0),
+    UnitEncoding.RangedUnit.value: (0, 255, 255),
+}
+NUM_OWNERS = 1 + len(PLAYER_COLOURS)  # neutral, then each player
+
+
+class Renderer:
+    """Render games as RGB images, without a display.
+
+    Every cell is drawn as a `scale` x `scale` tile: floor or wall, with buildings & minerals as squares and mobile
+      units as circles, filled by unit type & outlined by owner, and a bar of the unit's hitpoints along the top.
+    Tiles are precomputed, so a frame is one gather from the tile atlas, which also upscales, for the whole batch.
+    """
+
+    def __init__(self, scale: int = SCALE) -> None:
+        super().__init__()
+        assert scale >= 1
+        self.scale = scale
+        self.tiles = self._build_tiles(scale)
+        self.bar_height = scale // 8 if scale >= 4 else 0
+
+    def render(self, state: State) -> np.ndarray:
+        """Render a game.
+
+        :param state: The state of the game.
+        :return: A uint8 array of shape (map_height * scale, map_width * scale, 3).
+        """
+        return self.render_batch([state])[0]
+
+    def render_batch(self, states: Sequence[State]) -> np.ndarray:
+        """Render several games on maps of the same size.
+
+        :param states: The states of the games.
+        :return: A uint8 array of shape (len(states), map_height * scale, map_width * scale, 3).
+        """
+        height, width = states[0].height, states[0].width
+        assert all(state.height == height and state.width == width for state in states), 'Maps must be the same size'
+        terrain = np.stack([state.terrain for state in states])
+        unit_types = np.stack([state.unit_map for state in states])
+        owners = np.full(unit_types.shape, -1, dtype=np.int8)
+        hitpoints = np.zeros(unit_types.shape, dtype=np.int32)
+        for k, state in enumerate(states):
+            for unit in state.units.values():
+                if unit.position is not None:
+                    owners[k, unit.y, unit.x] = unit.player_id
+                    hitpoints[k, unit.y, unit.x] = unit.hitpoints
+        return self.render_arrays(terrain, unit_types, owners, hitpoints, states[0].utt[:, STAT_HITPOINTS])
+
+    def render_vector_game(self, game, games: Optional[np.ndarray] = None) -> np.ndarray:
+        """Render the games of a `VectorGame`, straight from its arrays.
+
+        :param game: The `VectorGame`.
+        :param games: The indexes of the games to render, defaults to all.
+        :return: A uint8 array of shape (number of games, map_height * scale, map_width * scale, 3).
+        """
+        games = np.arange(game.num_games) if games is None else np.asarray(games)
+        slots = game.slot_map[games] - 1
+        occupied = slots >= 0
+        rows = np.broadcast_to(games[:, None, None], slots.shape)
+        owners = np.where(occupied, game.player_id[rows, slots], -1)
+        hitpoints = np.where(occupied, game.hitpoints[rows, slots], 0)
+        terrain = np.broadcast_to(game.terrain, slots.shape)
+        return self.render_arrays(terrain, game.unit_map[games], owners, hitpoints, game.utt[:, STAT_HITPOINTS])
+
+    def render_arrays(self, terrain: np.ndarray, unit_types: np.ndarray, owners: np.ndarray,
+                      hitpoints: np.ndarray, type_hitpoints: np.ndarray) -> np.ndarray:
+        """Render games described cell by cell.
+
+        :param terrain: An array of shape (K, map_height, map_width), 1 for walls.
+        :param unit_types: The unit type code in each cell, as `State.unit_map`, 0 if empty.
+        :param owners: The player ID of the unit in each cell, -1 if empty or neutral.
+        :param hitpoints: The hitpoints of the unit in each cell.
+        :param type_hitpoints: The full hitpoints of each unit type, of the UTT the games use.
+        :return: A uint8 array of shape (K, map_height * scale, map_width * scale, 3).
+        """
+        num_games, height, width = unit_types.shape
+        s = self.scale
+        tile = np.where(unit_types > 0, 2 + unit_types.astype(np.int32) * NUM_OWNERS + owners + 1, terrain)
+        frames = self.tiles[tile]  # (K, H, W, s, s, 3)
+
+        if self.bar_height:
+            has_bar = (unit_types > 0) & (unit_types != RESOURCE_CODE)
+            max_hitpoints = np.maximum(type_hitpoints[unit_types], 1)
+            filled = np.ceil(np.clip(hitpoints, 0, None) * s / max_hitpoints).astype(np.int32)
+            bar = np.where(np.arange(s) < filled[..., None], 0, 1)  # (K, H, W, s), 0 = hitpoints, 1 = lost
+            colours = np.array([HP_COLOUR, HP_LOST_COLOUR], dtype=np.uint8)[bar]
+            top = frames[:, :, :, :self.bar_height]
+            top[has_bar] = colours[has_bar][:, None]
+
+        return frames.transpose(0, 1, 3, 2, 4, 5).reshape(num_games, height * s, width * s, 3)
+
+    @staticmethod
+    def _build_tiles(scale: int) -> np.ndarray:
+        """Build the tile atlas: floor, wall, then a tile per unit type code & owner (neutral, player 0, player 1)."""
+        tiles = np.zeros((2 + NUM_TYPE_CODES * NUM_OWNERS, scale, scale, 3), dtype=np.uint8)
+        tiles[:] = FLOOR_COLOUR
+        tiles[1] = WALL_COLOUR
+
+        centre = (np.arange(scale) + 0.5) / scale - 0.5  # pixel centres, from -0.5 to 0.5
+        square = np.maximum(np.abs(centre)[:, None], np.abs(centre)[None, :])  # distance in the max-norm
+        circle = np.hypot(centre[:, None], centre[None, :])
+        border = max(1, scale // 8) / scale
+        for code, colour in TYPE_COLOURS.items():
+            distance = circle if TYPE_IS_MOBILE[code] else square
+            radius = 0.4 if TYPE_IS_MOBILE[code] or code == RESOURCE_CODE else 0.5
+            shape = distance < radius if scale >= 4 else np.ones((scale, scale), dtype=bool)
+            outline = shape & (distance >= radius - border) if scale >= 4 else np.zeros_like(shape)
+            for owner in range(NUM_OWNERS):
+                tile = tiles[2 + code * NUM_OWNERS + owner]
+                tile[shape] = colour
+                if owner > 0:
+                    tile[outline] = PLAYER_COLOURS[owner - 1]
+        return tiles
+
+
+class FrameWriter:
+    """Write frames to a video or GIF in a background thread, so recording doesn't slow the game down.
+
+    Encoding uses `imageio` (with `imageio-ffmpeg` for videos), which is only needed when recording.
+    Frames are copied when written, so the caller can reuse its buffers.
+    """
+
+    def __init__(self, path: str, fps: int = 10, max_queued: int = 256) -> None:
+        """
+        :param path: The file to write, the format is chosen by the extension, e.g. '.gif' or '.mp4'.
+        :param fps: The frames per second.
+        :param max_queued: The number of frames to buffer before `write()` blocks, bounding memory use.
+        """
+        super().__init__()
+        import imageio  # optional dependency
+        self.writer = imageio.get_writer(path, fps=fps) if not path.endswith('.gif') else \
+            imageio.get_writer(path, duration=1000 / fps, loop=0)
+        self.queue: Queue = Queue(max_queued)
+        self.error: Optional[BaseException] = None  # that stopped the worker, raised by the next `write()` or `close()`
+        self.thread = Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def write(self, frames: np.ndarray) -> None:
+        """Queue a frame of shape (height, width, 3), or a batch of frames of shape (N, height, width, 3)."""
+        frames = np.array(frames, dtype=np.uint8)
+        for frame in (frames if frames.ndim == 4 else [frames]):
+            self._raise_error()
+            self.queue.put(frame)
+
+    def close(self) -> None:
+        """Finish writing the queued frames & close the file."""
+        self.queue.put(None)
+        self.thread.join()
+        try:
+            self.writer.close()
+        except Exception:
+            if self.error is None:
+                raise
+        self._raise_error()
+
+    def _run(self) -> None:
+        while True:
+            frame = self.queue.get()
+            if frame is None:
+                return
+            if self.error is None:  # after an error, keep emptying the queue so `write()` & `close()` can't block
+                try:
+                    self.writer.append_data(frame)
+                except BaseException as e:
+                    self.error = e
+
+    def _raise_error(self) -> None:
+        if self.error is not None:
+            raise RuntimeError('Writing frames failed') from self.error
+
+    def __enter__(self) -> 'FrameWriter':
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
@@ -1,46 +1,55 @@
 from copy import deepcopy
 from math import sqrt
-import os
-from typing import Dict, Optional, Type
+from typing import Dict, Optional, Set, Tuple, Type
 
 import numpy as np
-import pkg_resources
-import untangle
 
-from .actions import ActionEncodings, action_encoding_classes, Action, NoopAction, MoveAction, AttackAction, \
+from .actions import ActionEncodings, ActionTypes, action_encoding_classes, Action, NoopAction, MoveAction, AttackAction, \
     HarvestAction, ReturnAction, ProduceAction
+from .events import EventBuffer, EventTypes
+from .map_layout import MapLayout
 from .player import Player
 from .position import Position, cardinal_to_euclidean
-from .units import Unit, UnitEncoding, unit_produces, Resource, BaseBuilding, BarracksBuilding, WorkerUnit
+from .units import Unit, UnitEncoding, unit_produces, Resource, BaseBuilding, BarracksBuilding, WorkerUnit, \
+    RESOURCE_CODE, BASE_CODE, TYPE_PRODUCES, TYPE_IS_MOBILE, TYPE_IS_WORKER, UTT_VERSION, STAT_COST, STAT_HITPOINTS, \
+    STAT_MAX_DAMAGE, compile_unit_type_table, unit_type_code, unit_code_classes, unit_class_codes
+from .zobrist import zobrist_key, UNIT, HITPOINTS, RESOURCES, MINERALS, ACTION
 
 HARVEST_AMOUNT = 1
+DIRECTION_DX = np.array([0, 1, 0, -1], dtype=np.int32)  # of the UP, RIGHT, DOWN & LEFT actions of `ActionEncodings`
+DIRECTION_DY = np.array([-1, 0, 1, 0], dtype=np.int32)
+ENTITY_FEATURES = ['type', 'owner', 'x', 'y', 'hitpoints', 'resources', 'busy']
 
 
 class State:
-    def __init__(self, map_filename: str) -> None:
+    def __init__(self, map_filename: str, utt_version=UTT_VERSION) -> None:
         super().__init__()
-        map_data = self._read_map_file(map_filename)
+        layout = MapLayout.load(map_filename)
+
+        # unit stats, by type code & `STAT_*`, shared by all states of the same UTT
+        self.utt = compile_unit_type_table(utt_version)
+        self.produce_costs = sorted(set(self.utt[TYPE_PRODUCES[TYPE_PRODUCES > 0], STAT_COST].tolist()))
 
         # players
-        self.players = [Player.from_xml(p) for p in map_data.rts_PhysicalGameState.players.rts_Player]
+        self.players = [Player(player_id, minerals) for player_id, minerals in layout.players]
 
         # terrain
-        self.height = int(map_data.rts_PhysicalGameState['height'])
-        self.width = int(map_data.rts_PhysicalGameState['width'])
-        terrain_str = map_data.rts_PhysicalGameState.terrain.cdata
-        assert self.height * self.width == len(terrain_str), 'Invalid map dimensions: height * width != len(terrain)'
-        self.terrain = np.zeros((self.height, self.width), dtype=np.uint8)
-        i = 0
-        for y in range(self.height):
-            for x in range(self.width):
-                self.terrain[y, x] = terrain_str[i]
-                i += 1
+        self.height = layout.height
+        self.width = layout.width
+        self.terrain = layout.terrain.copy()
 
         # units
         self.units: Dict[int, Unit] = {}
         self.unit_map = np.zeros((self.height, self.width), dtype=np.uint8)
-        for unit_xml in map_data.rts_PhysicalGameState.units.rts_units_Unit:
-            unit = Unit.from_xml(unit_xml)
+        self.hash = 0  # Zobrist hash, maintained incrementally as the state changes
+        self.journal: Optional[list] = None  # undo log of (function, args), only recorded while not None
+        self.events = EventBuffer()  # what happened during the current tick
+        self.dirty_cells: Set[Tuple[int, int]] = set()  # cells changed since last consumed, e.g. by the mask cache
+        self.dirty_players: Set[int] = set()  # players whose minerals crossed the cost of something they produce
+        for player in self.players:
+            self.hash ^= zobrist_key(MINERALS, player.id, player.minerals)
+        for unit_id, code, player_id, x, y, resources, hitpoints in layout.units.tolist():
+            unit = unit_code_classes[code](unit_id, player_id, Position(x, y), hitpoints, resources)
             self.add_unit(unit)
 
         self.initial_values = {
@@ -48,6 +57,7 @@ class State:
             'terrain': deepcopy(self.terrain),
             'units': deepcopy(self.units),
             'unit_map': deepcopy(self.unit_map),
+            'hash': self.hash,
         }
 
     def reset(self) -> None:
@@ -55,6 +65,10 @@ class State:
         self.terrain = deepcopy(self.initial_values['terrain'])
         self.units = deepcopy(self.initial_values['units'])
         self.unit_map = deepcopy(self.initial_values['unit_map'])
+        self.hash = self.initial_values['hash']
+        self.journal = None
+        self.dirty_cells.clear()
+        self.dirty_players.clear()
 
     def move_unit(self, unit_id: int, new_position: Position) -> None:
         """Move a unit to a new position.
@@ -67,10 +81,15 @@ class State:
         old_x, old_y = unit.position
         new_x, new_y = new_position
         assert self.terrain[new_y, new_x] == 0 and self.unit_map[new_y, new_x] == 0
-        self.unit_map[new_y, new_x], self.unit_map[old_y, old_x] = self.unit_map[old_y, old_x], 0
+        self._set_cell(new_x, new_y, self.unit_map[old_y, old_x])
+        self._set_cell(old_x, old_y, 0)
+        self.hash ^= self._unit_key(unit)
+        self.record(setattr, unit, 'position', unit.position)
         unit.position = new_position
+        self.hash ^= self._unit_key(unit)
+        self.events.append(EventTypes.MOVE, unit.player_id, unit.id, -1, new_x, new_y)
 
-    def attack_unit(self, unit_id: int, attack_position: Position) -> Optional[Unit]:
+    def attack_unit(self, unit_id: int, attack_position: Position, damage: Optional[int] = None) -> Optional[Unit]:
         """Execute an attack action.
 
         If the target moves or dies before the action executes, the attack does not occur.
@@ -79,6 +98,7 @@ class State:
 
         :param unit_id: The ID of the attacking unit.
         :param attack_position: The cell to attack.
+        :param damage: The damage dealt, defaults to the attacker's max damage.
         :return: An optional target unit if dead, else None.
         """
         attacker = self.units[unit_id]
@@ -89,15 +109,24 @@ class State:
         else:
             return None  # target may have move or died before attack action executed
         assert not isinstance(target, Resource)
-        target.hitpoints -= attacker.deal_damage()
+        if damage is None:
+            damage = int(self.utt[unit_class_codes[attacker.__class__], STAT_MAX_DAMAGE])
+        self.set_hitpoints(target, target.hitpoints - damage)
+        self.events.append(EventTypes.DAMAGE, attacker.player_id, attacker.id, target.id, target.x, target.y, damage)
         if target.hitpoints <= 0:
+            self.events.append(EventTypes.KILL, attacker.player_id, attacker.id, target.id, target.x, target.y,
+                               unit_type_code(target.__class__))
             return target
 
     def add_unit(self, unit: Unit) -> None:
         self.units[unit.id] = unit
+        self.record(self.units.pop, unit.id)
         # self.unit_map[unit.y, unit.x] = UnitEncoding[unit.__class__.__name__].value
         value = 2 if isinstance(unit, Resource) else UnitEncoding[unit.__class__.__name__].value
-        self.unit_map[unit.y, unit.x] = value
+        self._set_cell(unit.x, unit.y, value)
+        self.hash ^= self._unit_key(unit)
+        self.hash ^= zobrist_key(HITPOINTS, unit.id, unit.hitpoints)
+        self.hash ^= zobrist_key(RESOURCES, unit.id, unit.resources)
 
     def remove_unit(self, unit: Unit) -> None:
         """Remove a unit from the game (e.g. after it has died or been mined out).
@@ -107,9 +136,96 @@ class State:
 
         :param unit: The unit to remove.
         """
-        self.unit_map[unit.y, unit.x] = 0
+        self._set_cell(unit.x, unit.y, 0)
+        self.hash ^= self._unit_key(unit)
+        self.record(setattr, unit, 'position', unit.position)
         unit.position = None
 
+    def set_hitpoints(self, unit: Unit, hitpoints: int) -> None:
+        self.hash ^= zobrist_key(HITPOINTS, unit.id, unit.hitpoints) ^ zobrist_key(HITPOINTS, unit.id, hitpoints)
+        self.record(setattr, unit, 'hitpoints', unit.hitpoints)
+        unit.hitpoints = hitpoints
+
+    def set_resources(self, unit: Unit, resources: int) -> None:
+        self.hash ^= zobrist_key(RESOURCES, unit.id, unit.resources) ^ zobrist_key(RESOURCES, unit.id, resources)
+        self.record(setattr, unit, 'resources', unit.resources)
+        unit.resources = resources
+        if unit.position is not None:
+            self.dirty_cells.add((unit.x, unit.y))
+
+    def set_minerals(self, player: Player, minerals: int) -> None:
+        self.hash ^= zobrist_key(MINERALS, player.id, player.minerals) ^ zobrist_key(MINERALS, player.id, minerals)
+        self.record(setattr, player, 'minerals', player.minerals)
+        if any((player.minerals >= cost) != (minerals >= cost) for cost in self.produce_costs):
+            self.dirty_players.add(player.id)
+        player.minerals = minerals
+
+    def _set_cell(self, x: int, y: int, value: int) -> None:
+        self.record(self._restore_cell, x, y, self.unit_map[y, x])
+        self.unit_map[y, x] = value
+        self.dirty_cells.add((x, y))
+
+    def _restore_cell(self, x: int, y: int, value: int) -> None:
+        self.unit_map[y, x] = value
+        self.dirty_cells.add((x, y))
+
+    def record(self, undo, *args) -> None:
+        """Record how to undo a mutation in the journal, if journaling.
+
+        :param undo: The function that reverts the mutation.
+        :param args: The arguments to call it with.
+        """
+        if self.journal is not None:
+            self.journal.append((undo, args))
+
+    def undo(self, length: int) -> None:
+        """Revert journaled mutations, most recent first, until the journal is back to a length.
+
+        The hash isn't journaled, it is restored by the caller.
+
+        :param length: The length of the journal to revert to.
+        """
+        journal = self.journal
+        while len(journal) > length:
+            undo, args = journal.pop()
+            undo(*args)
+
+    def toggle_action(self, action: Action) -> None:
+        """Add or remove a pending action from the state hash.
+
+        Pending actions are kept by `Game`, which calls this whenever an action becomes pending or stops being pending.
+
+        :param action: The action.
+        """
+        self.hash ^= self._action_key(action)
+
+    def compute_hash(self, pending_actions=()) -> int:
+        """Compute the Zobrist hash from scratch, e.g. to check the incrementally maintained `self.hash`.
+
+        :param pending_actions: The actions pending in the game.
+        :return: The 64-bit hash.
+        """
+        h = 0
+        for player in self.players:
+            h ^= zobrist_key(MINERALS, player.id, player.minerals)
+        for unit in self.units.values():
+            if unit.position is not None:
+                h ^= self._unit_key(unit)
+            h ^= zobrist_key(HITPOINTS, unit.id, unit.hitpoints)
+            h ^= zobrist_key(RESOURCES, unit.id, unit.resources)
+        for action in pending_actions:
+            h ^= self._action_key(action)
+        return h
+
+    @staticmethod
+    def _unit_key(unit: Unit) -> int:
+        return zobrist_key(UNIT, unit.id, unit_class_codes[unit.__class__], unit.player_id, unit.x, unit.y)
+
+    @staticmethod
+    def _action_key(action: Action) -> int:
+        action_type = ActionTypes[action.__class__.__name__].value
+        return zobrist_key(ACTION, action.unit_id, action_type, action.position.x, action.position.y, action.end_time)
+
     def harvest(self, unit_id: int, harvest_position: Position) -> None:
         """A worker unit harvests minerals from an adjacent mineral patch.
 
@@ -126,8 +242,10 @@ class State:
             return
         harvest_amount = HARVEST_AMOUNT if minerals.resources > HARVEST_AMOUNT else minerals.resources
         assert harvest_amount > 0
-        harvester.resources += harvest_amount
-        minerals.resources -= harvest_amount
+        self.set_resources(harvester, harvester.resources + harvest_amount)
+        self.set_resources(minerals, minerals.resources - harvest_amount)
+        self.events.append(EventTypes.HARVEST, harvester.player_id, harvester.id, minerals.id, minerals.x, minerals.y,
+                           harvest_amount)
         assert minerals.resources >= 0
         if minerals.resources == 0:
             self.remove_unit(minerals)
@@ -150,8 +268,10 @@ class State:
             return
         assert self._manhattan_distance(harvester.position, base.position) == 1
         player = self.players[harvester.player_id]
-        player.minerals += harvester.resources
-        harvester.resources = 0
+        self.events.append(EventTypes.RETURN, harvester.player_id, harvester.id, base.id, base.x, base.y,
+                           harvester.resources)
+        self.set_minerals(player, player.minerals + harvester.resources)
+        self.set_resources(harvester, 0)
 
     def produce(self, unit_id: int, produce_position: Position, produce_type: Type[Unit]) -> None:
         producer = self.units[unit_id]
@@ -160,13 +280,18 @@ class State:
         x, y = produce_position
         if self.terrain[y, x] != 0 or self.unit_map[y, x] != 0:
             return
-        if player.minerals < produce_type.cost:
+        produce_code = unit_class_codes[produce_type]
+        cost = int(self.utt[produce_code, STAT_COST])
+        if player.minerals < cost:
             return
-        player.minerals -= produce_type.cost
+        self.set_minerals(player, player.minerals - cost)
         unit_ids = sorted(self.units.keys())
         new_unit_id = unit_ids[-1] + 1
-        new_unit = produce_type(new_unit_id, producer.player_id, produce_position)
+        new_unit = produce_type(new_unit_id, producer.player_id, produce_position,
+                                int(self.utt[produce_code, STAT_HITPOINTS]))
         self.add_unit(new_unit)
+        self.events.append(EventTypes.PRODUCE, producer.player_id, producer.id, new_unit.id, x, y,
+                           unit_type_code(produce_type))
 
     def is_legal_action(self, action: Action) -> bool:
         """Check an action is consistent with game rules/state?
@@ -235,7 +360,7 @@ class State:
                 return False  # producer doesn't produce that unit type
             player = self.players[producer.player_id]
             producing = action.produce_type
-            if producing.cost > player.minerals:
+            if self.utt[unit_class_codes[producing], STAT_COST] > player.minerals:
                 return False  # can't afford
             if self.terrain[y, x] != 0 or self.unit_map[y, x] != 0:
                 return False  # new unit location must be vacant
@@ -256,7 +381,7 @@ class State:
             action_cls = action_encoding_classes[action_type]
             new_posn = cardinal_to_euclidean(unit.position, action_type.name)
             if action_cls == ProduceAction:
-                produces = unit_produces[unit.__class__]
+                produces = unit_produces.get(unit.__class__)
                 if not produces:
                     mask[action_type.value] = 0
                     continue
@@ -267,6 +392,41 @@ class State:
             mask[action_type.value] = int(self.is_legal_action(action))
         return np.array(mask, dtype=np.uint8)
 
+    def get_action_mask_grid(self, player_id: int) -> np.ndarray:
+        """Generate a bit mask for all actions of every cell holding one of a player's units.
+
+        Equivalent to `get_action_mask()` for each of the player's units, but computed for the whole board at once
+          by comparing every cell with its 4 neighbours.
+        Cells without a unit of the player are all 0.
+
+        :param player_id: The ID of the player to generate the mask for.
+        :return: A boolean numpy array of shape (map_height, map_width, len(ActionEncodings)).
+        """
+        owner = np.full((self.height, self.width), -1, dtype=np.int8)
+        carrying = np.zeros((self.height, self.width), dtype=bool)
+        for unit in self.units.values():
+            if unit.position is not None:
+                owner[unit.y, unit.x] = unit.player_id
+                carrying[unit.y, unit.x] = unit.resources > 0
+        own = owner == player_id
+        unit_type = self.unit_map
+        vacant = _neighbours((self.terrain == 0) & (self.unit_map == 0), False)
+        neighbour_type = _neighbours(self.unit_map, 0)
+        neighbour_owner = _neighbours(owner, -1)
+        mobile = (own & TYPE_IS_MOBILE[unit_type])[:, :, None]
+        worker = (own & TYPE_IS_WORKER[unit_type])[:, :, None]
+        produces = TYPE_PRODUCES[unit_type]
+        can_produce = own & (produces > 0) & (self.utt[produces, STAT_COST] <= self.players[player_id].minerals)
+
+        mask = np.zeros((self.height, self.width, len(ActionEncodings)), dtype=bool)
+        mask[:, :, 0] = own
+        mask[:, :, 1:5] = mobile & vacant
+        mask[:, :, 5:9] = mobile & (neighbour_owner == 1 - player_id)
+        mask[:, :, 9:13] = worker & ~carrying[:, :, None] & (neighbour_type == RESOURCE_CODE)
+        mask[:, :, 13:17] = worker & carrying[:, :, None] & (neighbour_type == BASE_CODE) & (neighbour_owner == player_id)
+        mask[:, :, 17:21] = can_produce[:, :, None] & vacant
+        return mask
+
     def get_unit(self, unit_id: int) -> Unit:
         return self.units[unit_id]
 
@@ -289,6 +449,59 @@ class State:
             #     raise ValueError
         return state
 
+    def to_array_player(self, player_id: int) -> np.ndarray:
+        """Export a 2D representation of the game state from a player's perspective.
+
+        :param player_id: The ID of the player from which the state is presented.
+        :return: A 2D numpy array of shape (map_height, map_width).
+        """
+        state = self.terrain.copy() + self.unit_map.copy()
+        for other in self.units.values():
+            if other.is_dead() or other.position is None:
+                continue
+            elif other.player_id == player_id:
+                state[other.y, other.x] += len(UnitEncoding)
+        return state
+
+    def to_unit_table(self) -> np.ndarray:
+        """Export the units on the board as a table, one row per unit in `self.units` order.
+
+        :return: A numpy array of shape (num_units, len(ENTITY_FEATURES) + 1), where the first column is the unit ID and
+          the rest hold the absolute value of each feature in `ENTITY_FEATURES`.
+        """
+        rows = [(unit.id, unit_class_codes[unit.__class__], unit.player_id, unit.x, unit.y, unit.hitpoints,
+                 unit.resources, unit.has_pending_action)
+                for unit in self.units.values() if unit.position is not None]
+        return np.array(rows, dtype=np.int32).reshape(-1, len(ENTITY_FEATURES) + 1)
+
+    def to_entities(self, unit_id: int, max_entities: int, unit_table: Optional[np.ndarray] = None) \
+            -> Tuple[np.ndarray, int]:
+        """Export the units on the board as a fixed-size list of entities from a unit's perspective.
+
+        The unit itself is the first entity, followed by the other units nearest first.
+        Positions are relative to the unit & owners are 1=own, -1=enemy, 0=neutral.
+        If there are more than `max_entities` units, the furthest are dropped, if fewer the remaining rows are 0.
+
+        :param unit_id: The ID of the unit from which the state is presented.
+        :param max_entities: The number of rows of the list.
+        :param unit_table: The output of `to_unit_table()`, to share across units, else it will be generated.
+        :return: A numpy array of shape (max_entities, len(ENTITY_FEATURES)) & the number of valid rows.
+        """
+        table = self.to_unit_table() if unit_table is None else unit_table
+        unit = self.units[unit_id]
+        entities = table[:, 1:].copy()
+        if unit.position is not None:
+            entities[:, 2] -= unit.x
+            entities[:, 3] -= unit.y
+        distance = np.abs(entities[:, 2]) + np.abs(entities[:, 3])
+        distance[table[:, 0] == unit_id] = -1  # self first
+        entities = entities[np.argsort(distance, kind='stable')[:max_entities]]
+        player_id = entities[:, 1].copy()
+        entities[:, 1] = np.where(player_id == unit.player_id, 1, np.where(player_id < 0, 0, -1))
+        output = np.zeros((max_entities, len(ENTITY_FEATURES)), dtype=np.int8)
+        output[:len(entities)] = np.clip(entities, np.iinfo(np.int8).min, np.iinfo(np.int8).max)
+        return output, len(entities)
+
     def to_array_global(self) -> np.ndarray:
         """Export a 2D representation of the game state.
 
@@ -302,16 +515,6 @@ class State:
                 state[other.y, other.x] += len(UnitEncoding)
         return state
 
-    @staticmethod
-    def _read_map_file(map_filename: str):
-        """Read a XML microRTS map file.
-
-        :param map_filename: The name of the file, e.g. `4x4_melee_light2`
-        :return: The map data.
-        """
-        map_data = pkg_resources.resource_string(__name__, os.path.join('maps', map_filename + '.xml')).decode('utf-8')
-        return untangle.parse(map_data)
-
     @staticmethod
     def _manhattan_distance(start: Position, goal: Position) -> int:
         return abs(goal.x - start.x) + abs(goal.y - start.y)
@@ -319,3 +522,63 @@ class State:
     @staticmethod
     def _euclidean_distance(start: Position, goal: Position) -> float:
         return sqrt((goal.x - start.x) ** 2 + (goal.y + start.y) ** 2)
+
+
+def action_masks(unit_map: np.ndarray, terrain: np.ndarray, utt: np.ndarray, table: np.ndarray, rows: np.ndarray,
+                 minerals: np.ndarray) -> np.ndarray:
+    """Get the legal actions of many units at once.
+
+    Equivalent to `State.get_action_mask()` for each unit, but computed with array operations on the 4 cells next to
+      each unit, so the cost hardly grows with the number of units.
+    The board can be the boards of many games, e.g. stacked with walls between them.
+
+    :param unit_map: The unit type code of every cell, as `State.unit_map`.
+    :param terrain: The terrain of every cell, non-zero for walls.
+    :param utt: The unit stats, as `State.utt`.
+    :param table: The units on the board, as `State.to_unit_table()`.
+    :param rows: The rows of the table of the units.
+    :param minerals: The minerals of the player of each unit.
+    :return: A boolean numpy array of shape (len(rows), len(ActionEncodings)).
+    """
+    # the board with a border of walls, so the cells next to a unit are always on it
+    cell_type = np.zeros((unit_map.shape[0] + 2, unit_map.shape[1] + 2), dtype=unit_map.dtype)
+    cell_type[1:-1, 1:-1] = unit_map
+    walls = np.ones(cell_type.shape, dtype=bool)
+    walls[1:-1, 1:-1] = terrain != 0
+    owner = np.full(cell_type.shape, -1, dtype=np.int32)
+    owner[table[:, 4] + 1, table[:, 3] + 1] = table[:, 2]
+
+    units = table[rows]
+    ys = units[:, 4, None] + 1 + DIRECTION_DY
+    xs = units[:, 3, None] + 1 + DIRECTION_DX
+    neighbour_type = cell_type[ys, xs]
+    neighbour_owner = owner[ys, xs]
+    vacant = ~walls[ys, xs] & (neighbour_type == 0)
+    unit_type = units[:, 1]
+    player_id = units[:, 2, None]
+    carrying = units[:, 6, None] > 0
+    mobile = TYPE_IS_MOBILE[unit_type][:, None]
+    worker = TYPE_IS_WORKER[unit_type][:, None]
+    produces = TYPE_PRODUCES[unit_type]
+    can_produce = ((produces > 0) & (utt[produces, STAT_COST] <= minerals))[:, None]
+
+    mask = np.zeros((len(units), len(ActionEncodings)), dtype=bool)
+    mask[:, 0] = True
+    mask[:, 1:5] = mobile & vacant
+    mask[:, 5:9] = mobile & (neighbour_owner == 1 - player_id)
+    mask[:, 9:13] = worker & ~carrying & (neighbour_type == RESOURCE_CODE)
+    mask[:, 13:17] = worker & carrying & (neighbour_type == BASE_CODE) & (neighbour_owner == player_id)
+    mask[:, 17:21] = can_produce & vacant
+    return mask
+
+
+def _neighbours(grid: np.ndarray, fill) -> np.ndarray:
+    """Stack the UP, RIGHT, DOWN & LEFT neighbour of every cell, using `fill` beyond the map edge.
+
+    :param grid: A 2D array of shape (map_height, map_width).
+    :param fill: The value of cells outside the map.
+    :return: An array of shape (map_height, map_width, 4).
+    """
+    padded = np.full((grid.shape[0] + 2, grid.shape[1] + 2), fill, dtype=grid.dtype)
+    padded[1:-1, 1:-1] = grid
+    return np.stack([padded[:-2, 1:-1], padded[1:-1, 2:], padded[2:, 1:-1], padded[1:-1, :-2]], axis=-1)
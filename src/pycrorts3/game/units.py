@@ -1,5 +1,7 @@
 from enum import Enum
 
+import numpy as np
+
 from .position import Position
 
 
@@ -60,12 +62,6 @@ class Unit:
     def y(self) -> int:
         return self.position.y if self.position else None
 
-    def deal_damage(self, deterministic=True) -> int:
-        if deterministic:
-            return self.max_damage
-        else:
-            return self.max_damage  # todo
-
     def is_dead(self) -> bool:
         return self.hitpoints <= 0
 
@@ -187,22 +183,6 @@ class BarracksBuilding(Unit):
     sight_radius = 3
 
 
-unit_type_table = {
-    'original': {
-        'base': {
-            'produce_time': 250,
-        },
-        'barracks': {
-
-        },
-    },
-    'fine-tuned': {
-        'produce_time': 250,
-    },
-    'non-deterministic': {},
-    'single-move': {},
-}
-
 unit_produces = {
     WorkerUnit: [BarracksBuilding, BaseBuilding],
     BaseBuilding: [WorkerUnit],
@@ -223,3 +203,72 @@ unit_classes = {
 UnitEncoding = Enum('UnitEncoding',
                     # ['Resource', 'BaseBuilding', 'BarracksBuilding', 'WorkerUnit', 'LightUnit', 'HeavyUnit', 'RangedUnit'], start=2)
                     ['BaseBuilding', 'BarracksBuilding', 'WorkerUnit', 'LightUnit', 'HeavyUnit', 'RangedUnit'], start=3)
+
+# unit type codes, matching the values written into `State.unit_map`
+RESOURCE_CODE = 2
+NUM_TYPE_CODES = 3 + len(UnitEncoding)
+BASE_CODE = UnitEncoding['BaseBuilding'].value
+
+
+def unit_type_code(unit_cls) -> int:
+    """Get the integer code of a unit class, as used in `State.unit_map`."""
+    return RESOURCE_CODE if unit_cls is Resource else UnitEncoding[unit_cls.__name__].value
+
+
+unit_code_classes = {unit_type_code(unit_cls): unit_cls for unit_cls in unit_classes.values()}
+unit_class_codes = {unit_cls: code for code, unit_cls in unit_code_classes.items()}
+
+# unit type tables (UTTs): the stats of each unit type, as microRTS's `UnitTypeTable` versions
+# each variant overrides the stats of the unit classes, by microRTS unit type name
+STATS = ['cost', 'hitpoints', 'min_damage', 'max_damage', 'attack_range', 'produce_time', 'move_time', 'attack_time',
+         'harvest_time', 'return_time', 'sight_radius']
+STAT_COST, STAT_HITPOINTS, STAT_MIN_DAMAGE, STAT_MAX_DAMAGE, STAT_ATTACK_RANGE, STAT_PRODUCE_TIME, STAT_MOVE_TIME, \
+    STAT_ATTACK_TIME, STAT_HARVEST_TIME, STAT_RETURN_TIME, STAT_SIGHT_RADIUS = range(len(STATS))
+unit_type_table = {
+    'original': {
+        'Base': {'produce_time': 250},
+        'Heavy': {'cost': 2, 'hitpoints': 4, 'move_time': 12},
+    },
+    'fine-tuned': {},
+    'non-deterministic': {
+        'Worker': {'min_damage': 0, 'max_damage': 2},
+        'Light': {'min_damage': 1, 'max_damage': 3},
+        'Heavy': {'min_damage': 0, 'max_damage': 6},
+        'Ranged': {'min_damage': 1, 'max_damage': 2},
+    },
+    'single-move': {name: {'move_time': 1} for name in ['Worker', 'Light', 'Heavy', 'Ranged']},  # a cell per tick
+}
+UTT_VERSIONS = {1: 'original', 2: 'fine-tuned', 3: 'non-deterministic', 4: 'single-move'}  # `utt_version` config
+UTT_VERSION = 2
+_compiled_tables = {}
+
+
+def compile_unit_type_table(utt_version=UTT_VERSION) -> np.ndarray:
+    """Get the stats of a UTT variant as an array, compiled once per process & shared by every game using it.
+
+    :param utt_version: A key of `UTT_VERSIONS`, or a variant name of `unit_type_table`.
+    :return: A read-only int32 array of shape (NUM_TYPE_CODES, len(STATS)), indexed by unit type code & `STAT_*`,
+      with rows of 0s for codes that aren't unit types.
+    """
+    name = UTT_VERSIONS.get(utt_version, utt_version)
+    table = _compiled_tables.get(name)
+    if table is None:
+        assert name in unit_type_table, f'Unknown UTT version: {utt_version}'
+        table = np.zeros((NUM_TYPE_CODES, len(STATS)), dtype=np.int32)
+        for unit_name, unit_cls in unit_classes.items():
+            stats = dict({stat: getattr(unit_cls, stat) for stat in STATS}, **unit_type_table[name].get(unit_name, {}))
+            table[unit_type_code(unit_cls)] = [stats[stat] for stat in STATS]
+        table.flags.writeable = False
+        _compiled_tables[name] = table
+    return table
+
+
+# the properties of each unit type that no UTT changes, by unit type code
+TYPE_PRODUCES = np.zeros(NUM_TYPE_CODES, dtype=np.int32)  # the type each unit produces (first listed), else 0
+for _producer, _produces in unit_produces.items():
+    TYPE_PRODUCES[unit_type_code(_producer)] = unit_type_code(_produces[0])
+TYPE_IS_MOBILE = np.zeros(NUM_TYPE_CODES, dtype=bool)  # can move & attack
+for _unit_cls in unit_classes.values():
+    TYPE_IS_MOBILE[unit_type_code(_unit_cls)] = _unit_cls not in (Resource, BaseBuilding, BarracksBuilding)
+TYPE_IS_WORKER = np.zeros(NUM_TYPE_CODES, dtype=bool)
+TYPE_IS_WORKER[unit_type_code(WorkerUnit)] = True
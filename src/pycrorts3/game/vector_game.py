@@ -0,0 +1,437 @@
+from typing import Optional
+
+import numpy as np
+
+from .actions import ActionEncodings, ActionTypes
+from .game import MAP_FILENAME, SEED, TIE_BREAKING, Game, max_steps_per_game, spawn_seeds
+from .state import DIRECTION_DX, DIRECTION_DY, HARVEST_AMOUNT, State
+from .units import UnitEncoding, RESOURCE_CODE, BASE_CODE, TYPE_PRODUCES, TYPE_IS_MOBILE, TYPE_IS_WORKER, UTT_VERSION, \
+    STAT_COST, STAT_HITPOINTS, STAT_MIN_DAMAGE, STAT_MAX_DAMAGE, STAT_MOVE_TIME, STAT_ATTACK_TIME, STAT_HARVEST_TIME, \
+    STAT_RETURN_TIME, STAT_PRODUCE_TIME, unit_type_code
+
+# action encodings decompose into an action type and a direction: UP, RIGHT, DOWN, LEFT
+ACTION_TYPE_OF = np.array([0] + [1 + (a - 1) // 4 for a in range(1, len(ActionEncodings))], dtype=np.int8)
+ACTION_DIRECTION_OF = np.array([0] + [(a - 1) % 4 for a in range(1, len(ActionEncodings))], dtype=np.int32)
+
+NOOP = ActionTypes.NoopAction.value
+MOVE = ActionTypes.MoveAction.value
+ATTACK = ActionTypes.AttackAction.value
+HARVEST = ActionTypes.HarvestAction.value
+RETURN = ActionTypes.ReturnAction.value
+PRODUCE = ActionTypes.ProduceAction.value
+
+
+class VectorGame:
+    """K games on the same map simulated together over stacked NumPy arrays.
+
+    Boards are `[K, H, W]` arrays and units live in fixed-capacity `[K, U]` tables, where a unit's slot is its
+      position in `Game.units` (i.e. creation order).
+    Each unit has at most one pending action, so pending actions are stored alongside the unit table.
+    Actions are executed in the same order as `Game.update`, i.e. actions completing on the same tick execute
+      most-recently-queued first.
+    That order is inherently sequential within a game, so `update()` walks it rank by rank, executing the r-th
+      completing action of every game at once.
+    Each game has its own random number generator, seeded with `spawn_seeds(seed, num_games)`, so random damage is
+      drawn exactly as by a `Game` with the same seed, however games are batched. Only 'fixed' tie breaking is
+      supported.
+    """
+
+    def __init__(self, num_games: int, env_config=None, max_units: Optional[int] = None) -> None:
+        super().__init__()
+        self.env_config = dict({
+            'map_filename': MAP_FILENAME,
+            'utt_version': UTT_VERSION,
+            'seed': SEED,
+            'tie_breaking': TIE_BREAKING,
+        }, **env_config or {})
+        assert self.env_config['tie_breaking'] == 'fixed', 'VectorGame only supports fixed tie breaking'
+        state = State(self.env_config['map_filename'], self.env_config['utt_version'])
+        self.utt = state.utt  # unit stats, by type code & `STAT_*`
+        self.random_damage = bool((self.utt[:, STAT_MIN_DAMAGE] < self.utt[:, STAT_MAX_DAMAGE]).any())
+        self.num_games = int(num_games)
+        self.rngs = [np.random.default_rng(seed) for seed in spawn_seeds(self.env_config['seed'], self.num_games)]
+        self.height = state.height
+        self.width = state.width
+        self.max_units = int(max_units or self._max_units(state))
+        max_dim = max(self.height, self.width)
+        self.env_config.setdefault('max_steps_per_game', max_steps_per_game(max_dim))
+        self.terrain = state.terrain.copy()
+
+        K, U, H, W = self.num_games, self.max_units, self.height, self.width
+        initial_units = list(state.units.values())
+        assert len(initial_units) <= U, 'max_units is smaller than the number of units on the map'
+
+        # board
+        self.unit_map = np.zeros((K, H, W), dtype=np.uint8)  # unit type code per cell, as `State.unit_map`
+        self.slot_map = np.zeros((K, H, W), dtype=np.int32)  # unit slot + 1 per cell, 0 if vacant
+        self.reserved = np.zeros((K, H, W), dtype=np.int32)  # number of pending actions targeting each cell
+
+        # units
+        self.unit_id = np.full((K, U), -1, dtype=np.int32)
+        self.unit_type = np.zeros((K, U), dtype=np.uint8)
+        self.player_id = np.full((K, U), -1, dtype=np.int8)
+        self.x = np.full((K, U), -1, dtype=np.int32)  # -1 once removed from the board
+        self.y = np.full((K, U), -1, dtype=np.int32)
+        self.hitpoints = np.zeros((K, U), dtype=np.int32)
+        self.resources = np.zeros((K, U), dtype=np.int32)
+
+        # pending actions, one per unit
+        self.action_type = np.full((K, U), -1, dtype=np.int8)  # `ActionTypes` value, -1 if no pending action
+        self.action_x = np.zeros((K, U), dtype=np.int32)
+        self.action_y = np.zeros((K, U), dtype=np.int32)
+        self.action_end = np.zeros((K, U), dtype=np.int32)
+        self.action_seq = np.zeros((K, U), dtype=np.int64)  # order the action was queued in
+        self.action_produce = np.zeros((K, U), dtype=np.uint8)
+
+        # per game
+        self.minerals = np.zeros((K, 2), dtype=np.int32)
+        self.num_units = np.zeros(K, dtype=np.int32)
+        self.next_unit_id = np.zeros(K, dtype=np.int32)
+        self.next_seq = np.zeros(K, dtype=np.int64)
+        self.time = np.zeros(K, dtype=np.int32)
+        self.is_game_over = np.zeros(K, dtype=bool)
+        self.winner = np.full(K, -1, dtype=np.int8)
+
+        for slot, unit in enumerate(initial_units):
+            code = unit_type_code(unit.__class__)
+            self.unit_id[:, slot] = unit.id
+            self.unit_type[:, slot] = code
+            self.player_id[:, slot] = unit.player_id
+            self.x[:, slot] = unit.x
+            self.y[:, slot] = unit.y
+            self.hitpoints[:, slot] = unit.hitpoints
+            self.resources[:, slot] = unit.resources
+            self.unit_map[:, unit.y, unit.x] = code
+            self.slot_map[:, unit.y, unit.x] = slot + 1
+        for player in state.players:
+            self.minerals[:, player.id] = player.minerals
+        self.num_units[:] = len(initial_units)
+        self.next_unit_id[:] = max(unit.id for unit in initial_units) + 1
+
+        self._array_names = [name for name, value in vars(self).items()
+                             if isinstance(value, np.ndarray) and name != 'terrain']
+        self.initial_values = {name: getattr(self, name)[0].copy() for name in self._array_names}
+
+    def _max_units(self, state: State) -> int:
+        """The most units a game on the map can ever have, as slots aren't reused: those on the map & as many as all
+          the map's minerals can pay for at the cost of the cheapest unit."""
+        costs = self.utt[np.unique(TYPE_PRODUCES[TYPE_PRODUCES > 0]), STAT_COST]
+        if not len(costs) or costs.min() <= 0:
+            return 4 * self.height * self.width
+        minerals = sum(player.minerals for player in state.players) + \
+            sum(unit.resources for unit in state.units.values())
+        return len(state.units) + int(minerals // costs.min())
+
+    def reset(self, games=None) -> None:
+        """Reset some or all of the games.
+
+        :param games: An index or boolean mask of the games to reset, or None to reset all of them.
+        """
+        games = slice(None) if games is None else games
+        for name in self._array_names:
+            getattr(self, name)[games] = self.initial_values[name]
+
+    @property
+    def max_steps_per_game(self) -> int:
+        return self.env_config['max_steps_per_game']
+
+    def alive(self) -> np.ndarray:
+        """Units that are on the board, shape `[K, U]`."""
+        return self.x >= 0
+
+    def can_make_action(self) -> np.ndarray:
+        """Units that are alive, not minerals, have no action in progress & whose game is running, shape `[K, U]`."""
+        return (self.x >= 0) & (self.player_id >= 0) & (self.action_type < 0) & ~self.is_game_over[:, None]
+
+    def _targets(self, k: np.ndarray, u: np.ndarray):
+        """Look up the 4 cells adjacent to some units.
+
+        :param k: The game of each unit.
+        :param u: The slot of each unit.
+        :return: Target x & y, whether each target is in bounds, the unit type code, the slot and the player ID at each
+          target, and whether each target is vacant. Each has shape `[N, 4]`.
+        """
+        x, y = self.x[k, u][:, None], self.y[k, u][:, None]
+        tx, ty = x + DIRECTION_DX, y + DIRECTION_DY
+        in_bounds = (x >= 0) & (tx >= 0) & (tx < self.width) & (ty >= 0) & (ty < self.height)
+        cx, cy = np.where(in_bounds, tx, 0), np.where(in_bounds, ty, 0)
+        kk = k[:, None]
+        cell_type = np.where(in_bounds, self.unit_map[kk, cy, cx], 0)
+        cell_slot = np.where(in_bounds, self.slot_map[kk, cy, cx], 0) - 1
+        cell_player = np.where(cell_slot >= 0, self.player_id[kk, np.maximum(cell_slot, 0)], -1)
+        vacant = in_bounds & (self.terrain[cy, cx] == 0) & (cell_type == 0)
+        return tx, ty, in_bounds, cell_type, cell_slot, cell_player, vacant
+
+    def _state_action_mask(self, k: np.ndarray, u: np.ndarray, targets) -> np.ndarray:
+        """Legality of every action for some units against the board only, as `State.get_action_mask`.
+
+        :param k: The game of each unit.
+        :param u: The slot of each unit.
+        :param targets: The units' `_targets()`.
+        :return: A boolean array of shape `[N, len(ActionEncodings)]`.
+        """
+        _, _, _, cell_type, cell_slot, cell_player, vacant = targets
+        unit_type = self.unit_type[k, u][:, None]
+        player = self.player_id[k, u][:, None]
+        carrying = self.resources[k, u][:, None] > 0
+        mobile = TYPE_IS_MOBILE[unit_type]
+        worker = TYPE_IS_WORKER[unit_type]
+        produces = TYPE_PRODUCES[unit_type]
+        minerals = self.minerals[k, np.maximum(player[:, 0], 0)][:, None]
+
+        mask = np.zeros((len(k), len(ActionEncodings)), dtype=bool)
+        mask[:, 0] = True
+        mask[:, 1:5] = mobile & vacant
+        mask[:, 5:9] = mobile & (cell_slot >= 0) & (cell_player == 1 - player)
+        mask[:, 9:13] = worker & ~carrying & (cell_type == RESOURCE_CODE)
+        mask[:, 13:17] = worker & carrying & (cell_type == BASE_CODE) & (cell_player == player)
+        mask[:, 17:21] = (produces > 0) & (self.utt[produces, STAT_COST] <= minerals) & vacant
+        return mask
+
+    def get_action_masks(self) -> np.ndarray:
+        """Get the legal actions of every unit in every game, as `Game.get_action_mask`.
+
+        Only the units that can make an action are computed, the rest are all 0.
+
+        :return: A uint8 array of shape `[K, U, len(ActionEncodings)]` where 1 is a legal action, else 0.
+        """
+        k, u = np.nonzero(self.can_make_action())
+        targets = self._targets(k, u)
+        tx, ty, in_bounds = targets[:3]
+        mask = self._state_action_mask(k, u, targets)
+        cx, cy = np.where(in_bounds, tx, 0), np.where(in_bounds, ty, 0)
+        reserved = np.where(in_bounds, self.reserved[k[:, None], cy, cx], 0)
+        mask[:, 1:5] &= reserved == 0
+        masks = np.zeros((self.num_games, self.max_units, len(ActionEncodings)), dtype=np.uint8)
+        masks[k, u] = mask
+        return masks
+
+    def _durations(self, unit_type: np.ndarray, action_codes: np.ndarray) -> np.ndarray:
+        """Get the duration of each action, as computed by the env when building `Action` objects."""
+        action_types = ACTION_TYPE_OF[action_codes]
+        durations = np.select(
+            [action_types == MOVE, action_types == ATTACK, action_types == HARVEST, action_types == RETURN,
+             action_types == PRODUCE],
+            [self.utt[unit_type, STAT_MOVE_TIME], self.utt[unit_type, STAT_ATTACK_TIME],
+             self.utt[unit_type, STAT_HARVEST_TIME], self.utt[unit_type, STAT_RETURN_TIME],
+             self.utt[TYPE_PRODUCES[unit_type], STAT_PRODUCE_TIME]],
+            default=1)
+        return np.maximum(durations, 1)
+
+    def step(self, action_codes: np.ndarray) -> None:
+        """Validate & queue one action per unit for every game, as `Game.step` called in unit order.
+
+        Invalid actions are replaced with NOOP actions of the same duration.
+        Moves are also invalid if another pending action targets the destination, or an earlier unit this step
+          targets it with a valid move or produce action.
+        Units that can't make an action are ignored. Only the units that act are validated.
+
+        :param action_codes: An `ActionEncodings` value per unit of shape `[K, U]`, or -1 for no action.
+        """
+        action_codes = np.asarray(action_codes)
+        k, u = np.nonzero(self.can_make_action() & (action_codes >= 0))  # in game, then unit order
+        codes = action_codes[k, u]
+        action_types = ACTION_TYPE_OF[codes]
+        direction = ACTION_DIRECTION_OF[codes]
+        targets = self._targets(k, u)
+        rows = np.arange(len(k))
+        legal = self._state_action_mask(k, u, targets)[rows, codes]
+        tx, ty = targets[0][rows, direction], targets[1][rows, direction]
+
+        # moves conflict with earlier moves or produces to the same cell this step, in unit order
+        cell = (k * self.height + ty) * self.width + tx
+        candidates = np.flatnonzero(legal & ((action_types == MOVE) | (action_types == PRODUCE)))
+        _, first = np.unique(cell[candidates], return_index=True)
+        is_first = np.zeros(len(k), dtype=bool)
+        is_first[candidates[first]] = True
+        is_move = action_types == MOVE
+        moves = np.flatnonzero(legal & is_move)
+        legal[moves] = is_first[moves] & (self.reserved[k[moves], ty[moves], tx[moves]] == 0)
+
+        # duplicate move destinations are all replaced, copying `Game.update`
+        moves = np.flatnonzero(legal & is_move)
+        _, inverse, counts = np.unique(cell[moves], return_inverse=True, return_counts=True)
+        legal[moves[counts[inverse] > 1]] = False
+
+        # queue
+        unit_type = self.unit_type[k, u]
+        durations = self._durations(unit_type, codes)
+        action_types = np.where(legal, action_types, NOOP)
+        stays = action_types == NOOP
+        self.action_type[k, u] = action_types
+        self.action_x[k, u] = np.where(stays, self.x[k, u], tx)
+        self.action_y[k, u] = np.where(stays, self.y[k, u], ty)
+        self.action_end[k, u] = np.where(codes == 0, self.time[k], self.time[k] + durations - 1)
+        counts = np.bincount(k, minlength=self.num_games)
+        self.action_seq[k, u] = self.next_seq[k] + rows - (np.cumsum(counts) - counts)[k]
+        self.action_produce[k, u] = TYPE_PRODUCES[unit_type]
+        self.next_seq += counts
+        np.add.at(self.reserved, (k[~stays], ty[~stays], tx[~stays]), 1)
+
+    def update(self) -> None:
+        """Complete the current time-step of every running game, as `Game.update`."""
+        due = (self.action_type >= 0) & (self.action_end == self.time[:, None]) & ~self.is_game_over[:, None]
+        due_k, due_u = np.nonzero(due)
+        order = np.lexsort((-self.action_seq[due_k, due_u], due_k))  # per game, most recently queued first
+        due_k, due_u = due_k[order], due_u[order]
+        counts = np.bincount(due_k, minlength=self.num_games)
+        rank = np.arange(len(due_k)) - (np.cumsum(counts) - counts)[due_k]
+        damages = self._draw_damages(due_k, due_u)
+
+        for r in range(int(rank.max()) + 1 if len(rank) else 0):
+            k, u, damage = due_k[rank == r], due_u[rank == r], damages[rank == r]
+            still_pending = (self.action_type[k, u] >= 0) & ~self.is_game_over[k]  # i.e. not killed or game over
+            k, u, damage = k[still_pending], u[still_pending], damage[still_pending]
+            action_types = self.action_type[k, u]
+            tx, ty = self.action_x[k, u], self.action_y[k, u]
+            self._release(k, u)
+
+            is_move = action_types == MOVE
+            self._execute_moves(k[is_move], u[is_move], tx[is_move], ty[is_move])
+            is_attack = action_types == ATTACK
+            self._execute_attacks(k[is_attack], u[is_attack], tx[is_attack], ty[is_attack], damage[is_attack])
+            is_harvest = action_types == HARVEST
+            self._execute_harvests(k[is_harvest], u[is_harvest], tx[is_harvest], ty[is_harvest])
+            is_return = action_types == RETURN
+            self._execute_returns(k[is_return], u[is_return], tx[is_return], ty[is_return])
+            is_produce = action_types == PRODUCE
+            self._execute_produces(k[is_produce], u[is_produce], tx[is_produce], ty[is_produce])
+
+        running = ~self.is_game_over
+        self.time[running] += 1
+        self.is_game_over |= running & (self.time >= self.max_steps_per_game)
+
+    def _draw_damages(self, due_k: np.ndarray, due_u: np.ndarray) -> np.ndarray:
+        """The damage of each due action, drawn per game in one batch in order of execution, as `Game.update`."""
+        damages = self.utt[self.unit_type[due_k, due_u], STAT_MAX_DAMAGE]
+        if not self.random_damage:
+            return damages
+        is_attack = self.action_type[due_k, due_u] == ATTACK
+        for k in np.unique(due_k[is_attack]):
+            rows = np.flatnonzero(is_attack & (due_k == k))
+            stats = self.utt[self.unit_type[k, due_u[rows]]]
+            damages[rows] = self.rngs[k].integers(stats[:, STAT_MIN_DAMAGE], stats[:, STAT_MAX_DAMAGE] + 1)
+        return damages
+
+    def _release(self, k: np.ndarray, u: np.ndarray) -> None:
+        """Clear pending actions & the cells they reserve."""
+        reserving = self.action_type[k, u] != NOOP
+        np.subtract.at(self.reserved, (k[reserving], self.action_y[k, u][reserving], self.action_x[k, u][reserving]), 1)
+        self.action_type[k, u] = -1
+
+    def _remove(self, k: np.ndarray, u: np.ndarray) -> None:
+        self.unit_map[k, self.y[k, u], self.x[k, u]] = 0
+        self.slot_map[k, self.y[k, u], self.x[k, u]] = 0
+        self.x[k, u] = -1
+        self.y[k, u] = -1
+
+    def _execute_moves(self, k, u, tx, ty) -> None:
+        vacant = (self.terrain[ty, tx] == 0) & (self.unit_map[k, ty, tx] == 0)  # `Game` asserts this
+        k, u, tx, ty = k[vacant], u[vacant], tx[vacant], ty[vacant]
+        self.unit_map[k, ty, tx] = self.unit_map[k, self.y[k, u], self.x[k, u]]
+        self.slot_map[k, ty, tx] = u + 1
+        self.unit_map[k, self.y[k, u], self.x[k, u]] = 0
+        self.slot_map[k, self.y[k, u], self.x[k, u]] = 0
+        self.x[k, u] = tx
+        self.y[k, u] = ty
+
+    def _execute_attacks(self, k, u, tx, ty, damage) -> None:
+        target = self.slot_map[k, ty, tx] - 1
+        hit = (target >= 0)
+        hit[hit] = self.unit_type[k[hit], target[hit]] != RESOURCE_CODE
+        k, target = k[hit], target[hit]
+        self.hitpoints[k, target] -= damage[hit]
+        killed = self.hitpoints[k, target] <= 0
+        k, target = k[killed], target[killed]
+        if not len(k):
+            return
+        # copy microRTS logic, if two units attack simultaneously, the first unit kills the 2nd before 2nd strikes
+        pending = self.action_type[k, target] >= 0
+        self._release(k[pending], target[pending])
+        self._remove(k, target)
+        dead_player = self.player_id[k, target]
+        num_units = ((self.player_id[k] == dead_player[:, None]) & (self.x[k] >= 0)).sum(axis=1)
+        lost = num_units == 0
+        self.is_game_over[k[lost]] = True
+        self.winner[k[lost]] = 1 - dead_player[lost]
+
+    def _execute_harvests(self, k, u, tx, ty) -> None:
+        target = self.slot_map[k, ty, tx] - 1
+        hit = target >= 0
+        hit[hit] = self.unit_type[k[hit], target[hit]] == RESOURCE_CODE
+        k, u, target = k[hit], u[hit], target[hit]
+        amount = np.minimum(HARVEST_AMOUNT, self.resources[k, target])
+        self.resources[k, u] += amount
+        self.resources[k, target] -= amount
+        mined_out = self.resources[k, target] == 0
+        self._remove(k[mined_out], target[mined_out])
+
+    def _execute_returns(self, k, u, tx, ty) -> None:
+        target = self.slot_map[k, ty, tx] - 1
+        hit = target >= 0
+        hit[hit] = (self.unit_type[k[hit], target[hit]] == BASE_CODE) \
+            & (self.player_id[k[hit], target[hit]] == self.player_id[k[hit], u[hit]])
+        k, u = k[hit], u[hit]
+        np.add.at(self.minerals, (k, self.player_id[k, u]), self.resources[k, u])
+        self.resources[k, u] = 0
+
+    def _execute_produces(self, k, u, tx, ty) -> None:
+        produce_type = self.action_produce[k, u]
+        player = self.player_id[k, u]
+        ok = (self.terrain[ty, tx] == 0) & (self.unit_map[k, ty, tx] == 0) \
+            & (self.minerals[k, player] >= self.utt[produce_type, STAT_COST])
+        k, tx, ty, produce_type, player = k[ok], tx[ok], ty[ok], produce_type[ok], player[ok]
+        if np.any(self.num_units[k] >= self.max_units):
+            raise RuntimeError('Unit table is full, increase max_units')
+        slot = self.num_units[k]
+        self.minerals[k, player] -= self.utt[produce_type, STAT_COST]
+        self.unit_id[k, slot] = self.next_unit_id[k]
+        self.unit_type[k, slot] = produce_type
+        self.player_id[k, slot] = player
+        self.x[k, slot] = tx
+        self.y[k, slot] = ty
+        self.hitpoints[k, slot] = self.utt[produce_type, STAT_HITPOINTS]
+        self.resources[k, slot] = 0
+        self.unit_map[k, ty, tx] = produce_type
+        self.slot_map[k, ty, tx] = slot + 1
+        self.num_units[k] += 1
+        self.next_unit_id[k] += 1
+
+    def to_array_global(self) -> np.ndarray:
+        """Export the board of every game, as `State.to_array_global`.
+
+        :return: A numpy array of shape `[K, H, W]`.
+        """
+        k = np.arange(self.num_games)[:, None, None]
+        owner = np.where(self.slot_map > 0, self.player_id[k, np.maximum(self.slot_map - 1, 0)], -1)
+        return self.terrain + self.unit_map + len(UnitEncoding) * (owner == 1).astype(np.uint8)
+
+    def diff_against_game(self, k: int, game: Game) -> Optional[str]:
+        """Compare one of the games against a reference `Game`.
+
+        :param k: The index of the game to compare.
+        :param game: The reference game.
+        :return: A description of the first difference found, or None if they match.
+        """
+        if self.time[k] != game.time or self.is_game_over[k] != game.is_game_over:
+            return f'time/game over: {self.time[k]}/{self.is_game_over[k]} != {game.time}/{game.is_game_over}'
+        if self.winner[k] != (-1 if game.winner is None else game.winner):
+            return f'winner: {self.winner[k]} != {game.winner}'
+        for player in game.players:
+            if self.minerals[k, player.id] != player.minerals:
+                return f'player {player.id} minerals: {self.minerals[k, player.id]} != {player.minerals}'
+        if self.num_units[k] != len(game.units):
+            return f'number of units: {self.num_units[k]} != {len(game.units)}'
+        for slot, unit in enumerate(game.units.values()):
+            expected = (unit.id, unit_type_code(unit.__class__), unit.player_id,
+                        -1 if unit.position is None else unit.x, -1 if unit.position is None else unit.y,
+                        unit.hitpoints if unit.position is not None else self.hitpoints[k, slot], unit.resources,
+                        unit.has_pending_action and unit.position is not None and not game.is_game_over)
+            actual = (self.unit_id[k, slot], self.unit_type[k, slot], self.player_id[k, slot], self.x[k, slot],
+                      self.y[k, slot], self.hitpoints[k, slot], self.resources[k, slot],
+                      self.action_type[k, slot] >= 0 and self.x[k, slot] >= 0 and not self.is_game_over[k])
+            if tuple(int(v) for v in actual) != tuple(int(v) for v in expected):
+                return f'unit {unit.id}: {actual} != {expected}'
+        if not np.array_equal(self.to_array_global()[k], game.state.to_array_global()):
+            return 'board'
+        return None
@@ -0,0 +1,85 @@
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Any, Hashable, Optional
+
+MASK_64 = (1 << 64) - 1
+SEED = 0x9E3779B97F4A7C15
+
+# the kind of state component a key represents
+UNIT = 1
+HITPOINTS = 2
+RESOURCES = 3
+MINERALS = 4
+ACTION = 5
+
+
+def _splitmix64(x: int) -> int:
+    x = (x + 0x9E3779B97F4A7C15) & MASK_64
+    x = ((x ^ (x >> 30)) * 0xBF58476D1CE4E5B9) & MASK_64
+    x = ((x ^ (x >> 27)) * 0x94D049BB133111EB) & MASK_64
+    return x ^ (x >> 31)
+
+
+@lru_cache(maxsize=1 << 16)
+def zobrist_key(*values: int) -> int:
+    """Get the 64-bit Zobrist key of a state component.
+
+    Rather than drawing keys from a table, keys are derived by hashing the component's values, so there is no limit on
+      unit IDs, map size or time, and keys are identical across processes.
+
+    :param values: The kind of component, e.g. `UNIT`, followed by its values.
+    :return: An unsigned 64-bit key.
+    """
+    h = SEED
+    for value in values:
+        h = _splitmix64(h ^ (value & MASK_64))
+    return h
+
+
+class TranspositionTable:
+    """A bounded map from state hashes to search results, evicting the least recently used entry when full."""
+
+    def __init__(self, max_size: int = 1 << 20) -> None:
+        super().__init__()
+        self.max_size = int(max_size)
+        self.entries: OrderedDict = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Optional[Any]:
+        """Look up an entry, marking it as recently used.
+
+        :param key: The state hash, e.g. `Game.hash`.
+        :param default: The value to return if the state isn't in the table.
+        :return: The stored value, else `default`.
+        """
+        try:
+            value = self.entries[key]
+        except KeyError:
+            self.misses += 1
+            return default
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def put(self, key: Hashable, value: Any) -> None:
+        """Store an entry, evicting the least recently used entry if the table is full.
+
+        :param key: The state hash, e.g. `Game.hash`.
+        :param value: The value to store.
+        """
+        self.entries[key] = value
+        self.entries.move_to_end(key)
+        if len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+
+    def clear(self) -> None:
+        self.entries.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self.entries
+
+    def __len__(self) -> int:
+        return len(self.entries)
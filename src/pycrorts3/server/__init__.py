@@ -0,0 +1,4 @@
+from .benchmark import benchmark
+from .client import GameClient
+from .protocol import Ops, ACTION_DTYPE, MASK_DTYPE, STATUS_DTYPE, UNIT_DTYPE
+from .server import GameServer, run_server
@@ -0,0 +1,86 @@
+from multiprocessing import Process
+import os
+import tempfile
+import time
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from ..game import Game
+from ..game.units import Resource
+from .client import GameClient
+from .server import Address, run_server
+
+MAP_FILENAME = '16x16_melee_mixed8'
+NUM_GAMES = 64
+NUM_TICKS = 200
+
+
+def benchmark(map_filename: str = MAP_FILENAME, num_games: int = NUM_GAMES, num_ticks: int = NUM_TICKS,
+              address: Optional[Address] = None, seed: int = 0) -> Dict[str, float]:
+    """Compare the throughput of stepping games in process with stepping them through a `GameServer`.
+
+    Every tick, each game's units that can act make a random legal action & the games' unit tables are read, in
+      process through `Game`, & through a server in another process, with all games batched into one message per
+      request, or one message per game. Games that end are reset.
+
+    :param map_filename: The map of every game.
+    :param num_games: The number of games.
+    :param num_ticks: The ticks each game runs.
+    :param address: Where the server listens, defaults to a Unix socket in a temporary directory.
+    :param seed: Of the games & the random actions.
+    :return: The game ticks per second of 'in_process', 'server_batched' & 'server_per_game'.
+    """
+    env_config = {'map_filename': map_filename, 'verbose': False, 'seed': seed}
+    results = {'in_process': _run_in_process(env_config, num_games, num_ticks, seed)}
+    with tempfile.TemporaryDirectory() as directory:
+        address = address or os.path.join(directory, 'server.sock')
+        server = Process(target=run_server, args=(num_games, address, env_config), daemon=True)
+        server.start()
+        try:
+            with GameClient(address) as client:
+                results['server_batched'] = _run_client(client, [np.arange(num_games)], num_ticks, seed)
+                results['server_per_game'] = _run_client(client, [np.array([k]) for k in range(num_games)],
+                                                         num_ticks, seed)
+        finally:
+            server.terminate()
+            server.join()
+    return {name: num_games * num_ticks / seconds for name, seconds in results.items()}
+
+
+def _random_actions(rng: np.random.Generator, masks: np.ndarray) -> np.ndarray:
+    """Pick a random legal action per row of masks."""
+    return np.where(masks, rng.random(masks.shape), -1.0).argmax(axis=1)
+
+
+def _run_in_process(env_config: dict, num_games: int, num_ticks: int, seed: int) -> float:
+    games = [Game(env_config) for _ in range(num_games)]
+    rng = np.random.default_rng(seed)
+    start = time.perf_counter()
+    for _ in range(num_ticks):
+        for game in games:
+            if game.is_game_over:
+                game.reset()
+            units = [unit for unit in game.units.values()
+                     if not isinstance(unit, Resource) and unit.position is not None and unit.can_make_action()]
+            if units:
+                actions = _random_actions(rng, np.array([game.get_action_mask(unit) for unit in units]))
+                game.step_many([unit.id for unit in units], actions)
+            game.update()
+            game.state.to_unit_table()
+    return time.perf_counter() - start
+
+
+def _run_client(client: GameClient, batches: List[np.ndarray], num_ticks: int, seed: int) -> float:
+    rng = np.random.default_rng(seed)
+    client.reset()
+    start = time.perf_counter()
+    for _ in range(num_ticks):
+        for games in batches:
+            actions = []
+            for masks in client.masks(games):
+                actions.append(np.stack([masks['unit_id'], _random_actions(rng, masks['mask'])], axis=1))
+            status = client.step(actions, games)['status']
+            if status['is_game_over'].any():
+                client.reset(status['game'][status['is_game_over'] != 0])
+    return time.perf_counter() - start
@@ -0,0 +1,131 @@
+import socket
+import time
+from typing import Dict, List, Optional, Sequence, Union
+
+import numpy as np
+
+from .protocol import Ops, LENGTH_PREFIX, MAX_MESSAGE_SIZE, INFO_DTYPE, STATUS_DTYPE, UNIT_DTYPE, MASK_DTYPE, \
+    ACTION_DTYPE, GAME_INDEX_DTYPE, encode_message, decode_header, read_tables, split_rows
+from .server import Address
+
+CONNECT_TIMEOUT = 10.0  # seconds to keep retrying to connect, e.g. while the server starts
+
+
+class GameClient:
+    """Drive the games of a `GameServer` from Python, one blocking request at a time.
+
+    Every method takes the indexes of any number of the server's games, all of them by default, & batches them into one
+      message.
+    Observations are a dict of 'status', a `STATUS_DTYPE` per game, & 'units', a `UNIT_DTYPE` table per game.
+    """
+
+    def __init__(self, address: Address, timeout: float = CONNECT_TIMEOUT) -> None:
+        """
+        :param address: The server's Unix socket path, or (host, port).
+        :param timeout: Seconds to keep retrying to connect.
+        """
+        super().__init__()
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                if isinstance(address, str):
+                    self.socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+                else:
+                    self.socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+                    self.socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+                self.socket.connect(address)
+                break
+            except (FileNotFoundError, ConnectionRefusedError):
+                self.socket.close()
+                if time.monotonic() > deadline:
+                    raise
+                time.sleep(0.05)
+
+        message = self._request(Ops.INFO, 0)
+        (info,), offset = read_tables(message, (INFO_DTYPE, 1))
+        self.num_games, self.height, self.width, self.num_players, self.num_actions = info[0].item()
+        self.terrain = np.frombuffer(message, dtype=np.uint8, count=self.height * self.width,
+                                     offset=offset).reshape(self.height, self.width)
+
+    def reset(self, games: Optional[Sequence[int]] = None) -> Dict[str, Union[np.ndarray, List[np.ndarray]]]:
+        games = self._games(games)
+        return self._read_observations(self._request(Ops.RESET, len(games), [games]), len(games))
+
+    def observe(self, games: Optional[Sequence[int]] = None) -> Dict[str, Union[np.ndarray, List[np.ndarray]]]:
+        games = self._games(games)
+        return self._read_observations(self._request(Ops.OBSERVE, len(games), [games]), len(games))
+
+    def masks(self, games: Optional[Sequence[int]] = None) -> List[np.ndarray]:
+        """Get the action mask of every unit that can act.
+
+        :return: A `MASK_DTYPE` table per game.
+        """
+        games = self._games(games)
+        message = self._request(Ops.MASK, len(games), [games])
+        (counts,), _ = read_tables(message, (GAME_INDEX_DTYPE, len(games)))
+        (_, masks), _ = read_tables(message, (GAME_INDEX_DTYPE, len(games)), (MASK_DTYPE, int(counts.sum())))
+        return split_rows(masks, counts)
+
+    def step(self, actions: Sequence[np.ndarray],
+             games: Optional[Sequence[int]] = None) -> Dict[str, Union[np.ndarray, List[np.ndarray]]]:
+        """Make actions & complete a tick of each game.
+
+        Actions of units that can't act are ignored & counted in the status' 'num_rejected'.
+
+        :param actions: Per game, an `ACTION_DTYPE` table or an array of shape (num_actions, 2) of unit ID & action.
+        :param games: The games the actions are for.
+        """
+        games = self._games(games)
+        assert len(actions) == len(games), f'Actions of {len(actions)} games for {len(games)} games'
+        tables = []
+        for game_actions in actions:
+            if np.asarray(game_actions).dtype != ACTION_DTYPE:
+                game_actions = np.asarray(game_actions).reshape(-1, 2)
+                table = np.zeros(len(game_actions), dtype=ACTION_DTYPE)
+                table['unit_id'], table['action'] = game_actions[:, 0], game_actions[:, 1]
+                game_actions = table
+            tables.append(game_actions)
+        counts = np.array([len(table) for table in tables], dtype=GAME_INDEX_DTYPE)
+        return self._read_observations(self._request(Ops.STEP, len(games), [games, counts] + tables), len(games))
+
+    def close(self) -> None:
+        self.socket.close()
+
+    def _games(self, games: Optional[Sequence[int]]) -> np.ndarray:
+        return np.arange(self.num_games, dtype=GAME_INDEX_DTYPE) if games is None else \
+            np.asarray(games, dtype=GAME_INDEX_DTYPE).reshape(-1)
+
+    def _request(self, op: Ops, num_games: int, tables: Sequence[np.ndarray] = ()) -> bytearray:
+        """Send a request & wait for its response, raising any error the server responds with."""
+        self.socket.sendall(encode_message(op, num_games, tables))
+        size, = LENGTH_PREFIX.unpack(self._receive(LENGTH_PREFIX.size))
+        assert size <= MAX_MESSAGE_SIZE, 'Response too large'
+        message = self._receive(size)
+        response_op, _ = decode_header(message)
+        if response_op == Ops.ERROR:
+            _, offset = read_tables(message)
+            raise RuntimeError(f'{op.name} failed: {message[offset:].decode("utf-8")}')
+        return message
+
+    def _receive(self, size: int) -> bytearray:
+        buffer = bytearray(size)
+        view = memoryview(buffer)
+        received = 0
+        while received < size:
+            n = self.socket.recv_into(view[received:])
+            if not n:
+                raise ConnectionError('The server closed the connection')
+            received += n
+        return buffer
+
+    @staticmethod
+    def _read_observations(message: bytes, num_games: int) -> Dict[str, Union[np.ndarray, List[np.ndarray]]]:
+        (statuses,), _ = read_tables(message, (STATUS_DTYPE, num_games))
+        (_, units), _ = read_tables(message, (STATUS_DTYPE, num_games), (UNIT_DTYPE, int(statuses['num_units'].sum())))
+        return {'status': statuses, 'units': split_rows(units, statuses['num_units'])}
+
+    def __enter__(self) -> 'GameClient':
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
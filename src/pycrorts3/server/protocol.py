@@ -0,0 +1,83 @@
+from enum import Enum
+import struct
+from typing import List, Sequence, Tuple
+
+import numpy as np
+
+from ..game.actions import ActionEncodings
+from ..game.state import ENTITY_FEATURES
+
+PROTOCOL_VERSION = 1
+MAX_MESSAGE_SIZE = 2 ** 28  # bytes, larger messages are refused rather than buffered
+LENGTH_PREFIX = struct.Struct('<I')  # every message is its size in bytes, then the message
+
+# Every request is a `MESSAGE_HEADER_DTYPE` then a body, & is answered by one response with the same layout. Integers
+# are little endian, games are referred to by their index on the server, & batched bodies are one table per field,
+# with the rows of every game in the batch concatenated in request order:
+#
+#   INFO     request: no body, num_games 0.
+#            response: an `INFO_DTYPE`, then the terrain as height * width uint8 (1 for walls), row major.
+#   RESET    request: the game indexes, int32[num_games].
+#            response: an observation of each game.
+#   OBSERVE  request & response as RESET, without changing the games.
+#   MASK     request: the game indexes, int32[num_games].
+#            response: the number of units each game has that can act, int32[num_games], then a `MASK_DTYPE` per
+#              unit.
+#   STEP     request: the game indexes, int32[num_games], the number of actions of each, int32[num_games], then an
+#              `ACTION_DTYPE` per action. Each game makes its actions, then completes one tick.
+#            response: an observation of each game.
+#   ERROR    response only: a UTF-8 message, when a request can't be served. Nothing in the request was applied.
+#
+# An observation is a `STATUS_DTYPE` per game, then a `UNIT_DTYPE` per unit on the board of each game.
+Ops = Enum('Ops', ['INFO', 'RESET', 'OBSERVE', 'MASK', 'STEP', 'ERROR'], start=1)
+MESSAGE_HEADER_DTYPE = np.dtype([('version', 'u1'), ('op', 'u1'), ('num_games', '<u4')])
+INFO_DTYPE = np.dtype([
+    ('num_games', '<u4'), ('height', '<u2'), ('width', '<u2'), ('num_players', 'u1'), ('num_actions', 'u1'),
+])
+STATUS_DTYPE = np.dtype([
+    ('game', '<i4'), ('time', '<i4'), ('is_game_over', 'u1'), ('winner', 'i1'), ('minerals_0', '<i4'),
+    ('minerals_1', '<i4'), ('reward_0', '<f4'), ('reward_1', '<f4'), ('num_rejected', '<i4'), ('num_units', '<i4'),
+])  # rewards are of the last tick, rejected counts the actions of the last step for units that couldn't act
+UNIT_DTYPE = np.dtype([('id', '<i4')] + [(feature, '<i4') for feature in ENTITY_FEATURES])
+MASK_DTYPE = np.dtype([('unit_id', '<i4'), ('mask', 'u1', (len(ActionEncodings),))])
+ACTION_DTYPE = np.dtype([('unit_id', '<i4'), ('action', 'u1')])  # action is an `ActionEncodings` value
+GAME_INDEX_DTYPE = np.dtype('<i4')
+
+
+def encode_message(op: Ops, num_games: int, tables: Sequence[np.ndarray] = (), data: bytes = b'') -> bytes:
+    """Frame a message: the length prefix, header, tables & any trailing bytes."""
+    header = np.array((PROTOCOL_VERSION, op.value, num_games), dtype=MESSAGE_HEADER_DTYPE)
+    body = b''.join([header.tobytes()] + [np.ascontiguousarray(table).tobytes() for table in tables] + [data])
+    return LENGTH_PREFIX.pack(len(body)) + body
+
+
+def decode_header(message: bytes) -> Tuple[Ops, int]:
+    """Read the header of an (unprefixed) message.
+
+    :return: The op & the number of games.
+    """
+    assert len(message) >= MESSAGE_HEADER_DTYPE.itemsize, 'Truncated message'
+    version, op, num_games = np.frombuffer(message, dtype=MESSAGE_HEADER_DTYPE, count=1)[0].item()
+    assert version == PROTOCOL_VERSION, 'Unsupported protocol version'
+    return Ops(op), num_games
+
+
+def read_tables(message: bytes, *layout: Tuple[np.dtype, int]) -> Tuple[List[np.ndarray], int]:
+    """Read consecutive tables from a message body, after the header.
+
+    :param message: The (unprefixed) message.
+    :param layout: The (dtype, number of rows) of each table.
+    :return: Read-only views of the tables & the offset of the remaining bytes.
+    """
+    offset = MESSAGE_HEADER_DTYPE.itemsize
+    tables = []
+    for dtype, count in layout:
+        assert offset + dtype.itemsize * count <= len(message), 'Truncated message'
+        tables.append(np.frombuffer(message, dtype=dtype, count=count, offset=offset))
+        offset += dtype.itemsize * count
+    return tables, offset
+
+
+def split_rows(table: np.ndarray, counts: np.ndarray) -> List[np.ndarray]:
+    """Split a concatenated table into the rows of each game."""
+    return np.split(table, np.cumsum(counts)[:-1]) if len(counts) else []
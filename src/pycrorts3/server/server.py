@@ -0,0 +1,184 @@
+import asyncio
+from typing import List, Tuple, Union
+
+import numpy as np
+
+from ..game import Game
+from ..game.actions import ActionEncodings
+from ..game.game import spawn_seeds
+from ..game.units import Resource
+from .protocol import Ops, LENGTH_PREFIX, MAX_MESSAGE_SIZE, INFO_DTYPE, STATUS_DTYPE, UNIT_DTYPE, MASK_DTYPE, \
+    ACTION_DTYPE, GAME_INDEX_DTYPE, encode_message, decode_header, read_tables, split_rows
+
+Address = Union[str, Tuple[str, int]]  # a Unix socket path, or a (host, port) to listen on over TCP
+
+
+class GameServer:
+    """Host many games for clients in other processes, e.g. bots in other languages or remote inference.
+
+    Clients connect over a Unix or TCP socket & exchange length-prefixed binary messages, see `protocol`. Every
+      request can batch any number of games, so a client driving many games pays one round trip per tick rather than
+      one per game.
+    Requests are served one at a time on the event loop, so clients may share the server, but two clients shouldn't
+      step the same game.
+    Games are seeded with `spawn_seeds()` of the config's 'seed', as `VectorGame`.
+    """
+
+    def __init__(self, num_games: int, env_config=None) -> None:
+        super().__init__()
+        env_config = dict({'verbose': False}, **env_config or {})
+        self.games = [Game(dict(env_config, seed=seed)) for seed in spawn_seeds(env_config.get('seed'), num_games)]
+        self.rewards = np.zeros((num_games, len(self.games[0].players)), dtype=np.float32)  # of the last tick
+        self.num_rejected = np.zeros(num_games, dtype=np.int32)  # actions of the last step of units that can't act
+
+    def handle(self, message: bytes) -> bytes:
+        """Serve one request.
+
+        Requests are validated in full before any game is changed, so an invalid request changes nothing.
+
+        :param message: The request, without its length prefix.
+        :return: The framed response, an `Ops.ERROR` if the request is invalid, in which case nothing was applied.
+        """
+        try:
+            op, num_games = decode_header(message)
+            if op == Ops.INFO:
+                return self._info()
+            (games,), _ = read_tables(message, (GAME_INDEX_DTYPE, num_games))
+            assert ((games >= 0) & (games < len(self.games))).all(), \
+                f'Unknown game, the server has games 0 to {len(self.games) - 1}'
+            if op == Ops.MASK:
+                return self._masks(games)
+            assert op in (Ops.RESET, Ops.OBSERVE, Ops.STEP), f'Unsupported request {op.name}'
+            steps = self._read_steps(games, message) if op == Ops.STEP else []
+        except (AssertionError, KeyError, ValueError) as e:
+            return encode_message(Ops.ERROR, 0, data=str(e).encode('utf-8'))
+
+        # errors from here on are bugs rather than invalid requests, & are raised as games may have changed
+        if op == Ops.RESET:
+            for k in games.tolist():
+                self.games[k].reset()
+                self.rewards[k] = 0.0
+                self.num_rejected[k] = 0
+        for k, (unit_ids, action_codes, num_rejected) in zip(games.tolist(), steps):
+            self._step(k, unit_ids, action_codes, num_rejected)
+        return self._observations(op, games)
+
+    async def serve(self, address: Address) -> None:
+        """Accept clients until cancelled.
+
+        :param address: A Unix socket path, or a (host, port) for TCP, e.g. ('127.0.0.1', 9000).
+        """
+        if isinstance(address, str):
+            server = await asyncio.start_unix_server(self._serve_client, path=address)
+        else:
+            server = await asyncio.start_server(self._serve_client, *address)
+        async with server:
+            await server.serve_forever()
+
+    async def _serve_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                size, = LENGTH_PREFIX.unpack(await reader.readexactly(LENGTH_PREFIX.size))
+                if size > MAX_MESSAGE_SIZE:
+                    writer.write(encode_message(Ops.ERROR, 0, data=b'Message too large'))
+                    await writer.drain()
+                    break  # the rest of the stream can't be framed
+                writer.write(self.handle(await reader.readexactly(size)))
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass  # the client disconnected
+        finally:
+            writer.close()
+
+    def _info(self) -> bytes:
+        game = self.games[0]
+        info = np.array((len(self.games), game.height(), game.width(), len(game.players), len(ActionEncodings)),
+                        dtype=INFO_DTYPE)
+        return encode_message(Ops.INFO, 0, [info, (game.state.terrain != 0).astype(np.uint8)])
+
+    def _read_steps(self, games: np.ndarray, message: bytes) -> List[Tuple[List[int], List[int], int]]:
+        """Read & validate the actions of a STEP request, without changing any game.
+
+        Actions of units that can't act, because they are minerals, dead, busy or already have an action in the request,
+          or because their game is over, are rejected rather than invalid.
+
+        :return: Per game, the IDs of the units that act, their `ActionEncodings` values & the number of actions
+          rejected.
+        """
+        assert len(np.unique(games)) == len(games), 'A game is stepped more than once'
+        (_, counts), _ = read_tables(message, (GAME_INDEX_DTYPE, len(games)), (GAME_INDEX_DTYPE, len(games)))
+        assert (counts >= 0).all(), f'Negative action count for games {games[counts < 0].tolist()}'
+        (_, _, actions), _ = read_tables(message, (GAME_INDEX_DTYPE, len(games)), (GAME_INDEX_DTYPE, len(games)),
+                                         (ACTION_DTYPE, int(counts.sum())))
+        unknown = np.unique(actions['action'][actions['action'] >= len(ActionEncodings)]).tolist()
+        assert not unknown, f'Unknown actions {unknown}, actions are 0 to {len(ActionEncodings) - 1}'
+
+        steps = []
+        for k, rows in zip(games.tolist(), split_rows(actions, counts)):
+            game = self.games[k]
+            unit_ids = rows['unit_id'].tolist()
+            unknown = [unit_id for unit_id in unit_ids if unit_id not in game.units]
+            assert not unknown, f'Unknown units {unknown} in game {k}'
+            acted = {}  # action by unit ID, in request order
+            for unit_id, action_code in zip(unit_ids, rows['action'].tolist()):
+                unit = game.units[unit_id]
+                if not (game.is_game_over or isinstance(unit, Resource) or unit.position is None or
+                        not unit.can_make_action() or unit_id in acted):
+                    acted[unit_id] = action_code
+            steps.append((list(acted), list(acted.values()), len(unit_ids) - len(acted)))
+        return steps
+
+    def _step(self, k: int, unit_ids: List[int], action_codes: List[int], num_rejected: int) -> None:
+        """Make the validated actions of a game & complete a tick, unless the game is over."""
+        game = self.games[k]
+        self.num_rejected[k] = num_rejected
+        if game.is_game_over:
+            return
+        game.step_many(unit_ids, action_codes)
+        game.update()
+        self.rewards[k] = self._rewards(game)
+
+    def _rewards(self, game: Game) -> np.ndarray:
+        """Each player's reward for the last tick, as `GridPycroRts3MultiAgentEnv`."""
+        rewards = game.get_shaped_rewards().astype(np.float32)
+        for player in game.players:
+            if not game.is_game_over:
+                rewards[player.id] += game.reward_step()
+            elif game.winner == player.id:
+                rewards[player.id] += game.reward_win()
+            elif game.winner == 1 - player.id:
+                rewards[player.id] += game.reward_lose()
+            else:
+                rewards[player.id] += game.reward_draw()
+        return rewards
+
+    def _masks(self, games: np.ndarray) -> bytes:
+        counts, masks = [], []
+        for k in games.tolist():
+            game = self.games[k]
+            units = [] if game.is_game_over else \
+                [unit for unit in game.units.values()
+                 if not isinstance(unit, Resource) and unit.position is not None and unit.can_make_action()]
+            game_masks = np.zeros(len(units), dtype=MASK_DTYPE)
+            for i, unit in enumerate(units):
+                game_masks[i] = (unit.id, game.get_action_mask(unit))
+            counts.append(len(units))
+            masks.append(game_masks)
+        return encode_message(Ops.MASK, len(games), [np.array(counts, dtype=GAME_INDEX_DTYPE)] + masks)
+
+    def _observations(self, op: Ops, games: np.ndarray) -> bytes:
+        statuses = np.zeros(len(games), dtype=STATUS_DTYPE)
+        tables: List[np.ndarray] = []
+        for i, k in enumerate(games.tolist()):
+            game = self.games[k]
+            table = game.state.to_unit_table().astype('<i4')
+            statuses[i] = (k, game.time, game.is_game_over, -1 if game.winner is None else game.winner,
+                           game.players[0].minerals, game.players[1].minerals, self.rewards[k, 0], self.rewards[k, 1],
+                           self.num_rejected[k], len(table))
+            tables.append(np.ascontiguousarray(table).view(UNIT_DTYPE).reshape(-1))
+        return encode_message(op, len(games), [statuses] + tables)
+
+
+def run_server(num_games: int, address: Address, env_config=None) -> None:
+    """Host games until interrupted, e.g. as the target of a `multiprocessing.Process`."""
+    asyncio.run(GameServer(num_games, env_config).serve(address))
@@ -0,0 +1,69 @@
+from collections import deque
+
+import numpy as np
+
+from pycrorts3.game import Game
+from pycrorts3.game.distance_fields import DistanceFields, MAX_DISTANCE, UNREACHABLE, distance_field, passable_cells, \
+    unreachable
+from pycrorts3.game.units import BASE_CODE, RESOURCE_CODE
+from test_game import play_random_tick
+
+
+def naive_distances(passable: np.ndarray, ys, xs) -> np.ndarray:
+    """Breadth first search one cell at a time, as `distance_field()`."""
+    height, width = passable.shape
+    distance = np.full(passable.shape, unreachable(passable), dtype=np.int32)
+    queue = deque()
+    for y, x in zip(ys, xs):
+        distance[y, x] = 0
+        queue.append((y, x))
+    while queue:
+        y, x = queue.popleft()
+        for ny, nx in ((y - 1, x), (y, x + 1), (y + 1, x), (y, x - 1)):
+            if 0 <= ny < height and 0 <= nx < width and passable[ny, nx] and distance[ny, nx] > distance[y, x] + 1:
+                distance[ny, nx] = distance[y, x] + 1
+                queue.append((ny, nx))
+    return distance
+
+
+def naive_plane(passable: np.ndarray, cells: np.ndarray) -> np.ndarray:
+    """A plane of `DistanceFields.planes()`."""
+    distance = naive_distances(passable, cells // passable.shape[1], cells % passable.shape[1])
+    return np.where(distance == unreachable(passable), UNREACHABLE, np.minimum(distance, MAX_DISTANCE))
+
+
+def test_distance_field_matches_naive_search():
+    rng = np.random.default_rng(0)
+    for _ in range(300):
+        height, width = rng.integers(1, 16, size=2)
+        passable = rng.random((height, width)) < rng.uniform(0.3, 1.0)
+        num_sources = rng.integers(1, 5)
+        ys, xs = rng.integers(0, height, size=num_sources), rng.integers(0, width, size=num_sources)
+        expected = naive_distances(passable, ys, xs)
+        np.testing.assert_array_equal(distance_field(passable, ys, xs), expected)
+
+        targets = rng.random((height, width)) < 0.1
+        distance = distance_field(passable, ys, xs, targets)
+        np.testing.assert_array_equal(distance[targets], expected[targets])
+
+
+def test_planes_match_full_search():
+    """Planes, updated incrementally & from an evicting cache, are those of a search from all their sources."""
+    rng = np.random.default_rng(0)
+    game = Game({'map_filename': '8x8_base_workers', 'verbose': False})
+    fields = DistanceFields(max_cached_cells=4)
+    for _ in range(200):
+        play_random_tick(game, rng)
+        if game.is_game_over:
+            break
+        state = game.state
+        passable = passable_cells(state)
+        table = state.to_unit_table()
+        types, owners, cells = table[:, 1], table[:, 2], table[:, 4] * state.width + table[:, 3]
+        for player_id in (0, 1):
+            sources = [owners == 1 - player_id, types == RESOURCE_CODE, (owners == player_id) & (types == BASE_CODE)]
+            expected = [naive_plane(passable, np.unique(cells[is_source])) for is_source in sources]
+            np.testing.assert_array_equal(fields.planes(state, player_id, game.time), expected)
+        cell = rng.integers(0, state.height * state.width)
+        np.testing.assert_array_equal(fields.cell_field(state, cell % state.width, cell // state.width),
+                                      naive_plane(passable, np.array([cell])))
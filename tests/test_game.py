@@ -0,0 +1,158 @@
+import itertools
+
+import numpy as np
+import pytest
+
+from pycrorts3.game import Game
+from pycrorts3.game.actions import ActionEncodings
+from pycrorts3.game.units import LightUnit, Resource
+
+RANDOMIZED_MAPS = ['8x8_base_workers', '8x8_melee_light4', '16x16_melee_mixed8']
+NUM_TICKS = 150  # of randomized tests
+
+
+def play_random_tick(game: Game, rng: np.random.Generator) -> None:
+    """Make a random legal action for every unit that can act, then complete the tick."""
+    units = [unit for unit in game.units.values()
+             if not isinstance(unit, Resource) and unit.position is not None and unit.can_make_action()]
+    if units:
+        masks = np.array([game.get_action_mask(unit) for unit in units])
+        game.step_many([unit.id for unit in units], np.where(masks, rng.random(masks.shape), -1.0).argmax(axis=1))
+    game.update()
+
+
+@pytest.mark.parametrize('num_actions', [0, 1])
+def test_pop_restores_events(num_actions):
+    """Events & shaped rewards after `pop()` are those of the checkpoint, whether it was made mid tick or not."""
+    rng = np.random.default_rng(0)
+    game = Game({'map_filename': '8x8_base_workers', 'verbose': False})
+    idle_units = []
+    while not len(game.events) or not idle_units:  # a tick with events, after which a unit can act
+        play_random_tick(game, rng)
+        idle_units = [unit.id for unit in game.units.values() if not isinstance(unit, Resource) and
+                      unit.position is not None and unit.can_make_action()]
+    game.step_many(idle_units[:num_actions], [0] * num_actions)
+    events, rewards, is_new_tick = game.events.copy(), game.get_shaped_rewards(), game.is_new_tick
+
+    game.push()
+    for _ in range(10):
+        play_random_tick(game, rng)
+    game.pop()
+
+    np.testing.assert_array_equal(game.events, events)
+    np.testing.assert_array_equal(game.get_shaped_rewards(), rewards)
+    assert game.is_new_tick == is_new_tick
+
+
+def test_produce_of_unit_producing_nothing_is_illegal():
+    game = Game({'map_filename': '8x8_melee_light4', 'verbose': False})
+    light = next(unit for unit in game.units.values() if isinstance(unit, LightUnit))
+    assert not game.step_many([light.id], [ActionEncodings.PRODUCE_UP.value]).any()
+    game.update()
+    assert game.units[light.id].can_make_action()
+
+
+def test_random_tie_breaking_picks_either_move():
+    """With 'random' tie breaking, either of 2 moves into one cell in a batch can go ahead, depending on the seed."""
+    rng = np.random.default_rng(0)
+    game = Game({'map_filename': '8x8_melee_light4', 'verbose': False, 'tie_breaking': 'random', 'seed': 0})
+    directions = {(0, -1): ActionEncodings.MOVE_UP, (1, 0): ActionEncodings.MOVE_RIGHT,
+                  (0, 1): ActionEncodings.MOVE_DOWN, (-1, 0): ActionEncodings.MOVE_LEFT}
+    claimants = []
+    while len(claimants) < 2:  # 2 units that can move into the same cell
+        play_random_tick(game, rng)
+        moves = {}
+        for unit in game.units.values():
+            if not isinstance(unit, Resource) and unit.position is not None and unit.can_make_action():
+                mask = game.get_action_mask(unit)
+                for (dx, dy), action in directions.items():
+                    if mask[action.value]:
+                        moves.setdefault((unit.x + dx, unit.y + dy), []).append((unit.id, action.value))
+        claimants = max(moves.values(), key=len, default=[])[:2]
+
+    winners = set()
+    data = game.to_bytes()
+    for seed in range(20):
+        copy = Game.from_bytes(data)
+        copy.rng = np.random.default_rng(seed)
+        legal = copy.step_many(*zip(*claimants))
+        assert legal.sum() == 1
+        winners.add(int(legal.argmax()))
+    assert winners == {0, 1}
+
+
+@pytest.mark.parametrize('map_filename', RANDOMIZED_MAPS)
+def test_hash_matches_computed_hash(map_filename):
+    """The incrementally maintained Zobrist hash is the one computed from scratch, every tick & after `pop()`."""
+    rng = np.random.default_rng(0)
+    game = Game({'map_filename': map_filename, 'verbose': False})
+    for tick in range(NUM_TICKS):
+        if tick % 10 == 0:
+            hash_ = game.hash
+            game.push()
+            for _ in range(5):
+                play_random_tick(game, rng)
+            game.pop()
+            assert game.hash == hash_
+        play_random_tick(game, rng)
+        assert game.hash == game.state.compute_hash(itertools.chain(*game.pending_actions))
+        if game.is_game_over:
+            break
+
+
+@pytest.mark.parametrize('map_filename', RANDOMIZED_MAPS)
+def test_cached_masks_match_uncached(map_filename):
+    """Cached action masks are those computed from scratch, before & between the actions of a tick & after `pop()`."""
+    rng = np.random.default_rng(0)
+    games = [Game({'map_filename': map_filename, 'verbose': False, 'action_mask_cache': cache})
+             for cache in (True, False)]
+    assert games[0].mask_cache is not None and games[1].mask_cache is None
+    for tick in range(NUM_TICKS):
+        if tick % 10 == 5:
+            for game in games:
+                game.push()
+        unit_ids = [unit.id for unit in games[0].units.values()
+                    if not isinstance(unit, Resource) and unit.position is not None and unit.can_make_action()]
+        for batch in (unit_ids[::2], unit_ids[1::2]):  # masks change with the actions queued earlier in the tick
+            masks = [np.array([game.get_action_mask(game.units[unit_id]) for unit_id in batch]) for game in games]
+            np.testing.assert_array_equal(masks[0], masks[1])
+            if batch:
+                action_codes = np.where(masks[0], rng.random(masks[0].shape), -1.0).argmax(axis=1)
+                for game in games:
+                    game.step_many(batch, action_codes)
+        for game in games:
+            game.update()
+            if tick % 10 == 9:
+                game.pop()
+        if games[0].is_game_over:
+            break
+
+
+@pytest.mark.parametrize('map_filename', RANDOMIZED_MAPS)
+def test_step_many_matches_sequential_steps(map_filename):
+    """A batch of actions, legal or not & with moves into the same cells, is made as by `step()` of each in order."""
+    rng = np.random.default_rng(0)
+    game = Game({'map_filename': map_filename, 'verbose': False})
+    sequential = Game.from_bytes(game.to_bytes())
+    for _ in range(NUM_TICKS):
+        units = [unit for unit in game.units.values()
+                 if not isinstance(unit, Resource) and unit.position is not None and unit.can_make_action()]
+        unit_ids = rng.permutation([unit.id for unit in units]).tolist()
+        masks = np.array([game.get_action_mask(game.units[unit_id]) for unit_id in unit_ids])
+        masks = masks.reshape(-1, len(ActionEncodings))
+        legal_codes = np.where(masks, rng.random(masks.shape), -1.0).argmax(axis=1)
+        any_codes = rng.integers(len(ActionEncodings), size=len(unit_ids))
+        action_codes = np.where(rng.random(len(unit_ids)) < 0.5, legal_codes, any_codes)
+
+        expected = []
+        for unit_id, action_code in zip(unit_ids, action_codes.tolist()):
+            action = sequential.decode_action(unit_id, action_code)
+            expected.append(sequential.is_legal_action(action))
+            sequential.step(action)
+        np.testing.assert_array_equal(game.step_many(unit_ids, action_codes), np.array(expected, dtype=bool))
+        game.update()
+        sequential.update()
+        assert game.to_bytes() == sequential.to_bytes()
+        np.testing.assert_array_equal(game.events, sequential.events)
+        if game.is_game_over:
+            break
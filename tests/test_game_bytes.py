@@ -0,0 +1,55 @@
+import itertools
+import pickle
+
+import numpy as np
+import pytest
+
+from pycrorts3.game import Game
+from pycrorts3.game import game as game_module
+from pycrorts3.game.golden_trace import bundled_maps
+from test_game import play_random_tick
+
+NUM_TICKS = 40  # played before serialising
+NUM_TICKS_AFTER = 20  # played by both the original & the copy
+
+
+@pytest.mark.parametrize('map_filename', bundled_maps())
+@pytest.mark.parametrize('mid_tick', [False, True])
+def test_round_trip(map_filename, mid_tick):
+    """A deserialised mid-game copy serialises the same, has the same hash & plays on the same as the original."""
+    config = {'map_filename': map_filename, 'verbose': False, 'seed': 1, 'utt_version': 3, 'tie_breaking': 'random'}
+    game = Game(config)
+    rng = np.random.default_rng(0)
+    for _ in range(NUM_TICKS):
+        play_random_tick(game, rng)
+    if mid_tick:
+        idle_units = [unit.id for unit in game.units.values() if unit.player_id >= 0 and unit.position is not None and
+                      unit.can_make_action()]
+        game.step_many(idle_units, [0] * len(idle_units))
+
+    copies = [Game.from_bytes(game.to_bytes()), pickle.loads(pickle.dumps(game))]
+    for copy in copies:
+        assert copy.to_bytes() == game.to_bytes()
+        assert copy.hash == game.hash
+        assert copy.state.compute_hash(itertools.chain(*copy.pending_actions)) == copy.hash
+        np.testing.assert_array_equal(copy.events, game.events)
+
+    rngs = [np.random.default_rng(1) for _ in range(len(copies) + 1)]
+    for _ in range(NUM_TICKS_AFTER):
+        for other, other_rng in zip([game] + copies, rngs):
+            play_random_tick(other, other_rng)
+        for copy in copies:
+            assert copy.to_bytes() == game.to_bytes()
+            np.testing.assert_array_equal(copy.events, game.events)
+            np.testing.assert_array_equal(copy.get_shaped_rewards(), game.get_shaped_rewards())
+
+
+def test_games_differing_in_seed_share_a_template():
+    """Deserialising many differently seeded games of one config loads its map once, & each keeps its own seed."""
+    games = [Game({'map_filename': '8x8_base_workers', 'verbose': False, 'seed': seed}) for seed in range(1000, 1003)]
+    num_templates = len(game_module._templates)
+    copies = [Game.from_bytes(game.to_bytes()) for game in games]
+    assert len(game_module._templates) <= num_templates + 1
+    for game, copy in zip(games, copies):
+        assert copy.env_config['seed'] == game.env_config['seed']
+        assert copy.to_bytes() == game.to_bytes()
@@ -0,0 +1,31 @@
+from pycrorts3.game.golden_trace import GameBackend, VectorGameBackend, UNIT_COLUMNS, check_trace, record_trace
+
+MAP_FILENAME = '8x8_base_workers'
+NUM_TICKS = 30
+CORRUPT_TICK = 12
+CORRUPT_SLOT = 2  # the first unit after the map's 2 mineral fields
+
+
+class CorruptBackend(GameBackend):
+    """The reference engine, but for a unit that gains a hitpoint from `CORRUPT_TICK`."""
+
+    def state_tables(self, k):
+        header, units = super().state_tables(k)
+        if self.games[k].time >= CORRUPT_TICK:
+            units[CORRUPT_SLOT, UNIT_COLUMNS.index('hitpoints')] += 1
+        return header, units
+
+
+def test_backends_match_recorded_trace():
+    trace = record_trace(MAP_FILENAME, seed=0, max_ticks=NUM_TICKS)
+    assert len(trace['mask_digests']) == NUM_TICKS
+    assert check_trace(trace, GameBackend) is None
+    assert check_trace(trace, VectorGameBackend) is None
+
+
+def test_divergence_names_tick_and_unit():
+    trace = record_trace(MAP_FILENAME, seed=0, max_ticks=NUM_TICKS)
+    unit_id = GameBackend(MAP_FILENAME).state_tables(0)[1][CORRUPT_SLOT, 0]
+    result = check_trace(trace, CorruptBackend)
+    assert result is not None
+    assert result.startswith(f'{MAP_FILENAME} seed 0 tick {CORRUPT_TICK}: unit {unit_id} '), result
@@ -0,0 +1,90 @@
+import numpy as np
+
+from pycrorts3.envs import HierarchicalPycroRts3MultiAgentEnv
+from pycrorts3.game import Game
+from pycrorts3.game.distance_fields import DistanceFields
+from pycrorts3.game.macro_actions import MacroAction, MacroActions, MoveToMacro, ProduceMacro
+from pycrorts3.game.units import BaseBuilding, Resource, WorkerUnit
+
+MAX_TICKS = 300  # for a macro to complete
+MAX_GAME_TICKS = 1000  # for a game to end
+
+
+def run_macro(game: Game, macro: MacroAction, fields: DistanceFields) -> int:
+    """Expand a macro into its unit's actions until it completes, as `HierarchicalPycroRts3MultiAgentEnv`, & get the
+    ticks it took."""
+    unit = game.units[macro.unit_id]
+    for ticks in range(MAX_TICKS):
+        if unit.can_make_action():
+            if macro.start_time < game.time and macro.is_done(game, unit, fields):
+                return ticks
+            game.step(game.decode_action(unit.id, macro.next_action(game, unit, fields)))
+        game.update()
+        macro.observe(game.events)
+    raise AssertionError(f'The macro did not complete in {MAX_TICKS} ticks')
+
+
+def test_move_to_reaches_its_cell():
+    game = Game({'map_filename': '8x8_base_workers', 'verbose': False})
+    fields = DistanceFields()
+    worker = next(unit for unit in game.units.values() if isinstance(unit, WorkerUnit) and unit.player_id == 0)
+    x, y = 0, game.height() - 1  # across the map, clear of the enemy's units
+    assert all((unit.x, unit.y) != (x, y) for unit in game.units.values())
+    run_macro(game, MoveToMacro(worker.id, game.time, x, y), fields)
+    assert (worker.x, worker.y) == (x, y)
+
+
+def test_produce_completes_after_its_count():
+    game = Game({'map_filename': '8x8_base_workers', 'verbose': False})
+    fields = DistanceFields()
+    base = next(unit for unit in game.units.values() if isinstance(unit, BaseBuilding) and unit.player_id == 0)
+
+    def num_workers():
+        return sum(isinstance(unit, WorkerUnit) and unit.player_id == 0 for unit in game.units.values())
+
+    before = num_workers()
+    macro = ProduceMacro(base.id, game.time, 2)
+    run_macro(game, macro, fields)
+    assert macro.produced == 2
+    assert num_workers() == before + 2
+
+
+def test_rewards_sum_to_those_of_each_tick():
+    """Each agent gets the rewards of its player over every tick since it was last queried, & every unit is queried
+    when the game ends, here with every unit that can attacking."""
+    env = HierarchicalPycroRts3MultiAgentEnv({'map_filename': '8x8_base_workers', 'verbose': False,
+                                              'macro_timeout': 20, 'reward_damage': 0.5, 'reward_step': -0.01})
+    game = env.game
+    tick_rewards = []  # of each player, by tick
+    update = game.update
+
+    def recording_update():
+        update()
+        tick_rewards.append(game.reward_step() + game.get_shaped_rewards())
+
+    game.update = recording_update
+    rng = np.random.default_rng(0)
+    obs = env.reset()
+    query_ticks = {agent_id: 0 for agent_id in obs}  # of each agent's last observation
+    dones = {'__all__': False}
+    while not dones['__all__'] and game.time < MAX_GAME_TICKS:
+        actions = {}
+        for agent_id, agent_obs in obs.items():
+            legal = np.flatnonzero(agent_obs['action_mask'])
+            macro = MacroActions.ATTACK.value if MacroActions.ATTACK.value in legal else int(rng.choice(legal))
+            actions[agent_id] = [macro, rng.integers(env.obs_height * env.obs_width), 0]
+        obs, rewards, dones, _ = env.step(actions)
+        assert env.num_ticks > 0
+        for agent_id, reward in rewards.items():
+            player_id = int(agent_id.split('.')[0])
+            start = query_ticks.get(agent_id, game.time)  # new units get no reward with their first observation
+            expected = sum(tick[player_id] for tick in tick_rewards[start:])
+            if dones['__all__']:
+                expected += game.reward_win() if player_id == game.winner else \
+                    game.reward_lose() if 1 - player_id == game.winner else game.reward_draw()
+            np.testing.assert_allclose(reward, expected, atol=1e-9)
+            query_ticks[agent_id] = game.time
+
+    assert dones['__all__'], 'The game did not end'
+    units = [unit for unit in game.units.values() if not isinstance(unit, Resource)]
+    assert sorted(obs) == sorted(f'{unit.player_id}.{unit.id}' for unit in units)
@@ -0,0 +1,80 @@
+import gzip
+import io
+
+from pycrorts3.game.actions import ActionEncodings
+from pycrorts3.game.map_layout import MapLayout
+from pycrorts3.game.microrts_trace import _import_and_save, load_imported_trace, read_trace
+from pycrorts3.game.units import LightUnit, WorkerUnit, unit_type_code
+
+# 2 ticks on a 4x4 map, with a unit of a type unknown here & a worker attacking at range
+TRACE = b"""<rts.Trace>
+  <entries>
+    <rts.TraceEntry time="0">
+      <rts.PhysicalGameState width="4" height="4">
+        <terrain>0000000000000000</terrain>
+        <players>
+          <rts.Player ID="0" resources="5"/>
+          <rts.Player ID="1" resources="7"/>
+        </players>
+        <units>
+          <rts.units.Unit type="Worker" ID="1" player="0" x="0" y="0" resources="0" hitpoints="1"/>
+          <rts.units.Unit type="Light" ID="2" player="1" x="3" y="3" resources="0" hitpoints="4"/>
+          <rts.units.Unit type="Catapult" ID="3" player="1" x="3" y="0" resources="0" hitpoints="9"/>
+        </units>
+      </rts.PhysicalGameState>
+      <actions>
+        <action unitID="1"><UnitAction type="1" parameter="1"/></action>
+        <action unitID="2"><UnitAction type="0"/></action>
+      </actions>
+    </rts.TraceEntry>
+    <rts.TraceEntry time="1">
+      <rts.PhysicalGameState width="4" height="4">
+        <terrain>0000000000000000</terrain>
+        <players>
+          <rts.Player ID="0" resources="5"/>
+          <rts.Player ID="1" resources="7"/>
+        </players>
+        <units>
+          <rts.units.Unit type="Worker" ID="1" player="0" x="1" y="0" resources="0" hitpoints="1"/>
+          <rts.units.Unit type="Light" ID="2" player="1" x="3" y="3" resources="0" hitpoints="4"/>
+          <rts.units.Unit type="Catapult" ID="3" player="1" x="3" y="0" resources="0" hitpoints="9"/>
+        </units>
+      </rts.PhysicalGameState>
+      <actions>
+        <action unitID="1"><UnitAction type="5" x="3" y="0"/></action>
+        <action unitID="2"><UnitAction type="1" parameter="0"/></action>
+      </actions>
+    </rts.TraceEntry>
+  </entries>
+</rts.Trace>
+"""
+
+
+def test_read_trace():
+    trace, issues = read_trace(io.BytesIO(TRACE))
+    assert issues == {'unit type Catapult': 2, 'Worker attack at range': 1}
+    assert trace['issue_reasons'].tolist() == ['Worker attack at range', 'unit type Catapult']
+    assert trace['issue_counts'].tolist() == [1, 2]
+    assert trace['ticks'].tolist() == [(0, 5, 7, 2, 2), (1, 5, 7, 2, 1)]
+    worker, light = unit_type_code(WorkerUnit), unit_type_code(LightUnit)
+    assert trace['units'].tolist() == [(1, worker, 0, 0, 0, 1, 0), (2, light, 1, 3, 3, 4, 0),
+                                       (1, worker, 0, 1, 0, 1, 0), (2, light, 1, 3, 3, 4, 0)]
+    assert trace['actions'].tolist() == [(1, ActionEncodings.MOVE_RIGHT.value), (2, ActionEncodings.NOOP.value),
+                                         (2, ActionEncodings.MOVE_UP.value)]
+    layout = MapLayout.from_bytes(trace['map'].tobytes())
+    assert (layout.height, layout.width) == (4, 4)
+
+
+def test_import_reports_malformed_traces(tmp_path):
+    path = tmp_path / 'trace.xml.gz'
+    path.write_bytes(gzip.compress(TRACE))
+    assert _import_and_save(str(path), None, str(tmp_path / 'trace.npz')) == \
+        {'unit type Catapult': 2, 'Worker attack at range': 1}
+    assert load_imported_trace(str(tmp_path / 'trace.npz'))['ticks']['time'].tolist() == [0, 1]
+
+    for malformed in (TRACE.replace(b'x="1"', b'x="one"'), TRACE.replace(b' resources="7"', b''),
+                      TRACE.replace(b'<terrain>0000000000000000</terrain>', b'')):
+        path = tmp_path / 'malformed.xml'
+        path.write_bytes(malformed)
+        issues = _import_and_save(str(path), None, str(tmp_path / 'malformed.npz'))
+        assert len(issues) == 1 and next(iter(issues)).startswith('parse error: '), issues
@@ -0,0 +1,23 @@
+import numpy as np
+
+from pycrorts3.envs import PycroRts3MultiAgentEnv
+
+
+def random_actions(obs: dict, rng: np.random.Generator) -> dict:
+    """A random legal action for every agent observed."""
+    return {agent_id: int(rng.choice(np.flatnonzero(agent_obs['action_mask']))) for agent_id, agent_obs in obs.items()}
+
+
+def test_history_is_kept_across_steps():
+    """Observations handed out aren't changed by later steps, e.g. while kept in a sample batch."""
+    env = PycroRts3MultiAgentEnv({'map_filename': '8x8_melee_light4', 'verbose': False, 'frame_stack': 4})
+    rng = np.random.default_rng(0)
+    obs = env.reset()
+    for _ in range(20):
+        kept = {agent_id: agent_obs['history'].copy() for agent_id, agent_obs in obs.items()}
+        previous = obs
+        obs, _, dones, _ = env.step(random_actions(obs, rng))
+        for agent_id, history in kept.items():
+            np.testing.assert_array_equal(previous[agent_id]['history'], history)
+        if dones['__all__']:
+            break
@@ -0,0 +1,37 @@
+import numpy as np
+import pytest
+
+from pycrorts3.envs import PycroRts3Env
+from pycrorts3.game.renderer import FrameWriter, SCALE
+
+pytest.importorskip('imageio')
+
+
+def test_frame_writer(tmp_path):
+    env = PycroRts3Env({'map_filename': '8x8_base_workers', 'verbose': False})
+    env.reset()
+    path = str(tmp_path / 'game.gif')
+    with FrameWriter(path) as writer:
+        for _ in range(3):
+            frame = env.render('rgb_array')
+            assert frame.shape == (8 * SCALE, 8 * SCALE, 3)
+            writer.write(frame)
+            env.step(env.action_space.sample())
+    assert (tmp_path / 'game.gif').stat().st_size > 0
+
+
+def test_frame_writer_raises_worker_errors(tmp_path):
+    """An error writing a frame is raised by the next `write()` or `close()`, rather than blocking them."""
+    writer = FrameWriter(str(tmp_path / 'game.gif'), max_queued=1)
+
+    def fail(frame):
+        raise ValueError('Bad frame')
+    writer.writer.append_data = fail
+    frames = np.zeros((4, 8, 8, 3), dtype=np.uint8)
+    with pytest.raises(RuntimeError) as error:
+        for _ in range(10):
+            writer.write(frames)
+        writer.close()
+    assert isinstance(error.value.__cause__, ValueError)
+    with pytest.raises(RuntimeError):
+        writer.close()
@@ -0,0 +1,40 @@
+import numpy as np
+
+from pycrorts3.bots import GameBatch, LightRushBot, RandomBot, WorkerRushBot, idle_units
+from pycrorts3.game import Game
+from pycrorts3.game.golden_trace import bundled_maps
+
+NUM_TICKS = 300
+
+
+def test_batch_action_masks():
+    """A batch of differently sized games masks every idle unit as `Game.get_action_mask()` & picks legal actions."""
+    games = [Game({'map_filename': map_filename, 'verbose': False}) for map_filename in bundled_maps()]
+    bots = [RandomBot(0, biased=True), LightRushBot(1)]
+    for _ in range(NUM_TICKS):
+        for player_id, bot in enumerate(bots):
+            games = [game for game in games if not game.is_game_over]
+            batch = GameBatch(games, player_id)
+            units = [games[k].units[unit_id] for k, unit_id in zip(batch.game[batch.rows], batch.table[batch.rows, 0])]
+            assert len(units) == sum(len(idle_units(game, player_id)) for game in games)
+            masks = batch.action_masks()
+            for unit, mask, k in zip(units, masks, batch.game[batch.rows]):
+                np.testing.assert_array_equal(mask, games[k].get_action_mask(unit))
+            actions = bot.get_unit_actions(batch)
+            assert masks[np.arange(len(actions)), actions].all()
+            bot.play_many(games, player_id)
+        for game in games:
+            game.update()
+
+
+def test_rush_bots_beat_random():
+    for bot in (WorkerRushBot(0), LightRushBot(0)):
+        games = [Game({'map_filename': '8x8_base_workers', 'verbose': False, 'seed': seed}) for seed in range(4)]
+        opponent = RandomBot(1)
+        while not all(game.is_game_over for game in games):
+            live = [game for game in games if not game.is_game_over]
+            bot.play_many(live, 0)
+            opponent.play_many(live, 1)
+            for game in live:
+                game.update()
+        assert [game.winner for game in games] == [0] * len(games)
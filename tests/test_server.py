@@ -0,0 +1,36 @@
+import numpy as np
+
+from pycrorts3.game.actions import ActionEncodings
+from pycrorts3.game.events import EventTypes
+from pycrorts3.game.units import BaseBuilding
+from pycrorts3.server.protocol import Ops, ACTION_DTYPE, GAME_INDEX_DTYPE, LENGTH_PREFIX, decode_header, \
+    encode_message
+from pycrorts3.server.server import GameServer
+
+
+def step(server: GameServer, actions) -> Ops:
+    """Send a STEP of some (unit ID, action) per game & get the op of the response."""
+    tables = [np.array(list(game_actions), dtype=ACTION_DTYPE) for game_actions in actions]
+    counts = np.array([len(table) for table in tables], dtype=GAME_INDEX_DTYPE)
+    games = np.arange(len(actions), dtype=GAME_INDEX_DTYPE)
+    message = encode_message(Ops.STEP, len(actions), [games, counts] + tables)[LENGTH_PREFIX.size:]
+    op, _ = decode_header(server.handle(message)[LENGTH_PREFIX.size:])
+    return op
+
+
+def test_invalid_step_changes_nothing():
+    """A STEP with an invalid action of any game is refused before any game is stepped, while illegal actions are
+    made as NOOPs."""
+    server = GameServer(2, {'map_filename': '8x8_base_workers'})
+    base = next(unit.id for unit in server.games[0].units.values() if isinstance(unit, BaseBuilding))
+    illegal = [(base, ActionEncodings.MOVE_UP.value)]
+    before = [game.to_bytes() for game in server.games]
+
+    assert step(server, [illegal, [(10 ** 6, 0)]]) == Ops.ERROR
+    assert step(server, [illegal, [(base, len(ActionEncodings))]]) == Ops.ERROR
+    assert [game.to_bytes() for game in server.games] == before
+
+    assert step(server, [illegal, []]) == Ops.STEP
+    assert [game.time for game in server.games] == [1, 1]
+    events = server.games[0].events
+    assert events['unit_id'][events['type'] == EventTypes.INVALID.value].tolist() == [base]
@@ -0,0 +1,21 @@
+from gym import spaces
+import numpy as np
+
+from pycrorts3.envs import TrajectoryReader, TrajectoryWriter
+
+OBSERVATION_SPACE = spaces.Box(low=0, high=255, shape=(4,), dtype=np.uint8)
+ACTION_SPACE = spaces.Discrete(5)
+
+
+def write_rows(writer: TrajectoryWriter, num_rows: int) -> None:
+    with writer:
+        for i in range(num_rows):
+            writer.add(np.full(4, i, dtype=np.uint8), i % 5, float(i), False)
+
+
+def test_writers_in_one_process_dont_collide(tmp_path):
+    for _ in range(2):
+        write_rows(TrajectoryWriter(str(tmp_path), OBSERVATION_SPACE, ACTION_SPACE, shard_size=4), 6)
+    for _ in range(2):
+        write_rows(TrajectoryWriter(str(tmp_path), OBSERVATION_SPACE, ACTION_SPACE, shard_size=4, writer_id='a'), 6)
+    assert len(TrajectoryReader(str(tmp_path))) == 24
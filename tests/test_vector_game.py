@@ -0,0 +1,46 @@
+import numpy as np
+import pytest
+
+from pycrorts3.game import Game, VectorGame
+
+MAPS = ['4x4_melee_light2', '8x8_base_workers', '8x8_melee_light4_terrain', '16x16_melee_mixed8']
+NUM_GAMES = 4
+NUM_TICKS = 300
+
+
+@pytest.mark.parametrize('map_filename', MAPS)
+def test_matches_game_tick_for_tick(map_filename):
+    """Every game of a `VectorGame` plays the same random legal actions as a `Game` & matches it after every tick."""
+    rng = np.random.default_rng(0)
+    vector_game = VectorGame(NUM_GAMES, {'map_filename': map_filename})
+    games = [Game({'map_filename': map_filename, 'verbose': False}) for _ in range(NUM_GAMES)]
+    for _ in range(NUM_TICKS):
+        masks = vector_game.get_action_masks()
+        can_act = vector_game.can_make_action()
+        action_codes = np.where(can_act, np.where(masks, rng.random(masks.shape), -1.0).argmax(axis=2), -1)
+        for k, game in enumerate(games):
+            if game.is_game_over:
+                continue
+            units = list(game.units.values())
+            slots = np.flatnonzero(can_act[k])
+            assert [slot for slot, unit in enumerate(units) if unit.player_id >= 0 and unit.position is not None and
+                    unit.can_make_action()] == slots.tolist()
+            game_masks = [game.get_action_mask(units[slot]) for slot in slots.tolist()]
+            for slot, game_mask in zip(slots.tolist(), game_masks):
+                np.testing.assert_array_equal(masks[k, slot], game_mask)
+            for slot in slots.tolist():
+                game.step(game.decode_action(units[slot].id, int(action_codes[k, slot])))
+            game.update()
+
+        vector_game.step(action_codes)
+        vector_game.update()
+        for k, game in enumerate(games):
+            assert vector_game.diff_against_game(k, game) is None
+        if vector_game.is_game_over.all():
+            break
+
+
+def test_max_units_fits_every_unit_the_map_can_afford():
+    vector_game = VectorGame(1, {'map_filename': '8x8_base_workers'})
+    assert len(Game({'map_filename': '8x8_base_workers', 'verbose': False}).units) < vector_game.max_units <= 64
+    assert VectorGame(1, {'map_filename': '8x8_base_workers'}, max_units=100).max_units == 100